@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from ...utils.janitor import disk_usage, sweep
+
+
+def _mb(value):
+    return f"{value / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Sprzatanie dysku druku wg STORAGE_JANITOR: retencja eksportow wg statusu produkcji, porzucone katalogi "
+        "robocze renderu, pobrane upscale i limit eksportow; raportuje zajetosc per kategoria (np. z crona)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Tylko pokaz, co zostaloby usuniete")
+        parser.add_argument("--report", action="store_true", help="Tylko raport zajetosci, bez sprzatania")
+
+    def handle(self, *args, **options):
+        if options["report"]:
+            usage = disk_usage()
+        else:
+            result = sweep(dry_run=options["dry_run"])
+            usage = result["usage"]
+            label = "Do zwolnienia" if options["dry_run"] else "Zwolniono"
+            self.stdout.write(self.style.SUCCESS(
+                f"🧹 {label}: {_mb(result['freed_bytes'])} ({len(result['removed'])} pozycji)"
+            ))
+
+        for name, item in usage.items():
+            if name == "free_bytes":
+                continue
+            self.stdout.write(f"📁 {name:<10} {_mb(item['bytes']):>12}  {item['files']:>6} plików  {item['path']}")
+        self.stdout.write(f"💾 Wolne miejsce: {_mb(usage['free_bytes'])}")
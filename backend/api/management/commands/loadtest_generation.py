@@ -0,0 +1,115 @@
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Test obciazeniowy endpointu generowania: wysyla zapytania ze stala czestotliwoscia (otwarta petla) "
+        "i raportuje percentyle opoznien. Serwer uruchom z IMAGE_PROVIDER=stub, zeby nie placic za generacje."
+    )
+
+    ENDPOINTS = {
+        "generate": "/api/generate/",
+        "jobs": "/api/generate-jobs/",
+        "batch": "/api/generate-batch/",
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument("--endpoint", choices=sorted(self.ENDPOINTS), default="generate")
+        parser.add_argument("--username", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--rps", type=float, default=2.0, help="Docelowa liczba zapytan na sekunde")
+        parser.add_argument("--duration", type=float, default=30.0, help="Czas trwania testu (s)")
+        parser.add_argument("--n", type=int, default=1, help="Liczba wariantow na zapytanie")
+        parser.add_argument("--batch-size", type=int, default=5, help="Pozycji w serii (--endpoint batch)")
+        parser.add_argument("--prompt", default="Górski krajobraz o świcie")
+        parser.add_argument("--timeout", type=float, default=120.0)
+        parser.add_argument("--max-workers", type=int, default=64)
+
+    def _token(self, options):
+        response = requests.post(
+            f"{options['base_url']}/api/token/",
+            json={"username": options["username"], "password": options["password"]},
+            timeout=options["timeout"],
+        )
+        if response.status_code != 200:
+            raise CommandError(f"Logowanie nie powiodło się ({response.status_code}): {response.text[:200]}")
+        return response.json()["access"]
+
+    def _payload(self, options, index):
+        spec = {"prompt": f"{options['prompt']} #{index}", "n": options["n"]}
+        if options["endpoint"] == "batch":
+            return {"items": [dict(spec, prompt=f"{spec['prompt']}.{i}") for i in range(options["batch_size"])]}
+        return spec
+
+    def handle(self, *args, **options):
+        if options["rps"] <= 0 or options["duration"] <= 0:
+            raise CommandError("--rps i --duration muszą być dodatnie")
+
+        url = options["base_url"] + self.ENDPOINTS[options["endpoint"]]
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {self._token(options)}"
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=options["max_workers"])
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        lock = threading.Lock()
+        latencies = []
+        statuses = Counter()
+
+        def fire(index, scheduled):
+            try:
+                response = session.post(url, json=self._payload(options, index), timeout=options["timeout"])
+                outcome = response.status_code
+            except requests.RequestException as e:
+                outcome = type(e).__name__
+            # liczone od planowanego terminu wysylki - kolejka po stronie klienta tez jest opoznieniem
+            elapsed = time.perf_counter() - scheduled
+            with lock:
+                statuses[outcome] += 1
+                if isinstance(outcome, int) and 200 <= outcome < 300:
+                    latencies.append(elapsed)
+
+        total = int(options["rps"] * options["duration"])
+        interval = 1.0 / options["rps"]
+        self.stdout.write(f"🚀 {total} zapytań do {url} ({options['rps']}/s przez {options['duration']} s)")
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=options["max_workers"]) as executor:
+            start = time.perf_counter()
+            for index in range(total):
+                # otwarta petla: termin kolejnego zapytania nie zalezy od odpowiedzi poprzednich
+                scheduled = start + index * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(fire, index, scheduled))
+            wait(futures)
+            elapsed = time.perf_counter() - start
+
+        self._report(latencies, statuses, total, elapsed)
+        failed = sum(count for outcome, count in statuses.items() if not (isinstance(outcome, int) and 200 <= outcome < 300))
+        if failed:
+            raise CommandError(f"{failed}/{total} zapytań zakończonych bez statusu 2xx")
+
+    def _report(self, latencies, statuses, total, elapsed):
+        self.stdout.write(f"⏱️ Czas: {elapsed:.1f} s, osiągnięte: {total / elapsed:.2f} zapytań/s")
+        self.stdout.write("📊 Statusy: " + ", ".join(f"{key}: {count}" for key, count in sorted(statuses.items(), key=str)))
+        if not latencies:
+            self.stdout.write(self.style.ERROR("❌ Brak udanych zapytań"))
+            return
+
+        latencies.sort()
+        quantiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f"📈 Opóźnienia (s): min {latencies[0]:.3f}, p50 {quantiles[49]:.3f}, p90 {quantiles[89]:.3f}, "
+            f"p95 {quantiles[94]:.3f}, p99 {quantiles[98]:.3f}, max {latencies[-1]:.3f}"
+        )
+        ok = len(latencies)
+        self.stdout.write(self.style.SUCCESS(f"✅ Udane: {ok}/{total} ({100 * ok / total:.1f}%)"))
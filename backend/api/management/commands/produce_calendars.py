@@ -0,0 +1,53 @@
+import time
+from collections import Counter
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from ...utils.calendar_generation import claim_productions, run_production_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Produkcja seryjna: renderuje wszystkie produkcje `to_produce` w puli procesow (np. nocny przebieg "
+        "z crona) i raportuje status kazdej pozycji. Nieudane wracaja do `to_produce`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--deadline", help="Tylko produkcje z terminem do tej daty (RRRR-MM-DD)")
+        parser.add_argument("--limit", type=int, help="Maksymalna liczba produkcji w przebiegu")
+        parser.add_argument("--workers", type=int, help="Liczba procesow (domyslnie PRODUCTION_WORKERS)")
+
+    def handle(self, *args, **options):
+        deadline = None
+        if options["deadline"]:
+            try:
+                deadline = date.fromisoformat(options["deadline"])
+            except ValueError:
+                raise CommandError("--deadline musi mieć format RRRR-MM-DD")
+
+        productions = claim_productions(deadline=deadline, limit=options["limit"])
+        if not productions:
+            self.stdout.write("Brak produkcji do wykonania.")
+            return
+
+        self.stdout.write(f"🖨️ Zajęto {len(productions)} produkcji")
+        start = time.perf_counter()
+
+        def report(item):
+            if item["status"] == "done":
+                self.stdout.write(self.style.SUCCESS(f"✅ #{item['id']} (kalendarz {item['calendar_id']})"))
+            elif item["status"] == "skipped":
+                self.stdout.write(self.style.WARNING(
+                    f"⏭️ #{item['id']} (kalendarz {item['calendar_id']}): {item.get('error')}"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f"❌ #{item['id']} (kalendarz {item['calendar_id']}): {item.get('error')}"
+                ))
+
+        results = run_production_batch(productions, workers=options["workers"], on_result=report)
+
+        statuses = Counter(item["status"] for item in results)
+        self.stdout.write(
+            f"⏱️ {time.perf_counter() - start:.1f} s — gotowe: {statuses['done']}, błędy: {statuses['failed']}, "
+            f"pominięte: {statuses['skipped']}"
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0040_remove_atmosfera_tlumaczenie_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendar',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0042_generationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedimage',
+            name='generation_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
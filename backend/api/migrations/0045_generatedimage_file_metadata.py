@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0044_promptrewrite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedimage',
+            name='file_format',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='generatedimage',
+            name='file_size',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
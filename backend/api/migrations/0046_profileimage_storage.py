@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0045_generatedimage_file_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profileimage',
+            name='profile_image_key',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='profileimage',
+            name='profile_image_url',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0046_profileimage_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedimage',
+            name='medium_url',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='generatedimage',
+            name='thumbnail_url',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
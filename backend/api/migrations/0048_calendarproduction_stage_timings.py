@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0047_generatedimage_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarproduction',
+            name='render_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='calendarproduction',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0048_calendarproduction_stage_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarproduction',
+            name='lock_token',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='calendarproduction',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0049_calendarproduction_lock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarproduction',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
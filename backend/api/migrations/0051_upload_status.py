@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0050_calendarproduction_claimed_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarmonthfieldimage',
+            name='upload_status',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='generatedimage',
+            name='upload_status',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
@@ -7,9 +8,20 @@ from cloudinary.models import CloudinaryField
 class ProfileImage(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     profile_image = CloudinaryField("profile_image", folder="ProfileImages", blank=True, null=True)
+    profile_image_url = models.CharField(max_length=255, blank=True)
+    profile_image_key = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
         return self.user.username
+
+    @property
+    def image_url(self):
+        """
+        URL zdjecia z magazynu plikow; dla starszych profili - z pola CloudinaryField.
+        """
+        if self.profile_image_url:
+            return self.profile_image_url
+        return self.profile_image.url if self.profile_image else None
 class GeneratedImage(models.Model):
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     prompt = models.CharField(max_length=500)
@@ -28,7 +40,45 @@ class GeneratedImage(models.Model):
     styl_narracyjny = models.ForeignKey('StylNarracyjny', on_delete=models.SET_NULL, null=True, blank=True)
  
     url = models.CharField(max_length=255, default="unknown")
+    file_size = models.PositiveIntegerField(null=True, blank=True)
+    file_format = models.CharField(max_length=10, blank=True)
+    thumbnail_url = models.CharField(max_length=255, blank=True)
+    medium_url = models.CharField(max_length=255, blank=True)
+    generation_id = models.UUIDField(null=True, blank=True, db_index=True)
+    # odroczony upload pliku (tworzenie kalendarza z deferUploads): "" - gotowy, "pending" - w toku, "failed" - nieudany
+    upload_status = models.CharField(max_length=10, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class GenerationJob(models.Model):
+    STATUS_CHOICES = (
+        ("queued", "W kolejce"),
+        ("running", "W trakcie"),
+        ("done", "Gotowy"),
+        ("failed", "Błąd"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="generation_jobs")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    params = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # znak zycia watku wykonujacego zadanie - bez niego zadanie `running` uznajemy za porzucone
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.id} - {self.get_status_display()}"
+
+class PromptRewrite(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=200)
+    prompt = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
 class Calendar(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     name = models.CharField(max_length=100, default="new calendar")
@@ -47,6 +97,7 @@ class Calendar(models.Model):
     bottom_content_type = models.ForeignKey(ContentType, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
     bottom_object_id = models.PositiveIntegerField(null=True, blank=True)
     bottom = GenericForeignKey("bottom_content_type", "bottom_object_id")
+    version = models.PositiveIntegerField(default=0)
 
 class CalendarProduction(models.Model):
     STATUS_CHOICES = (
@@ -67,6 +118,13 @@ class CalendarProduction(models.Model):
     deadline = models.DateField(null=True, blank=True)  
     production_note = models.TextField(blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
+    stage_timings = models.JSONField(default=dict, blank=True)
+    render_seconds = models.FloatField(null=True, blank=True)
+    # blokada renderu (CalendarPrint / produkcja seryjna) - wygasa sama, gdy proces zginie w trakcie
+    lock_token = models.CharField(max_length=32, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    # rezerwacja produkcji seryjnej (in_production) - odnawiana w trakcie przebiegu, po wygasnieciu do ponownego wziecia
+    claimed_until = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.calendar.name} - {self.get_status_display()}"
@@ -83,6 +141,7 @@ class CalendarMonthFieldImage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     path = models.CharField(max_length=500)  
+    upload_status = models.CharField(max_length=10, blank=True, default="")
     positionX = models.CharField(max_length=50, blank=True, null=True)
     positionY = models.CharField(max_length=50, blank=True, null=True)
     size = models.CharField(max_length=20, blank=True, null=True)
@@ -7,10 +7,14 @@ from django.contrib.auth import get_user_model, password_validation
 from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth.password_validation import validate_password
 
+from django.conf import settings
 from django.utils import timezone
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.core.exceptions import ValidationError as DjangoValidationError
 from .models import CalendarProduction
+from .utils.taxonomy_cache import TAXONOMY_MODELS, get_taxonomy_item
+from .utils.image_generation.jobs import MAX_VARIANTS, MAX_BATCH_ITEMS
+from .utils.storage import resized_url
 User = get_user_model()
 
 
@@ -22,7 +26,7 @@ class ProfileImageSerializer(serializers.ModelSerializer):
         fields = ["id", "profile_image", "profile_image_url"]
 
     def get_profile_image_url(self, obj):
-        return obj.profile_image.url if obj.profile_image else None
+        return obj.image_url
 
 
 
@@ -159,13 +163,12 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         profile_image_url = None
 
         if hasattr(user, "profile"):
-            if getattr(user.profile, "profile_image", None):
-                try:
-                    profile_image_url = user.profile.profile_image.url
-                except Exception:
-                    profile_image_url = None
+            try:
+                profile_image_url = user.profile.image_url
+            except Exception:
+                profile_image_url = None
 
-            elif getattr(user.profile, "photo", None):
+            if not profile_image_url and getattr(user.profile, "photo", None):
                 try:
                     profile_image_url = user.profile.photo.url
                 except Exception:
@@ -209,6 +212,8 @@ class TopImageField(serializers.Field):
             result['id'] = value.id
         except AttributeError:
             result['id'] = value
+        if isinstance(value, GeneratedImage):
+            result['thumbnail_url'] = variant_url(value, "thumbnail")
 
         return result
 
@@ -231,9 +236,9 @@ class CalendarSerializer(serializers.ModelSerializer):
             "id", "created_at", "author",
             "top_image", "top_image_url",
             "year_data", "field1", "field2", "field3",
-            "bottom", "images_for_fields", "name"
+            "bottom", "images_for_fields", "name", "version"
         ]
-        read_only_fields = ["id", "created_at", "top_image_url"]
+        read_only_fields = ["id", "created_at", "top_image_url", "version"]
 
     # --- Top image URL ---
     def get_top_image_url(self, obj):
@@ -341,8 +346,9 @@ class CalendarProductionSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "finished_at",
+            "render_seconds",
         ]
-        read_only_fields = ["status", "created_at", "updated_at", "finished_at"]
+        read_only_fields = ["status", "created_at", "updated_at", "finished_at", "render_seconds"]
 
     def create(self, validated_data):
         request = self.context["request"]
@@ -368,6 +374,26 @@ class CalendarProductionSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+class ProductionBatchSerializer(serializers.Serializer):
+    deadline = serializers.DateField(required=False, allow_null=True)
+    limit = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+
+
+class BulkDownloadSerializer(serializers.Serializer):
+    production_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    calendar_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    status = serializers.ChoiceField(choices=CalendarProduction.STATUS_CHOICES, required=False)
+    deadline_from = serializers.DateField(required=False)
+    deadline_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if not any(attrs.values()):
+            raise serializers.ValidationError("Podaj identyfikatory produkcji lub kalendarzy albo filtr (status, termin).")
+        if attrs.get("deadline_from") and attrs.get("deadline_to") and attrs["deadline_from"] > attrs["deadline_to"]:
+            raise serializers.ValidationError("deadline_from nie może być późniejszy niż deadline_to.")
+        return attrs
+
+
 class PasswordResetSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
@@ -375,41 +401,106 @@ class SendEmailSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
 class ImageSearchSerializer(serializers.ModelSerializer):
+    thumbnail_url = serializers.SerializerMethodField()
+
     class Meta:
         model = GeneratedImage
-        fields = ['id', 'name', ]
+        fields = ['id', 'name', 'thumbnail_url']
+
+    def get_thumbnail_url(self, obj):
+        return variant_url(obj, "thumbnail")
 class CalendarSearchSerializer(serializers.ModelSerializer):
     class Meta:
         model = Calendar
         fields = ['id', 'name']  
 
+class TaxonomyField(serializers.PrimaryKeyRelatedField):
+    """
+    Pole id slownika promptu rozwiazywane z cache slownikow zamiast zapytania do bazy.
+    """
+
+    def __init__(self, taxonomy_key, **kwargs):
+        self.taxonomy_key = taxonomy_key
+        kwargs.setdefault("queryset", TAXONOMY_MODELS[taxonomy_key].objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        instance = get_taxonomy_item(self.taxonomy_key, data)
+        if instance is None:
+            self.fail("does_not_exist", pk_value=data)
+        return instance
+
+
+def variant_url(image, name):
+    """
+    URL wariantu GeneratedImage (IMAGE_VARIANTS) - zapisany przy uploadzie, a dla starszych obrazow
+    liczony z oryginalu (transformacja Cloudinary albo oryginalny URL).
+    """
+    stored = getattr(image, f"{name}_url", "")
+    if stored:
+        return stored
+    return resized_url(image.url, settings.IMAGE_VARIANTS[name]["width"])
+
+
 class GenerateImageSerializer(serializers.ModelSerializer):
+    styl_artystyczny = TaxonomyField("styl_artystyczny", required=False, allow_null=True)
+    kompozycja = TaxonomyField("kompozycja", required=False, allow_null=True)
+    kolorystyka = TaxonomyField("kolorystyka", required=False, allow_null=True)
+    atmosfera = TaxonomyField("atmosfera", required=False, allow_null=True)
+    inspiracja = TaxonomyField("inspiracja", required=False, allow_null=True)
+    tlo = TaxonomyField("tlo", required=False, allow_null=True)
+    perspektywa = TaxonomyField("perspektywa", required=False, allow_null=True)
+    detale = TaxonomyField("detale", required=False, allow_null=True)
+    realizm = TaxonomyField("realizm", required=False, allow_null=True)
+    styl_narracyjny = TaxonomyField("styl_narracyjny", required=False, allow_null=True)
+    n = serializers.IntegerField(required=False, write_only=True, min_value=1, max_value=MAX_VARIANTS)
+    fresh = serializers.BooleanField(required=False, write_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
+    medium_url = serializers.SerializerMethodField()
+
     class Meta:
         model = GeneratedImage
         fields = [
             "id", "author", "prompt", "width", "height", "url", "created_at",
             "styl_artystyczny", "kompozycja", "kolorystyka", "atmosfera", "inspiracja",
-            "tlo", "perspektywa", "detale", "realizm", "styl_narracyjny", "name"
+            "tlo", "perspektywa", "detale", "realizm", "styl_narracyjny", "name",
+            "generation_id", "file_size", "file_format", "thumbnail_url", "medium_url", "upload_status", "n", "fresh"
         ]
         extra_kwargs = {
             "author": {"read_only": True},
+            "generation_id": {"read_only": True},
+            "file_size": {"read_only": True},
+            "file_format": {"read_only": True},
+            "upload_status": {"read_only": True},
             "width": {"read_only": True},
             "height": {"read_only": True},
             "url": {"read_only": True},
             "created_at": {"read_only": True},
             "prompt": {"required": False, "allow_blank": True, "allow_null": True},
-            "styl_artystyczny": {"required": False, "allow_null": True},
-            "kompozycja": {"required": False, "allow_null": True},
-            "kolorystyka": {"required": False, "allow_null": True},
-            "atmosfera": {"required": False, "allow_null": True},
-            "inspiracja": {"required": False, "allow_null": True},
-            "tlo": {"required": False, "allow_null": True},
-            "perspektywa": {"required": False, "allow_null": True},
-            "detale": {"required": False, "allow_null": True},
-            "realizm": {"required": False, "allow_null": True},
-            "styl_narracyjny": {"required": False, "allow_null": True},
         }
+
+    def get_thumbnail_url(self, obj):
+        return variant_url(obj, "thumbnail")
+
+    def get_medium_url(self, obj):
+        return variant_url(obj, "medium")
         
+class GenerateImageBatchSerializer(serializers.Serializer):
+    items = GenerateImageSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_ITEMS)
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GenerationJob
+        fields = ["id", "status", "params", "result", "error", "created_at", "started_at", "finished_at"]
+        read_only_fields = fields
+
 class CalendarMonthFieldTextSerializer(serializers.ModelSerializer):
     class Meta:
         model = CalendarMonthFieldText
@@ -419,8 +510,8 @@ class CalendarMonthFieldTextSerializer(serializers.ModelSerializer):
 class CalendarMonthFieldImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = CalendarMonthFieldImage
-        fields = ["id", "created_at", "author", "path", "positionX", "positionY", "size"]
-        read_only_fields = ["id", "created_at", "author"]
+        fields = ["id", "created_at", "author", "path", "upload_status", "positionX", "positionY", "size"]
+        read_only_fields = ["id", "created_at", "author", "upload_status"]
 
 class CalendarYearDataSerializer(serializers.ModelSerializer):
     class Meta:
@@ -5,14 +5,20 @@ from .views.calendar_views import *
 from .views.image_views import *
 urlpatterns=[
 path('generate/', GenerateImage.as_view(), name='generate-image'),
+path('generate-stream/', GenerateImageStreamView.as_view(), name='generate-image-stream'),
+path('generate-batch/', GenerationBatchCreateView.as_view(), name='generation-batch-create'),
+path('generate-jobs/', GenerationJobCreateView.as_view(), name='generation-job-create'),
+path('generate-jobs/<uuid:pk>/', GenerationJobDetailView.as_view(), name='generation-job-detail'),
 path("images-by-project/<str:project_name>/", ImagesByProjectView.as_view()),
 path("calendar-download/<int:pk>/", DownloadCalendarStaffView.as_view(), name='download-calendar-staff'),
+path("calendar-download/bulk/", BulkDownloadCalendarStaffView.as_view(), name='download-calendar-staff-bulk'),
     path("user/update-profile/", ProfileUpdateView.as_view(), name="update-profile"),
     path("user/change-email/", EmailUpdateView.as_view(), name="change-email"),
     path("user/change-password/",PasswordChangeView.as_view(), name="change-password"),
     path("user/update-profile-image/", UpdateProfileImageView.as_view(), name="update-profile-image"),
     path("calendars/", CalendarCreateView.as_view(), name="calendar-create"),
     path("calendar/<int:pk>/", CalendarUpdateView.as_view(), name="calendar-update"),
+    path("calendar/<int:pk>/autosave/", CalendarAutosaveView.as_view(), name="calendar-autosave"),
     path("calendar-destroy/<int:pk>/", CalendarDetailView.as_view(), name="calendar-detail"),
     path("calendar-print/", CalendarPrint.as_view(), name="calendar-print"),
     path("production/", CalendarProductionList.as_view(), name="calendar-production"),
@@ -20,6 +26,7 @@ path("calendar-download/<int:pk>/", DownloadCalendarStaffView.as_view(), name='d
 
     path("production-staff/", CalendarProductionStaffList.as_view(), name="production-staff-list"),
     path("production-staff/<int:pk>/", StaffCalendarProductionRetrieveUpdate.as_view(), name="staff-production-detail"),
+    path("production-staff/run/", ProductionBatchRunView.as_view(), name="staff-production-run"),
 
 
     path("calendar-by-project/<str:project_name>/", CalendarByProjectView.as_view(),name="calendar-by-project"),
@@ -30,6 +37,8 @@ path("calendar-download/<int:pk>/", DownloadCalendarStaffView.as_view(), name='d
     path("image-search/", ImageSearchBarView.as_view(), name="image-search"),
 
 
+    path('taxonomies/', TaxonomyAllView.as_view(), name='taxonomy-all'),
+
     path('styl_artystyczny/', StylArtystycznyCreate.as_view(), name='styl-artystyczny-list'),
     path('styl_artystyczny/<int:pk>/', StylArtystycznyDetail.as_view(), name='styl-artystyczny-detail'),
 
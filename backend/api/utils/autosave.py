@@ -0,0 +1,197 @@
+import threading
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+from ..models import (
+    Calendar,
+    CalendarYearData,
+    CalendarMonthFieldText,
+    CalendarMonthFieldImage,
+    BottomImage,
+    BottomColor,
+    BottomGradient,
+)
+
+# Pola, ktore edytor moze zmieniac przez autosave (per model)
+EDITABLE_FIELDS = {
+    Calendar: ["name", "top_image"],
+    CalendarYearData: ["text", "font", "weight", "size", "color", "positionX", "positionY"],
+    CalendarMonthFieldText: ["text", "font", "weight", "color", "size"],
+    CalendarMonthFieldImage: ["path", "positionX", "positionY", "size"],
+    BottomImage: ["image"],
+    BottomColor: ["color"],
+    BottomGradient: ["start_color", "end_color", "direction", "theme"],
+}
+
+TARGETS = ["calendar", "year_data", "field1", "field2", "field3", "bottom"]
+
+
+class AutosaveConflict(Exception):
+    """
+    Wersja podana przez klienta nie zgadza sie z aktualna wersja kalendarza.
+    """
+
+    def __init__(self, current_version):
+        super().__init__(f"Konflikt wersji (aktualna: {current_version})")
+        self.current_version = current_version
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.outcomes = []
+        self.error = None
+        self.done = threading.Event()
+
+
+_lock = threading.Lock()
+# patche czekajace na zapis i kalendarze, ktorych zapis wlasnie trwa
+_pending_batches = {}
+_flushing = set()
+
+
+def _resolve_targets(calendar):
+    """
+    Mapuje nazwy celow patcha na (model, id) bez ladowania obiektow pol.
+    """
+    targets = {"calendar": (Calendar, calendar.id)}
+    if calendar.year_data_id:
+        targets["year_data"] = (CalendarYearData, calendar.year_data_id)
+
+    for name in ("field1", "field2", "field3", "bottom"):
+        ct_id = getattr(calendar, f"{name}_content_type_id")
+        object_id = getattr(calendar, f"{name}_object_id")
+        if ct_id and object_id:
+            targets[name] = (ContentType.objects.get_for_id(ct_id).model_class(), object_id)
+    return targets
+
+
+def _validate(patches, targets):
+    """
+    Sprawdza patche (cel, dozwolone pola, walidatory pol modelu) i zwraca {cel: {kolumna: wartosc}}.
+    """
+    updates = {}
+    for target, values in patches.items():
+        if target not in targets:
+            raise ValidationError({target: "Nieznany lub nieistniejący element kalendarza"})
+        if not isinstance(values, dict):
+            raise ValidationError({target: "Oczekiwano obiektu z polami"})
+
+        model, _ = targets[target]
+        allowed = EDITABLE_FIELDS.get(model, [])
+        columns = {}
+        for name, value in values.items():
+            if name not in allowed:
+                raise ValidationError({target: f"Pole '{name}' nie może być zmieniane"})
+            try:
+                field = model._meta.get_field(name)
+                value = field.clean(value, None)
+            except FieldDoesNotExist:
+                raise ValidationError({target: f"Nieznane pole '{name}'"})
+            except DjangoValidationError as e:
+                raise ValidationError({f"{target}.{name}": list(e.messages)})
+            columns[field.attname] = value
+        updates[target] = columns
+    return updates
+
+
+def _apply_batch(calendar_id, items):
+    """
+    Stosuje w jednej transakcji wszystkie patche zebrane w partii, w kolejnosci nadejscia.
+    Kazdy przyjety patch podbija wersje o 1, wiec nastepny patch musi nosic juz te nowa wersje -
+    dwa patche wyslane z ta sama wersja to konflikt (AutosaveConflict dla drugiego), jak przy osobnych zapisach.
+    Zwraca wynik per patch: nowa wersja albo wyjatek.
+    """
+    outcomes = []
+    with transaction.atomic():
+        calendar = Calendar.objects.select_for_update().get(id=calendar_id)
+        targets = _resolve_targets(calendar)
+
+        version = calendar.version
+        merged = {}
+        for client_version, patches in items:
+            if client_version != version:
+                outcomes.append(AutosaveConflict(version))
+                continue
+            try:
+                updates = _validate(patches, targets)
+            except ValidationError as e:
+                outcomes.append(e)
+                continue
+            for target, columns in updates.items():
+                merged.setdefault(target, {}).update(columns)
+            version += 1
+            outcomes.append(version)
+
+        if version == calendar.version:
+            return outcomes
+
+        for target, columns in merged.items():
+            model, pk = targets[target]
+            if target != "calendar" and columns:
+                model.objects.filter(id=pk).update(**columns)
+
+        Calendar.objects.filter(id=calendar_id).update(version=version, **merged.get("calendar", {}))
+
+    return outcomes
+
+
+def _flush(calendar_id, background=False):
+    """
+    Zapisuje czekajaca partie kalendarza. Patche, ktore przyszly w trakcie zapisu, czekaja na kolejna
+    partie - zapisuje ja timer po AUTOSAVE_COALESCE_SECONDS (watek timera zamyka potem swoje polaczenie z baza).
+    """
+    with _lock:
+        batch = _pending_batches.pop(calendar_id, None)
+        if batch is None:
+            _flushing.discard(calendar_id)
+            return
+        _flushing.add(calendar_id)
+
+    try:
+        batch.outcomes = _apply_batch(calendar_id, batch.items)
+    except Exception as e:
+        batch.error = e
+    finally:
+        batch.done.set()
+        with _lock:
+            if calendar_id in _pending_batches:
+                timer = threading.Timer(
+                    getattr(settings, "AUTOSAVE_COALESCE_SECONDS", 0.15), _flush, args=(calendar_id, True)
+                )
+                timer.daemon = True
+                timer.start()
+            else:
+                _flushing.discard(calendar_id)
+        if background:
+            connection.close()
+
+
+def submit_autosave(calendar_id, version, patches):
+    """
+    Zapisuje patche autosave'u kalendarza i zwraca nowa wersje.
+    Gdy dla kalendarza nie trwa zaden zapis, patch jest zapisywany od razu (bez czekania). Patche, ktore
+    przyjda w trakcie zapisu (w tym samym procesie), sa laczone w jedna partie zapisywana po jego koncu.
+    """
+    with _lock:
+        batch = _pending_batches.get(calendar_id)
+        if batch is None:
+            batch = _Batch()
+            _pending_batches[calendar_id] = batch
+        index = len(batch.items)
+        batch.items.append((version, patches))
+        flush_now = calendar_id not in _flushing
+        if flush_now:
+            _flushing.add(calendar_id)
+
+    if flush_now:
+        _flush(calendar_id)
+    batch.done.wait()
+
+    if batch.error:
+        raise batch.error
+    if isinstance(batch.outcomes[index], Exception):
+        raise batch.outcomes[index]
+    return batch.outcomes[index]
@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def get_executor(name, max_workers=None):
+    """
+    Zwraca wspoldzielona (per proces) pule watkow o danej nazwie, tworzac ja przy pierwszym uzyciu.
+    Rozmiar puli mozna nadpisac w settings.BACKGROUND_WORKERS[name].
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(name)
+            if executor is None:
+                configured = getattr(settings, "BACKGROUND_WORKERS", {}).get(name)
+                executor = ThreadPoolExecutor(
+                    max_workers=configured or max_workers or 4,
+                    thread_name_prefix=f"bg-{name}",
+                )
+                _executors[name] = executor
+    return executor
+
+
+def run_with_db(func, *args, **kwargs):
+    """
+    Uruchamia funkcje w watku tla, zamykajac przeterminowane polaczenia DB przed i po wykonaniu.
+    """
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def submit(name, func, *args, **kwargs):
+    """
+    Zleca `func` do puli `name`; funkcja moze korzystac z ORM.
+    """
+    return get_executor(name).submit(run_with_db, func, *args, **kwargs)
+
+
+def init_django_process():
+    """
+    Initializer procesu roboczego ProcessPoolExecutor (start "spawn"): konfiguruje Django, zanim proces
+    odczyta pierwsze zadanie. Modul nie importuje modeli, wiec mozna go zaladowac przed django.setup().
+    """
+    import django
+    django.setup()
@@ -6,5 +6,22 @@ from .pdf_generator import generate_header, generate_backing, generate_calendar
 
 from .fonts import get_font_path, load_font
 from .images import load_image_robust
-from .pdf_utils import rgb_to_cmyk, save_as_pdf,hex_to_rgb
-from .file_utils import create_export_folder
+from .pdf_utils import rgb_to_cmyk, save_as_pdf,hex_to_rgb, encode_page, write_page_pdf
+from .file_utils import create_export_folder, export_path
+from .packaging import build_package, ensure_package, folder_fingerprint, bulk_package_files
+from .checkpoints import JobCheckpoints
+from .idempotency import PrintInProgress, production_lock, remember_result, run_once
+from .imposition import impose_pages, impose_production
+from .pdf_writer import PdfImage, PdfPage, PdfWriter
+from .pdf_vector import VectorLayer, embed_font
+from .production import (
+    ProductionError,
+    CalendarNotFound,
+    render_production,
+    mark_production_done,
+    production_quantities,
+    impose_sheets,
+    claim_productions,
+    run_production_batch,
+    print_result,
+)
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import uuid
+
+MANIFEST_NAME = "manifest.json"
+
+# katalog zadania druku produkcji w CALENDAR_TEMP_ROOT (janitor trzyma go dluzej niz zwykle katalogi robocze)
+JOB_PREFIX = "job_"
+
+
+def inputs_fingerprint(inputs):
+    """
+    Skrot danych wejsciowych renderu (pola kalendarza, rok, tlo) - zmiana kalendarza uniewaznia punkty kontrolne.
+    """
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class JobCheckpoints:
+    """
+    Punkty kontrolne zadania druku w jego katalogu roboczym: manifest.json z wynikiem kazdego zakonczonego
+    etapu (dane i pobrane zasoby, upscale, strony PDF) i lista plikow, od ktorych ten wynik zalezy.
+    Ponowione zadanie tej samej produkcji pomija etapy z waznym wpisem; etap z brakujacym plikiem
+    liczy sie jako niewykonany. Manifest i strony zapisywane atomowo - przerwany zapis nie psuje stanu.
+    """
+
+    def __init__(self, job_dir, fingerprint):
+        self.job_dir = job_dir
+        os.makedirs(job_dir, exist_ok=True)
+        self.manifest = self._load()
+        if self.manifest.get("fingerprint") != fingerprint:
+            if self.manifest.get("stages"):
+                print(f"♻️ Kalendarz zmieniony od poprzedniej próby — punkty kontrolne od nowa ({job_dir})")
+                self._clear()
+            self.manifest = {"fingerprint": fingerprint, "stages": {}}
+            self._write()
+        elif self.manifest.get("stages"):
+            print(f"♻️ Wznowienie zadania druku: gotowe etapy {', '.join(self.manifest['stages'])}")
+
+    def _load(self):
+        try:
+            with open(self.path(MANIFEST_NAME), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        target = self.path(MANIFEST_NAME)
+        temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, default=str)
+        os.replace(temp_path, target)
+
+    def _clear(self):
+        with os.scandir(self.job_dir) as it:
+            for entry in it:
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+
+    def path(self, name):
+        return os.path.join(self.job_dir, name)
+
+    def get(self, stage):
+        """
+        Wynik zakonczonego etapu albo None (etap niewykonany albo brakuje ktoregos z jego plikow).
+        """
+        entry = self.manifest["stages"].get(stage)
+        if entry is None or not all(os.path.exists(path) for path in entry["files"]):
+            return None
+        return entry["value"]
+
+    def save(self, stage, value, files=()):
+        self.manifest["stages"][stage] = {"value": value, "files": [path for path in files if path]}
+        self._write()
+
+    def save_page(self, stage, page):
+        """
+        Zakodowana strona (PdfPage) etapu - impozycja wznowionego zadania nie musi renderowac jej od nowa.
+        """
+        target = self.path(f"{stage}.page")
+        temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(page, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, target)
+        return target
+
+    def load_page(self, stage):
+        with open(self.path(f"{stage}.page"), "rb") as f:
+            return pickle.load(f)
+
+    def finish(self):
+        """
+        Zadanie zakonczone - katalog roboczy z punktami kontrolnymi nie jest juz potrzebny.
+        """
+        shutil.rmtree(self.job_dir, ignore_errors=True)
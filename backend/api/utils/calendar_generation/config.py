@@ -22,3 +22,28 @@ AD_CONTENT_WIDTH = BOX_WIDTH
 BACKING_HEIGHT = 7290
 
 MONTH_NAMES = ["GRUDZIEŃ", "STYCZEŃ", "LUTY"]
+
+# spad (px przy 300 DPI) dookola formatu netto glowki i plecow
+BLEED = 120
+
+# arkusz drukarski do impozycji (B1) i znaczniki ciecia
+SHEET_WIDTH_MM = 700
+SHEET_HEIGHT_MM = 1000
+SHEET_MARGIN_MM = 10
+SHEET_GAP_MM = 10
+CROP_MARK_OFFSET_MM = 1
+CROP_MARK_LENGTH_MM = 3
+PDF_JPEG_QUALITY = 90
+
+# kompresja rastrow w PDF: "dct" (JPEG, PDF_JPEG_QUALITY), "flate" (bezstratnie, predyktor PNG)
+# lub "jpx" (bezstratny JPEG 2000). Plecy z tlem z koloru/gradientu sa glownie plaskie - Flate jest
+# tam wielokrotnie mniejszy od JPEG; zdjecia (glowka, tlo plecow z obrazu) - DCT.
+PDF_COMPRESSION = {
+    "header": "dct",
+    "backing": "flate",
+    "backing_photo": "dct",
+}
+
+# tekst (rok, pola) i ramki kalendariow jako wektor PDF z osadzonymi fontami z fonts/ nad rastrem tla;
+# False - wszystko rastrowane w 300 DPI jak dawniej
+PDF_VECTOR = True
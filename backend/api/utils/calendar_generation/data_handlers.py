@@ -1,14 +1,14 @@
 from PIL import Image
 import os
-import requests
 from ...models import GeneratedImage
+from ..storage import fetch_to_local
 from .pdf_utils import hex_to_rgb
 from .gradients import generate_bottom_bg_image
 
 def handle_field_data(field_obj, field_number, export_dir):
     """
     Ekstrakcja i przygotowanie danych z Pola Reklamowego (tekst lub obrazek). 
-    Pobiera bezprosrednio zasoby webowe do lokalnego folderu eksportu i zwraca ustandaryzowany slownik z wlasciwosciami elementu.
+    Pobiera zasoby webowe do lokalnego folderu eksportu (pliki z lokalnego magazynu uzywa wprost) i zwraca ustandaryzowany slownik z wlasciwosciami elementu.
     """
     if not field_obj:
         return None
@@ -25,26 +25,13 @@ def handle_field_data(field_obj, field_number, export_dir):
             "size": getattr(field_obj, "size", 1.0),
         }
 
-        if export_dir and image_source.startswith(("http://", "https://")):
-            try:
-                original_name = os.path.basename(image_source.split("?")[0])
-                if not original_name: original_name = "image.png"
-                
-                filename = f"field{field_number}_{original_name}"
-                dest_path = os.path.join(export_dir, filename)
-
-                response = requests.get(image_source, stream=True, timeout=10)
-                if response.status_code == 200:
-                    with open(dest_path, "wb") as f:
-                        for chunk in response.iter_content(1024):
-                            f.write(chunk)
-                    
-                    result["image_url"] = dest_path
-                else:
-                    print(f"Blad pobierania pola {field_number}: HTTP {response.status_code}")
-            
-            except Exception as e:
-                print(f"Wyjatek przy pobieraniu pola {field_number}: {e}")
+        if export_dir:
+            original_name = os.path.basename(image_source.split("?")[0]) or "image.png"
+            local_source = fetch_to_local(image_source, export_dir, f"field{field_number}_{original_name}", timeout=10)
+            if local_source:
+                result["image_url"] = local_source
+            else:
+                print(f"Blad pobierania pola {field_number}: {image_source}")
 
         return result
 
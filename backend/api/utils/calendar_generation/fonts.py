@@ -1,6 +1,9 @@
 import os
+import threading
 from PIL import ImageFont
 
+_cache = threading.local()
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FONTS_DIR = os.path.join(BASE_DIR, "fonts")
 
@@ -31,6 +34,18 @@ def get_font_path(font_name):
     return font_path
 
 def load_font(name_or_path, size):
+    """
+    Czcionka z cache watku - plecy ladowaly ten sam font dla kazdej siatki i paska, a proces roboczy
+    produkcji seryjnej renderuje wiele kalendarzy. Obiekty FreeType nie sa wspoldzielone miedzy watkami.
+    """
+    fonts = _cache.__dict__.setdefault("fonts", {})
+    key = (name_or_path, size)
+    if key not in fonts:
+        fonts[key] = _load_font(name_or_path, size)
+    return fonts[key]
+
+
+def _load_font(name_or_path, size):
     """
     Kaskadowo stara sie zaladowac obiekt czcionki z TrueType z biblioteki PIL.
     Pozwala ominac problem rozszerzen i wielkosci znakow, oferujac inteligentny mechanizm awaryjnego (fallback) ladowania Ariala, by nie zepsuc zapisu zadania generatora kalendarzy (w wypadku awarii zewnetrznego fontu). 
@@ -0,0 +1,164 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from ...models import CalendarProduction
+
+RESULT_KEY = "print-result:{}"
+# klucz obejmuje tez kalendarz - ten sam Idempotency-Key z innym id_kalendarz to inne zadanie
+IDEMPOTENCY_KEY = "print-idempotency:{}:{}:{}"
+
+
+class PrintInProgress(RuntimeError):
+    """
+    Produkcja jest renderowana przez inne zadanie, a jego wynik nie pojawil sie w czasie oczekiwania.
+    """
+
+
+def _config():
+    defaults = {"lock_seconds": 1800, "result_seconds": 86400, "wait_seconds": 600, "poll_seconds": 1.0}
+    defaults.update(getattr(settings, "PRINT_JOBS", {}))
+    return defaults
+
+
+def acquire_lock(production_id, token):
+    """
+    Blokada renderu produkcji: warunkowy UPDATE wiersza (atomowy w bazie, wiec dziala miedzy procesami
+    i hostami). Trzymana blokada jest przedluzana (_keep_alive), wiec wygasa po `lock_seconds` tylko wtedy,
+    gdy proces zginal w trakcie renderu - nie blokuje wtedy produkcji na zawsze.
+    Produkcja, ktorej nie ma w bazie, nie ma czego chronic - zwraca True.
+    """
+    now = timezone.now()
+    updated = (
+        CalendarProduction.objects
+        .filter(id=production_id)
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        .update(lock_token=token, locked_until=now + timedelta(seconds=_config()["lock_seconds"]))
+    )
+    return bool(updated) or not CalendarProduction.objects.filter(id=production_id).exists()
+
+
+def renew_lock(production_id, token):
+    CalendarProduction.objects.filter(id=production_id, lock_token=token).update(
+        locked_until=timezone.now() + timedelta(seconds=_config()["lock_seconds"])
+    )
+
+
+@contextmanager
+def _keep_alive(production_id, token):
+    """
+    Dopoki render trwa, watek pomocniczy przedluza blokade co 1/3 `lock_seconds` - wygasa ona tylko
+    po smierci procesu, a nie dlatego, ze render (upscaling 8x, impozycja) trwa dluzej niz `lock_seconds`.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(_config()["lock_seconds"] / 3):
+                renew_lock(production_id, token)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def release_lock(production_id, token):
+    CalendarProduction.objects.filter(id=production_id, lock_token=token).update(lock_token="", locked_until=None)
+
+
+def remember_result(production_id, calendar_id, result):
+    """
+    Zapisuje wynik zakonczonego renderu produkcji - zadanie czekajace na blokade oddaje go zamiast renderowac
+    (tylko gdy dotyczy tego samego kalendarza).
+    """
+    cache.set(
+        RESULT_KEY.format(production_id),
+        {"finished_at": time.time(), "calendar_id": str(calendar_id), "result": result},
+        timeout=_config()["result_seconds"],
+    )
+
+
+@contextmanager
+def production_lock(production_id):
+    """
+    `with production_lock(id) as acquired:` - renderuj tylko, gdy `acquired`; blokada przedluzana w trakcie
+    i zwalniana na wyjsciu.
+    """
+    token = uuid.uuid4().hex
+    acquired = acquire_lock(production_id, token)
+    if not acquired:
+        yield False
+        return
+    try:
+        with _keep_alive(production_id, token):
+            yield True
+    finally:
+        release_lock(production_id, token)
+
+
+def run_once(production_id, calendar_id, idempotency_key, func):
+    """
+    Wykonuje `func()` (render produkcji zwracajacy slownik wyniku) najwyzej raz naraz dla produkcji:
+    - powtorzony `idempotency_key` (dla tej samej produkcji i kalendarza) dostaje zapisany wynik bez renderu,
+    - zadanie, ktore trafi na trwajacy render tej produkcji, czeka na jego koniec (do `wait_seconds`)
+      i oddaje jego wynik zamiast renderowac drugi raz; po przekroczeniu czasu - PrintInProgress.
+    Zwraca (wynik, czy_powtorzony). Zapisywane sa tylko udane wyniki - blad mozna ponowic.
+    """
+    config = _config()
+    idempotency_cache_key = (
+        IDEMPOTENCY_KEY.format(production_id, calendar_id, idempotency_key) if idempotency_key else None
+    )
+
+    if idempotency_cache_key:
+        cached = cache.get(idempotency_cache_key)
+        if cached is not None:
+            print(f"♻️ Powtórzone żądanie druku (produkcja {production_id}) — wynik z pamięci")
+            return cached, True
+
+    if production_id is None:
+        return func(), False
+
+    arrived = time.time()
+    token = uuid.uuid4().hex
+    waited = False
+    deadline = arrived + config["wait_seconds"]
+    while not acquire_lock(production_id, token):
+        if not waited:
+            print(f"⏳ Produkcja {production_id} jest już renderowana — czekam na wynik")
+            waited = True
+        if time.time() > deadline:
+            raise PrintInProgress(f"Produkcja {production_id} jest wciąż renderowana")
+        time.sleep(config["poll_seconds"])
+
+    try:
+        if waited:
+            cached = cache.get(idempotency_cache_key) if idempotency_cache_key else None
+            last = cache.get(RESULT_KEY.format(production_id))
+            if (
+                cached is None and last and last["finished_at"] >= arrived
+                and last.get("calendar_id") == str(calendar_id)
+            ):
+                cached = last["result"]
+            if cached is not None:
+                return cached, True
+
+        with _keep_alive(production_id, token):
+            result = func()
+        remember_result(production_id, calendar_id, result)
+        if idempotency_cache_key:
+            cache.set(idempotency_cache_key, result, timeout=config["result_seconds"])
+        return result, False
+    finally:
+        release_lock(production_id, token)
@@ -2,6 +2,7 @@ import os
 import requests
 from io import BytesIO
 from PIL import Image
+from ..storage import local_path as stored_file_path
 
 def load_image_robust(path_or_url):
     """
@@ -13,6 +14,12 @@ def load_image_robust(path_or_url):
         return None
 
     try:
+        # plik z lokalnego magazynu - bez sieci
+        stored_path = stored_file_path(path_or_url)
+        if stored_path:
+            image = Image.open(stored_path)
+            return image.convert("RGBA")
+
         # URL
         if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
             print(f"Pobieranie URL: {path_or_url[:50]}...")
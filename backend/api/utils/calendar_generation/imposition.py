@@ -0,0 +1,120 @@
+import math
+import os
+from .config import (BLEED, SHEET_WIDTH_MM, SHEET_HEIGHT_MM, SHEET_MARGIN_MM, SHEET_GAP_MM,
+                     CROP_MARK_OFFSET_MM, CROP_MARK_LENGTH_MM)
+from .pdf_writer import PdfPage, PdfWriter, mm_to_pt, px_to_pt
+
+
+def sheet_layout(page_width, page_height):
+    """
+    Rozklad uzytkow na arkuszu (pt): wybiera orientacje arkusza mieszczaca wiecej kopii i centruje siatke.
+    Zwraca (szerokosc_arkusza, wysokosc_arkusza, [(x, y), ...]) - lewe dolne rogi uzytkow ze spadem.
+    """
+    margin = mm_to_pt(SHEET_MARGIN_MM)
+    gap = mm_to_pt(SHEET_GAP_MM)
+    best = None
+    for sheet_width, sheet_height in (
+        (mm_to_pt(SHEET_WIDTH_MM), mm_to_pt(SHEET_HEIGHT_MM)),
+        (mm_to_pt(SHEET_HEIGHT_MM), mm_to_pt(SHEET_WIDTH_MM)),
+    ):
+        cols = int((sheet_width - 2 * margin + gap) // (page_width + gap))
+        rows = int((sheet_height - 2 * margin + gap) // (page_height + gap))
+        if cols > 0 and rows > 0 and (best is None or cols * rows > best[2] * best[3]):
+            best = (sheet_width, sheet_height, cols, rows)
+
+    if best is None:
+        raise ValueError("Użytek nie mieści się na arkuszu drukarskim")
+
+    sheet_width, sheet_height, cols, rows = best
+    left = (sheet_width - (cols * page_width + (cols - 1) * gap)) / 2
+    bottom = (sheet_height - (rows * page_height + (rows - 1) * gap)) / 2
+    # kolejnosc jak przy czytaniu: od gory, od lewej
+    positions = [
+        (left + col * (page_width + gap), bottom + (rows - 1 - row) * (page_height + gap))
+        for row in range(rows)
+        for col in range(cols)
+    ]
+    return sheet_width, sheet_height, positions
+
+
+def crop_marks(x, y, width, height, bleed):
+    """
+    Operatory rysujace znaczniki ciecia w rogach formatu netto (poza spadem uzytku).
+    """
+    offset = mm_to_pt(CROP_MARK_OFFSET_MM)
+    length = mm_to_pt(CROP_MARK_LENGTH_MM)
+    left, right = x + bleed, x + width - bleed
+    bottom, top = y + bleed, y + height - bleed
+    lines = []
+    for trim_x, outer_x, direction_x in ((left, x, -1), (right, x + width, 1)):
+        for trim_y, outer_y, direction_y in ((bottom, y, -1), (top, y + height, 1)):
+            start_x = outer_x + direction_x * offset
+            lines.append((start_x, trim_y, start_x + direction_x * length, trim_y))
+            start_y = outer_y + direction_y * offset
+            lines.append((trim_x, start_y, trim_x, start_y + direction_y * length))
+    return "".join(f"{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S\n" for x1, y1, x2, y2 in lines)
+
+
+def impose_pages(items, output_path, bleed=BLEED):
+    """
+    Impozycja: uklada kopie uzytkow (lista (PdfPage lub PdfImage, liczba_kopii) o jednym formacie - np.
+    N kopii glowki albo glowki roznych kalendarzy) na arkuszach SHEET_* ze znacznikami ciecia.
+    Kazda strona jest osadzona w pliku raz (Form XObject z rastrem i warstwa wektorowa), a identyczne
+    arkusze wspoldziela jeden strumien tresci, wiec rozmiar pliku nie rosnie z liczba kopii. Zwraca sciezke PDF.
+    """
+    items = [(page if isinstance(page, PdfPage) else PdfPage(page), copies) for page, copies in items if copies > 0]
+    if not items:
+        return None
+
+    width_px, height_px = items[0][0].width, items[0][0].height
+    if any((page.width, page.height) != (width_px, height_px) for page, _ in items):
+        raise ValueError("Impozycja wymaga użytków o jednym formacie")
+
+    page_width, page_height = px_to_pt(width_px), px_to_pt(height_px)
+    sheet_width, sheet_height, positions = sheet_layout(page_width, page_height)
+    bleed_pt = px_to_pt(bleed)
+
+    writer = PdfWriter()
+    xobjects = {
+        f"Fm{index}": writer.add_form(page_width, page_height, *page.render(writer))
+        for index, (page, _) in enumerate(items)
+    }
+
+    slots = [f"Fm{index}" for index, (_, copies) in enumerate(items) for _ in range(copies)]
+    contents = {}
+    for start in range(0, len(slots), len(positions)):
+        sheet = tuple(slots[start:start + len(positions)])
+        content = contents.get(sheet)
+        if content is None:
+            ops = []
+            for name, (x, y) in zip(sheet, positions):
+                ops.append(f"q 1 0 0 1 {x:.4f} {y:.4f} cm /{name} Do Q\n")
+            # znaczniki w kolorze rejestracyjnym (100% wszystkich farb)
+            ops.append("q 0.25 w 1 1 1 1 K\n")
+            ops.extend(crop_marks(x, y, page_width, page_height, bleed_pt) for _, (x, y) in zip(sheet, positions))
+            ops.append("Q\n")
+            content = contents[sheet] = writer.add_stream({}, "".join(ops).encode("latin-1"))
+        writer.add_page(sheet_width, sheet_height, content, xobjects)
+
+    writer.write(output_path)
+    sheets = math.ceil(len(slots) / len(positions))
+    print(f"Impozycja: {len(slots)} kopii na {sheets} ark. ({len(positions)}/ark.) -> {output_path}")
+    return output_path
+
+
+def impose_production(pages, export_dir, production_id, quantity):
+    """
+    Arkusze drukarskie produkcji o nakladzie `quantity` > 1: osobny PDF dla glowek i dla plecow
+    (`pages` to strony PdfPage z generate_calendar). Zwraca {"header_sheets": ..., "backing_sheets": ...}.
+    """
+    result = {}
+    if not quantity or quantity < 2:
+        return result
+    for key, image in pages.items():
+        output_path = os.path.join(export_dir, f"{key}_{production_id}_sheets.pdf")
+        try:
+            result[f"{key}_sheets"] = impose_pages([(image, quantity)], output_path)
+        except Exception as e:
+            print(f"Blad impozycji ({key}): {e}")
+            result[f"{key}_sheets"] = None
+    return result
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import uuid
+import zipfile
+from ..downloads import compress_type
+from .file_utils import export_path
+
+PACKAGE_DIR = "_package"
+MANIFEST_NAME = "manifest.json"
+
+
+def package_files(export_dir):
+    """
+    Pliki wchodzace do paczki: pliki z folderu eksportu bez podkatalogow (paczka lezy w _package/).
+    """
+    if not os.path.isdir(export_dir):
+        return []
+    with os.scandir(export_dir) as it:
+        return sorted((entry.name, entry.path) for entry in it if entry.is_file())
+
+
+def folder_fingerprint(export_dir):
+    """
+    Odcisk folderu eksportu z nazw, rozmiarow i czasow modyfikacji plikow - tani (bez czytania tresci),
+    zmienia sie przy kazdym ponownym renderze, kopii albo impozycji.
+    """
+    digest = hashlib.sha256()
+    for name, path in package_files(export_dir):
+        stat = os.stat(path)
+        digest.update(f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(production_id):
+    """
+    Manifest paczki z dopisana sciezka archiwum (`path`) albo None.
+    """
+    package_dir = os.path.join(export_path(production_id), PACKAGE_DIR)
+    try:
+        with open(os.path.join(package_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    manifest["path"] = os.path.join(package_dir, manifest.get("file_name", ""))
+    return manifest
+
+
+def build_package(production_id):
+    """
+    Buduje paczke ZIP folderu eksportu produkcji w <folder>/_package/ (zapis atomowy) z manifestem:
+    odcisk folderu, sha256 i rozmiar archiwum. PDF-y sa tylko przechowywane (ZIP_STORED), reszta kompresowana.
+    Zwraca manifest albo None, gdy folder jest pusty.
+    """
+    export_dir = export_path(production_id)
+    files = package_files(export_dir)
+    if not files:
+        return None
+
+    fingerprint = folder_fingerprint(export_dir)
+    package_dir = os.path.join(export_dir, PACKAGE_DIR)
+    os.makedirs(package_dir, exist_ok=True)
+    file_name = f"calendar_{production_id}_package.zip"
+    zip_path = os.path.join(package_dir, file_name)
+
+    temp_path = f"{zip_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, path in files:
+                archive.write(path, arcname=name, compress_type=compress_type(name))
+        os.replace(temp_path, zip_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    manifest = {
+        "fingerprint": fingerprint,
+        "sha256": _file_sha256(zip_path),
+        "size": os.path.getsize(zip_path),
+        "file_name": file_name,
+        "files": [name for name, _ in files],
+    }
+    manifest_path = os.path.join(package_dir, MANIFEST_NAME)
+    temp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, manifest_path)
+
+    manifest["path"] = zip_path
+    print(f"📦 Paczka produkcji {production_id}: {zip_path} ({manifest['size'] // 1024} KB)")
+    return manifest
+
+
+def ensure_package(production_id):
+    """
+    Gotowa paczka produkcji: z manifestu, jesli folder eksportu sie nie zmienil od budowy, inaczej budowana
+    od nowa. None, gdy folder nie istnieje albo jest pusty.
+    """
+    manifest = read_manifest(production_id)
+    if (
+        manifest
+        and os.path.isfile(manifest["path"])
+        and manifest.get("fingerprint") == folder_fingerprint(export_path(production_id))
+    ):
+        return manifest
+    return build_package(production_id)
+
+
+def bulk_package_files(production_ids):
+    """
+    Pliki wielu produkcji do jednego archiwum: [(calendar_<id>/<plik>, sciezka)] w kolejnosci `production_ids`
+    i lista produkcji bez plikow.
+    """
+    files, missing = [], []
+    for production_id in production_ids:
+        folder_files = package_files(export_path(production_id))
+        if not folder_files:
+            missing.append(production_id)
+        files.extend((f"calendar_{production_id}/{name}", path) for name, path in folder_files)
+    return files, missing
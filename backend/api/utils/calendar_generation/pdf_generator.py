@@ -1,18 +1,21 @@
 import os
-import requests
-import shutil
-from io import BytesIO
 from PIL import Image, ImageDraw, ImageOps
 from .config import (HEADER_WIDTH, HEADER_HEIGHT, BACKING_WIDTH, BACKING_HEIGHT,
-                     H_CONNECT, H_MONTH_BOX, BOX_X, BOX_WIDTH, AD_PADDING_X, AD_CONTENT_WIDTH)
+                     H_CONNECT, H_MONTH_BOX, BOX_X, BOX_WIDTH, AD_PADDING_X, AD_CONTENT_WIDTH, PDF_COMPRESSION,
+                     PDF_VECTOR)
 from .fonts import load_font
-from .pdf_utils import save_as_pdf
+from .pdf_utils import encode_page, rgb_to_cmyk, write_page_pdf
+from .pdf_vector import VectorLayer
+from .pdf_writer import PdfPage
 from .file_utils import create_export_folder
+from .images import load_image_robust
 
-def generate_header(top_image_path, data, export_dir, production_id=None):
+def generate_header(top_image_path, data, export_dir, production_id=None, pages=None):
     """
     Klonuje i skaluje obraz glowki, aplikuje na niego tekst roku (jesli zostal przelazany) 
     z uwzglednieniem offsetow dla spadow, a nastepnie eksportuje gotowy plik jako PDF (CMYK).
+    Przy PDF_VECTOR rok jest tekstem wektorowym z osadzonym fontem nad rastrem zdjecia.
+    Gdy podano slownik `pages`, zapisuje w nim zakodowana strone (do impozycji).
     """
     year_data = data.get("year_data") or data.get("year")
 
@@ -34,6 +37,7 @@ def generate_header(top_image_path, data, export_dir, production_id=None):
                 (HEADER_WIDTH, HEADER_HEIGHT),
                 method=Image.Resampling.LANCZOS,  
             )
+            vector = VectorLayer(HEADER_WIDTH, HEADER_HEIGHT) if PDF_VECTOR else None
 
             if year_data:
                 draw = ImageDraw.Draw(img_fitted)
@@ -66,17 +70,23 @@ def generate_header(top_image_path, data, export_dir, production_id=None):
                     f"Poz: ({pos_x}, {pos_y})"
                 )
 
-                draw.text(
-                    (pos_x, pos_y),
-                    text_content,
-                    font=font,
-                    fill=text_color,
-                    stroke_width=stroke_w,
-                    stroke_fill=text_color,
-                )
+                if not (vector and vector.text((pos_x, pos_y), text_content, font, text_color, stroke_w)):
+                    draw.text(
+                        (pos_x, pos_y),
+                        text_content,
+                        font=font,
+                        fill=text_color,
+                        stroke_width=stroke_w,
+                        stroke_fill=text_color,
+                    )
 
-            img_rgb = img_fitted.convert("RGB")
-            saved_path = save_as_pdf(img_rgb, output_path)
+            page = PdfPage(
+                encode_page(rgb_to_cmyk(img_fitted.convert("RGB")), PDF_COMPRESSION["header"]),
+                vector,
+            )
+            saved_path = write_page_pdf(page, output_path)
+            if pages is not None:
+                pages["header"] = page
 
             print(f"Glowka: {saved_path} ({HEADER_WIDTH}x{HEADER_HEIGHT} px)")
             return saved_path
@@ -85,11 +95,13 @@ def generate_header(top_image_path, data, export_dir, production_id=None):
         print(f"Blad generowania glowki: {e}")
         return None
     
-def generate_backing(data, export_dir, production_id=None):
+def generate_backing(data, export_dir, production_id=None, pages=None):
     """
     Buduje caly dokument "plecow" kalendarza na bazie ustawien: tlo dolnej czesci, 
     trzy kalendaria, nakladanie pol tekstowych i obrazkowych predefiniowanych uzytkownika. 
     Gotowa plansze z odpowiednimi marginesami eksportuje do pliku PDF (CMYK).
+    Przy PDF_VECTOR ramki kalendariow i teksty pol sa wektorem nad rastrem (tlo i obrazki pol).
+    Gdy podano slownik `pages`, zapisuje w nim zakodowana strone (do impozycji).
     """
     bottom_data = data.get("bottom", {})
     template_image_path = bottom_data.get("image_path") if bottom_data else None
@@ -121,6 +133,9 @@ def generate_backing(data, export_dir, production_id=None):
             print("Brak tla plecow — biale tlo.")
 
         draw = ImageDraw.Draw(base_img)
+        vector = VectorLayer(BACKING_WIDTH, BACKING_HEIGHT) if PDF_VECTOR else None
+        # rysujacy ramki i siatki: wektor albo raster
+        canvas = vector or draw
 
         raw_fields = data.get("fields", {})
         y = H_CONNECT + 120
@@ -133,19 +148,20 @@ def generate_backing(data, export_dir, production_id=None):
         for i in range(1, 4):
             cal_y = y
 
-            draw.rectangle(
+            g_font = load_font("arial.ttf", 100)
+            # biala ramka wektorowa przykrylaby siatke narysowana rastrem - wtedy i ramka idzie rastrem
+            box_canvas = canvas if vector is None or vector.supports(g_font) else draw
+            box_canvas.rectangle(
                 [(BOX_X, cal_y), (BOX_X + BOX_WIDTH, cal_y + H_MONTH_BOX)],
                 fill="white", outline="#e5e7eb", width=5,
             )
 
             center_x = BOX_X + BOX_WIDTH / 2
-            g_font = load_font("arial.ttf", 100)
             g_text = "[Siatka dni]"
             gl, gt, gr, gb = draw.textbbox((0, 0), g_text, font=g_font)
-            draw.text(
-                (center_x - (gr - gl) / 2, cal_y + (H_MONTH_BOX - (gb - gt)) / 2 - gt),
-                g_text, font=g_font, fill="#9ca3af",
-            )
+            g_xy = (center_x - (gr - gl) / 2, cal_y + (H_MONTH_BOX - (gb - gt)) / 2 - gt)
+            if not (box_canvas is vector and vector.text(g_xy, g_text, g_font, "#9ca3af")):
+                draw.text(g_xy, g_text, font=g_font, fill="#9ca3af")
 
             ad_y = cal_y + H_MONTH_BOX + GAP_AFTER_CAL
 
@@ -225,27 +241,28 @@ def generate_backing(data, export_dir, production_id=None):
                     txt_x = (AD_CONTENT_WIDTH - (tr - tl)) / 2 - tl
                     txt_y = (H_AD_STRIP_NEW - (tb - tt)) / 2 - tt
 
-                    strip_draw.multiline_text(
-                        (txt_x, txt_y), final_text, font=font_ad,
-                        fill=text_color, stroke_width=stroke_width, stroke_fill=text_color,
-                        align="center"
-                    )
+                    drawn = False
+                    if vector:
+                        # raster tekstu konczy sie na krawedzi paska - wektor obcinamy tak samo
+                        with vector.clip([(AD_PADDING_X, ad_y), (AD_PADDING_X + AD_CONTENT_WIDTH, ad_y + H_AD_STRIP_NEW)]):
+                            drawn = vector.multiline_text(
+                                (AD_PADDING_X + txt_x, ad_y + txt_y), final_text, font_ad,
+                                text_color, stroke_width, align="center"
+                            )
+                    if not drawn:
+                        strip_draw.multiline_text(
+                            (txt_x, txt_y), final_text, font=font_ad,
+                            fill=text_color, stroke_width=stroke_width, stroke_fill=text_color,
+                            align="center"
+                        )
 
             for key, val in raw_fields.items():
                 if not isinstance(val, dict):
                     continue
                 if str(val.get("field_number")) == str(i) and val.get("image_url"):
                     img_source = val.get("image_url")
-                    overlay = None
                     try:
-                        if img_source.lower().startswith(("http://", "https://")):
-                            resp = requests.get(img_source, timeout=10)
-                            if resp.status_code == 200:
-                                overlay = Image.open(BytesIO(resp.content)).convert("RGBA")
-                        else:
-                            local_path = os.path.normpath(img_source)
-                            if os.path.exists(local_path):
-                                overlay = Image.open(local_path).convert("RGBA")
+                        overlay = load_image_robust(img_source)
                         if overlay:
                             new_w = max(1, int(overlay.width * scale))
                             new_h = max(1, int(overlay.height * scale))
@@ -261,16 +278,15 @@ def generate_backing(data, export_dir, production_id=None):
             else:
                 y = ad_y + H_AD_STRIP_NEW + GAP_AFTER_AD_LAST
 
-        saved_path = save_as_pdf(base_img, output_path)
+        photo_background = bool(bottom_data and bottom_data.get("type") == "image")
+        compression = PDF_COMPRESSION["backing_photo" if photo_background else "backing"]
+        page = PdfPage(encode_page(rgb_to_cmyk(base_img), compression), vector)
+        del base_img
+        saved_path = write_page_pdf(page, output_path)
+        if pages is not None:
+            pages["backing"] = page
         print(f"Plecy: {saved_path} ({BACKING_WIDTH}x{BACKING_HEIGHT} px = 321x641 mm)")
 
-        if template_image_path:
-            temp_dir = os.path.dirname(os.path.normpath(template_image_path))
-            if os.path.abspath(temp_dir) != os.path.abspath(export_dir):
-                if os.path.exists(temp_dir):
-                    try: shutil.rmtree(temp_dir)
-                    except OSError: pass
-
         return saved_path
 
     except Exception as e:
@@ -279,10 +295,37 @@ def generate_backing(data, export_dir, production_id=None):
         traceback.print_exc()
         return None
 
-def generate_calendar(data, top_image_path=None, upscaled_top_path=None, production_id=None):
+def _checkpointed(checkpoints, stage, pages, render):
+    """
+    Etap PDF (`render(pages)` -> sciezka) z punktem kontrolnym: gotowy PDF i jego zakodowana strona
+    (gdy zbieramy `pages`) zapisane w manifescie zadania, wznowione zadanie bierze je bez renderu.
+    """
+    if checkpoints is None:
+        return render(pages)
+
+    done = checkpoints.get(stage)
+    if done and (pages is None or done["page"]):
+        print(f"{stage}: z punktu kontrolnego ({done['path']})")
+        if pages is not None:
+            pages[stage] = checkpoints.load_page(stage)
+        return done["path"]
+
+    sink = {} if pages is not None else None
+    path = render(sink)
+    if path:
+        page_path = checkpoints.save_page(stage, sink[stage]) if sink and stage in sink else None
+        checkpoints.save(stage, {"path": path, "page": page_path}, [path, page_path])
+        if sink and stage in sink:
+            pages[stage] = sink[stage]
+    return path
+
+def generate_calendar(data, top_image_path=None, upscaled_top_path=None, production_id=None, pages=None,
+                      checkpoints=None):
     """
     Glowny orkiestrator zlecenia druku. Przygotowuje foldery robocze, a nastepnie deleguje 
     wykonanie odpowiednio do `generate_header` (glowka) i `generate_backing` (plecy). Zwraca sciezki PDFow.
+    `pages` (slownik) zbiera zakodowane strony (PdfPage) dla impozycji. Z `checkpoints`
+    (checkpoints.JobCheckpoints) glowka i plecy gotowe w poprzedniej probie zadania nie sa renderowane ponownie.
     """
     export_dir = create_export_folder(production_id)
 
@@ -290,11 +333,17 @@ def generate_calendar(data, top_image_path=None, upscaled_top_path=None, product
 
     header_source = upscaled_top_path or top_image_path
     if header_source:
-        result["header"] = generate_header(header_source, data, export_dir, production_id)
+        result["header"] = _checkpointed(
+            checkpoints, "header", pages,
+            lambda sink: generate_header(header_source, data, export_dir, production_id, sink),
+        )
     else:
         print("Brak obrazu na glowke — pomijam.")
 
-    result["backing"] = generate_backing(data, export_dir, production_id)
+    result["backing"] = _checkpointed(
+        checkpoints, "backing", pages,
+        lambda sink: generate_backing(data, export_dir, production_id, sink),
+    )
 
     print("\n" + "=" * 50)
     print(f"KALENDARZ #{production_id}")
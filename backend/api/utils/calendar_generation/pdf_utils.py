@@ -1,5 +1,8 @@
 import os
+from functools import lru_cache
 from PIL import Image, ImageCms
+from .config import BLEED, PDF_JPEG_QUALITY
+from .pdf_writer import PdfImage, PdfPage, PdfWriter, px_to_pt
 
 # sciezka do profilu ICC
 CMYK_PROFILE_PATH = os.path.join(os.path.dirname(__file__), "profiles", "FOGRA51_v3.icc")
@@ -17,6 +20,24 @@ def hex_to_rgb(hex_color):
 
 
 
+@lru_cache(maxsize=None)
+def cmyk_transform():
+    """
+    Transformacja sRGB -> FOGRA51 budowana raz na proces (wczytanie profilu i budowa transformacji kosztuja
+    przy kazdym pliku). NOTCACHE - bez wspoldzielonego cache piksela, wiec bezpieczna miedzy watkami.
+    """
+    srgb_profile = ImageCms.createProfile("sRGB")
+    cmyk_profile = ImageCms.getOpenProfile(CMYK_PROFILE_PATH)
+    return ImageCms.buildTransform(
+        srgb_profile,
+        cmyk_profile,
+        "RGB",
+        "CMYK",
+        renderingIntent=ImageCms.Intent.PERCEPTUAL,
+        flags=ImageCms.FLAGS["BLACKPOINTCOMPENSATION"] | ImageCms.FLAGS["NOTCACHE"]
+    )
+
+
 def rgb_to_cmyk(pil_image):
     """
     Uzytkownik przesyla pliki i interfejs operuje domyslnie w systemie monitorowym (RGB - sRGB).
@@ -29,29 +50,51 @@ def rgb_to_cmyk(pil_image):
     if pil_image.mode != "RGB":
         pil_image = pil_image.convert("RGB")
     
-    srgb_profile = ImageCms.createProfile("sRGB")
-    cmyk_profile = ImageCms.getOpenProfile(CMYK_PROFILE_PATH)
     print(f"Konwersja RGB -> CMYK z profilem ICC: {CMYK_PROFILE_PATH}")
-    
-    transform = ImageCms.buildTransform(
-        srgb_profile,
-        cmyk_profile,
-        "RGB",
-        "CMYK",
-        renderingIntent=ImageCms.Intent.PERCEPTUAL,
-        flags=ImageCms.FLAGS["BLACKPOINTCOMPENSATION"]
-    )
+    transform = cmyk_transform()
     
     return ImageCms.applyTransform(pil_image, transform)
 
-def save_as_pdf(pil_image, output_path):
+def encode_page(cmyk_image, compression="dct"):
+    """
+    Koduje raster strony do PdfImage (kompresja "dct", "flate" lub "jpx" - patrz PdfImage.from_image).
+    Wynik mozna osadzic w kilku plikach (strona, arkusze impozycji) bez ponownego kodowania.
+    """
+    return PdfImage.from_image(cmyk_image, compression, PDF_JPEG_QUALITY)
+
+
+def write_page_pdf(page, output_path, bleed=BLEED):
+    """
+    Jednostronicowy PDF ze strony (PdfImage albo PdfPage z warstwa wektorowa, 300 DPI):
+    MediaBox/BleedBox = caly raster ze spadem, TrimBox = format netto (spad `bleed` px z kazdej strony).
+    """
+    if not isinstance(page, PdfPage):
+        page = PdfPage(page)
+    width, height = px_to_pt(page.width), px_to_pt(page.height)
+    inset = px_to_pt(bleed)
+    writer = PdfWriter()
+    content, resources = page.render(writer)
+    writer.add_page(
+        width,
+        height,
+        content,
+        resources["XObject"],
+        boxes={
+            "BleedBox": [0, 0, width, height],
+            "TrimBox": [inset, inset, width - inset, height - inset],
+        },
+        fonts=resources.get("Font"),
+    )
+    return writer.write(output_path)
+
+
+def save_as_pdf(pil_image, output_path, compression="dct"):
     """
     Przejmuje zlozona matryce RGB (obraz PIL) ze spodem lub podkladem i jako koncowy punkt orkiestracji uruchamia 'rgb_to_cmyk',
     zapisujac zadanym wektorem rozdzielczosci na dysk ostateczny plik Portable Document Format (PDF) gotowy do produkcji.
+    Kompresja strumienia obrazu wg `compression` (encode_page), z polami TrimBox/BleedBox.
     """
     cmyk_image = rgb_to_cmyk(pil_image)
     
     pdf_path = output_path.replace(".psd", ".pdf")
-    cmyk_image.save(pdf_path, format="PDF", resolution=300.0)
-    
-    return pdf_path
+    return write_page_pdf(encode_page(cmyk_image, compression), pdf_path)
@@ -0,0 +1,274 @@
+import hashlib
+import io
+import os
+from contextlib import contextmanager
+from functools import lru_cache
+from fontTools import subset
+from fontTools.ttLib import TTFont
+from PIL import Image, ImageCms, ImageColor
+from .pdf_utils import cmyk_transform
+from .pdf_writer import Name, px_to_pt
+
+
+@lru_cache(maxsize=None)
+def _font_info(path):
+    """
+    Metryki fontu TrueType potrzebne do osadzenia w PDF (jednostki przeliczone na 1/1000 em), wczytane
+    raz na proces. None, gdy plik nie istnieje albo nie ma konturow TrueType (glyf) - tekst idzie wtedy rastrem.
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    try:
+        font = TTFont(path, lazy=True)
+        if "glyf" not in font:
+            return None
+        scale = 1000 / font["head"].unitsPerEm
+        glyph_ids = {name: gid for gid, name in enumerate(font.getGlyphOrder())}
+        hmtx = font["hmtx"]
+        head, hhea = font["head"], font["hhea"]
+        os2 = font["OS/2"] if "OS/2" in font else None
+        ps_name = font["name"].getDebugName(6) or os.path.splitext(os.path.basename(path))[0]
+        return {
+            "cmap": {code: glyph_ids[name] for code, name in font.getBestCmap().items()},
+            "widths": {gid: round(hmtx[name][0] * scale) for name, gid in glyph_ids.items()},
+            "ps_name": "".join(ch for ch in ps_name if ch.isalnum() or ch in "-_"),
+            "bbox": [round(v * scale) for v in (head.xMin, head.yMin, head.xMax, head.yMax)],
+            "ascent": round(hhea.ascent * scale),
+            "descent": round(hhea.descent * scale),
+            "cap_height": round((getattr(os2, "sCapHeight", 0) or hhea.ascent) * scale),
+            "italic_angle": float(font["post"].italicAngle),
+        }
+    except Exception as e:
+        print(f"Font {path} nie nadaje sie do osadzenia w PDF: {e}")
+        return None
+
+
+@lru_cache(maxsize=256)
+def color_to_cmyk(color):
+    """
+    Kolor CSS/PIL ("#333", "#e5e7eb", "white") -> skladowe CMYK 0..1 przez ta sama transformacje ICC
+    (FOGRA51), co raster - tekst wektorowy ma ten sam odcien, co jego dotychczasowa wersja rastrowa.
+    """
+    rgb = ImageColor.getrgb(color)[:3]
+    cmyk = ImageCms.applyTransform(Image.new("RGB", (1, 1), rgb), cmyk_transform()).getpixel((0, 0))
+    return tuple(value / 255 for value in cmyk)
+
+
+def _color_ops(color, operator):
+    return " ".join(f"{value:.4f}".rstrip("0").rstrip(".") or "0" for value in color_to_cmyk(color)) + f" {operator}"
+
+
+def _to_unicode(glyphs):
+    entries = sorted(glyphs.items())
+    lines = [
+        "/CIDInit /ProcSet findresource begin",
+        "12 dict begin",
+        "begincmap",
+        "/CIDSystemInfo <</Registry (Adobe) /Ordering (UCS) /Supplement 0>> def",
+        "/CMapName /Adobe-Identity-UCS def",
+        "/CMapType 2 def",
+        "1 begincodespacerange",
+        "<0000> <FFFF>",
+        "endcodespacerange",
+    ]
+    for start in range(0, len(entries), 100):
+        chunk = entries[start:start + 100]
+        lines.append(f"{len(chunk)} beginbfchar")
+        lines.extend(f"<{gid:04X}> <{char.encode('utf-16-be').hex().upper()}>" for gid, char in chunk)
+        lines.append("endbfchar")
+    lines += [
+        "endcmap",
+        "CMapName currentdict /CIDInit /ProcSet findresource /defineresource pop",
+        "end",
+        "end",
+    ]
+    return "\n".join(lines).encode("latin-1")
+
+
+def embed_font(writer, path, glyphs):
+    """
+    Osadza w `writer` podzbior fontu TrueType z glifami `glyphs` ({gid: znak}) jako Type0/CIDFontType2
+    z kodowaniem Identity-H (kod = numer glifu) i mapa ToUnicode (tekst da sie zaznaczyc i przeszukac).
+    Zwraca Ref do slownika fontu.
+    """
+    info = _font_info(path)
+    font = TTFont(path)
+    options = subset.Options()
+    options.retain_gids = True
+    options.notdef_outline = True
+    options.layout_features = []
+    options.drop_tables += ["meta", "DSIG"]
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(gids=sorted(set(glyphs) | {0}))
+    subsetter.subset(font)
+    buffer = io.BytesIO()
+    font.save(buffer)
+    data = buffer.getvalue()
+
+    digest = hashlib.sha256(data).digest()
+    base_font = Name("".join(chr(65 + byte % 26) for byte in digest[:6]) + "+" + info["ps_name"])
+
+    font_file = writer.add_stream({"Length1": len(data)}, data)
+    descriptor = writer.add({
+        "Type": Name("FontDescriptor"),
+        "FontName": base_font,
+        "Flags": 4,
+        "FontBBox": info["bbox"],
+        "ItalicAngle": info["italic_angle"],
+        "Ascent": info["ascent"],
+        "Descent": info["descent"],
+        "CapHeight": info["cap_height"],
+        "StemV": 80,
+        "FontFile2": font_file,
+    })
+    widths = []
+    for gid in sorted(glyphs):
+        widths += [gid, [info["widths"].get(gid, 0)]]
+    cid_font = writer.add({
+        "Type": Name("Font"),
+        "Subtype": Name("CIDFontType2"),
+        "BaseFont": base_font,
+        "CIDSystemInfo": {"Registry": "Adobe", "Ordering": "Identity", "Supplement": 0},
+        "FontDescriptor": descriptor,
+        "DW": 1000,
+        "W": widths,
+        "CIDToGIDMap": Name("Identity"),
+    })
+    return writer.add({
+        "Type": Name("Font"),
+        "Subtype": Name("Type0"),
+        "BaseFont": base_font,
+        "Encoding": Name("Identity-H"),
+        "DescendantFonts": [cid_font],
+        "ToUnicode": writer.add_stream({}, _to_unicode(glyphs)),
+    })
+
+
+class VectorLayer:
+    """
+    Warstwa wektorowa strony nakladana na raster tla: tekst z osadzonymi podzbiorami fontow z fonts/
+    i prostokaty (ramki kalendariow). API jak ImageDraw - wspolrzedne w px strony (300 DPI, od lewego
+    gornego rogu), tekst z kotwica "la"; pogrubienie PIL (stroke) to obrys glifow (tryb renderu 2).
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.ops = []
+        self.fonts = {}  # sciezka -> (nazwa zasobu, {gid: znak})
+
+    def _x(self, x):
+        return px_to_pt(x)
+
+    def _y(self, y):
+        return px_to_pt(self.height - y)
+
+    def supports(self, font):
+        """
+        Czy font da sie osadzic (TrueType z glyf) - inaczej tekst trzeba rysowac rastrem.
+        """
+        return _font_info(getattr(font, "path", None)) is not None
+
+    @contextmanager
+    def clip(self, xy):
+        """
+        Obcina operatory rysowane w bloku do prostokata `xy` [(x0, y0), (x1, y1)) w px - jak raster
+        rysowany na osobnym obrazku wklejanym w to miejsce (np. pasek pola reklamowego).
+        """
+        (x0, y0), (x1, y1) = xy
+        self.ops.append(
+            f"q\n{self._x(x0):.4f} {self._y(y1):.4f} {px_to_pt(x1 - x0):.4f} {px_to_pt(y1 - y0):.4f} re W n\n"
+        )
+        try:
+            yield
+        finally:
+            self.ops.append("Q\n")
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        """
+        Odpowiednik ImageDraw.rectangle: piksele krawedzi naleza do prostokata, obrys o grubosci `width`
+        lezy do srodka.
+        """
+        (x0, y0), (x1, y1) = xy
+        x1, y1 = x1 + 1, y1 + 1
+        ops = ["q"]
+        if fill:
+            ops.append(_color_ops(fill, "k"))
+            ops.append(f"{self._x(x0):.4f} {self._y(y1):.4f} {px_to_pt(x1 - x0):.4f} {px_to_pt(y1 - y0):.4f} re f")
+        if outline and width:
+            inset = width / 2
+            ops.append(_color_ops(outline, "K"))
+            ops.append(f"{px_to_pt(width):.4f} w")
+            ops.append(
+                f"{self._x(x0 + inset):.4f} {self._y(y1 - inset):.4f} "
+                f"{px_to_pt(x1 - x0 - width):.4f} {px_to_pt(y1 - y0 - width):.4f} re S"
+            )
+        ops.append("Q")
+        self.ops.append("\n".join(ops) + "\n")
+
+    def text(self, xy, text, font, fill, stroke_width=0):
+        """
+        Odpowiednik ImageDraw.text (kotwica "la"). Pozycje glifow bierze z ukladu PIL (z kerningiem),
+        wiec tekst wektorowy lezy tam, gdzie lezalby raster. Zwraca False, gdy font nie nadaje sie
+        do osadzenia - wtedy wywolujacy rysuje tekst rastrem.
+        """
+        path = getattr(font, "path", None)
+        info = _font_info(path)
+        if info is None:
+            return False
+        if not text:
+            return True
+
+        resource, glyphs = self.fonts.setdefault(path, (f"F{len(self.fonts)}", {}))
+        size = font.size
+        offsets = [font.getlength(text[:index]) for index in range(len(text) + 1)]
+        parts = []
+        for index, char in enumerate(text):
+            gid = info["cmap"].get(ord(char), 0)
+            glyphs.setdefault(gid, char)
+            parts.append(f"<{gid:04X}>")
+            advance = offsets[index + 1] - offsets[index]
+            adjust = info["widths"].get(gid, 0) - advance * 1000 / size
+            if abs(adjust) > 0.05 and index < len(text) - 1:
+                parts.append(f"{adjust:.2f}")
+
+        x, y = xy
+        baseline = y + font.getmetrics()[0]
+        ops = ["q", "BT", f"/{resource} {px_to_pt(size):.4f} Tf"]
+        ops.append(_color_ops(fill, "k"))
+        if stroke_width:
+            ops.append(_color_ops(fill, "K"))
+            ops.append(f"{px_to_pt(2 * stroke_width):.4f} w 1 j 2 Tr")
+        ops.append(f"{self._x(x):.4f} {self._y(baseline):.4f} Td")
+        ops.append(f"[{' '.join(parts)}] TJ")
+        ops += ["ET", "Q"]
+        self.ops.append("\n".join(ops) + "\n")
+        return True
+
+    def multiline_text(self, xy, text, font, fill, stroke_width=0, align="left", spacing=4):
+        """
+        Odpowiednik ImageDraw.multiline_text (kotwica "la") - ten sam odstep linii i wyrownanie co PIL.
+        """
+        if not self.supports(font):
+            return False
+        lines = text.split("\n")
+        line_spacing = font.getbbox("A", stroke_width=stroke_width)[3] + stroke_width + spacing
+        widths = [font.getlength(line) for line in lines]
+        max_width = max(widths)
+        x, top = xy
+        for line, width in zip(lines, widths):
+            left = x
+            if align == "center":
+                left += (max_width - width) / 2
+            elif align == "right":
+                left += max_width - width
+            self.text((left, top), line, font, fill, stroke_width)
+            top += line_spacing
+        return True
+
+    def render(self, writer):
+        """
+        Strumien operatorow warstwy (pt, uklad PDF) i slownik fontow osadzonych w `writer`.
+        """
+        fonts = {resource: embed_font(writer, path, glyphs) for path, (resource, glyphs) in self.fonts.items()}
+        return "".join(self.ops).encode("latin-1"), fonts
@@ -0,0 +1,262 @@
+import hashlib
+import io
+import os
+import uuid
+import zlib
+import numpy as np
+
+PT_PER_MM = 72 / 25.4
+
+
+def px_to_pt(px, dpi=300):
+    return px * 72 / dpi
+
+
+def mm_to_pt(mm):
+    return mm * PT_PER_MM
+
+
+class Ref:
+    """
+    Odwolanie do obiektu posredniego ("n 0 R").
+    """
+
+    def __init__(self, number):
+        self.number = number
+
+
+class Name(str):
+    """
+    Nazwa PDF (/DeviceCMYK) - zwykly str jest zapisywany jako napis (...).
+    """
+
+
+def pdf_value(value):
+    if isinstance(value, Ref):
+        return f"{value.number} 0 R"
+    if isinstance(value, Name):
+        return f"/{value}"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return f"{value:.4f}".rstrip("0").rstrip(".") or "0"
+    if isinstance(value, (list, tuple)):
+        return "[" + " ".join(pdf_value(item) for item in value) + "]"
+    if isinstance(value, dict):
+        return "<<" + "".join(f"/{key} {pdf_value(item)}" for key, item in value.items()) + ">>"
+    if value is None:
+        return "null"
+    text = str(value).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return f"({text})"
+
+
+class PdfImage:
+    """
+    Obraz zakodowany raz do strumienia PDF (dane + filtr + slownik). Ten sam obiekt mozna osadzic
+    w wielu plikach i wielu stronach bez ponownego kodowania.
+    """
+    COLORSPACES = {"CMYK": "DeviceCMYK", "RGB": "DeviceRGB", "L": "DeviceGray"}
+
+    def __init__(self, width, height, data, filter_name, colorspace, extra=None):
+        self.width = width
+        self.height = height
+        self.data = data
+        self.filter_name = filter_name
+        self.colorspace = colorspace
+        self.extra = extra or {}
+        self.digest = hashlib.sha256(data).hexdigest()
+
+    @classmethod
+    def from_image(cls, image, compression="dct", quality=95):
+        """
+        Koduje obraz PIL (CMYK, RGB lub L):
+        - "dct"   - JPEG (DCTDecode) bez podprobkowania chrominancji, `quality` - fotografie,
+        - "flate" - bezstratnie, Flate z predyktorem PNG "Up" - grafika, gradienty, jednolite tla,
+        - "jpx"   - bezstratny JPEG 2000 (JPXDecode) - fotografie bez strat, mniejsze niz Flate.
+        """
+        if image.mode not in cls.COLORSPACES:
+            image = image.convert("RGB")
+        colorspace = cls.COLORSPACES[image.mode]
+
+        if compression == "flate":
+            return cls(image.width, image.height, _flate_predicted(image), "FlateDecode", colorspace, {
+                "DecodeParms": {
+                    "Predictor": 15,
+                    "Colors": len(image.getbands()),
+                    "BitsPerComponent": 8,
+                    "Columns": image.width,
+                },
+            })
+
+        buffer = io.BytesIO()
+        if compression == "jpx":
+            image.save(buffer, format="JPEG2000", irreversible=False)
+            return cls(image.width, image.height, buffer.getvalue(), "JPXDecode", colorspace)
+
+        if compression != "dct":
+            raise ValueError(f"Nieznana kompresja PDF: {compression}")
+        image.save(buffer, format="JPEG", quality=quality, subsampling=0)
+        extra = {}
+        if image.mode == "CMYK":
+            # PIL zapisuje CMYK w konwencji Adobe (odwrocone kanaly)
+            extra["Decode"] = [1, 0, 1, 0, 1, 0, 1, 0]
+        return cls(image.width, image.height, buffer.getvalue(), "DCTDecode", colorspace, extra)
+
+
+class PdfPage:
+    """
+    Strona do druku: zakodowany raster (PdfImage) i opcjonalna warstwa wektorowa nad nim
+    (pdf_vector.VectorLayer - tekst z osadzonymi fontami, ramki kalendariow).
+    """
+
+    def __init__(self, image, vector=None):
+        self.image = image
+        self.vector = vector
+
+    @property
+    def width(self):
+        return self.image.width
+
+    @property
+    def height(self):
+        return self.image.height
+
+    def render(self, writer):
+        """
+        Strumien tresci strony (pt, poczatek w lewym dolnym rogu) i jej zasoby osadzone w `writer`.
+        """
+        width, height = px_to_pt(self.width), px_to_pt(self.height)
+        content = f"q {width:.4f} 0 0 {height:.4f} 0 0 cm /Im0 Do Q\n".encode("latin-1")
+        resources = {"XObject": {"Im0": writer.add_image(self.image)}}
+        if self.vector is not None:
+            ops, fonts = self.vector.render(writer)
+            content += ops
+            if fonts:
+                resources["Font"] = fonts
+        return content, resources
+
+
+def _flate_predicted(image):
+    """
+    Wiersze z filtrem PNG "Up" (roznica z wierszem powyzej, bajt typu filtra na poczatku wiersza) skompresowane
+    zlib - jednolite i plynnie zmienne obszary daja niemal same zera.
+    """
+    rows = np.asarray(image, dtype=np.uint8).reshape(image.height, -1)
+    predicted = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    predicted[:, 0] = 2
+    predicted[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=predicted[1:, 1:])
+    return zlib.compress(predicted.tobytes(), 6)
+
+
+class PdfWriter:
+    """
+    Minimalny zapis PDF 1.5 dla pipeline'u druku: obiekty posrednie, strumienie (Flate), obrazy i formy
+    jako XObject i strony. Obrazy sa deduplikowane po skrocie tresci - identyczny obraz jest zapisany w pliku raz,
+    niezaleznie od tego, na ilu stronach i w ilu miejscach zostanie uzyty.
+    """
+
+    def __init__(self):
+        self.objects = [None, None]  # 1: Catalog, 2: Pages
+        self.pages = []
+        self.images = {}
+
+    def reserve(self):
+        self.objects.append(None)
+        return Ref(len(self.objects))
+
+    def add(self, dictionary, ref=None):
+        ref = ref or self.reserve()
+        self.objects[ref.number - 1] = pdf_value(dictionary).encode("latin-1")
+        return ref
+
+    def add_stream(self, dictionary, data, compress=True, ref=None):
+        dictionary = dict(dictionary)
+        if compress:
+            data = zlib.compress(data, 6)
+            dictionary["Filter"] = Name("FlateDecode")
+        dictionary["Length"] = len(data)
+        ref = ref or self.reserve()
+        self.objects[ref.number - 1] = pdf_value(dictionary).encode("latin-1") + b"\nstream\n" + data + b"\nendstream"
+        return ref
+
+    def add_image(self, image):
+        ref = self.images.get(image.digest)
+        if ref is None:
+            dictionary = {
+                "Type": Name("XObject"),
+                "Subtype": Name("Image"),
+                "Width": image.width,
+                "Height": image.height,
+                "ColorSpace": Name(image.colorspace),
+                "BitsPerComponent": 8,
+                "Filter": Name(image.filter_name),
+            }
+            dictionary.update(image.extra)
+            dictionary["Length"] = len(image.data)
+            ref = self.reserve()
+            self.objects[ref.number - 1] = (
+                pdf_value(dictionary).encode("latin-1") + b"\nstream\n" + image.data + b"\nendstream"
+            )
+            self.images[image.digest] = ref
+        return ref
+
+    def add_form(self, width, height, content, resources):
+        """
+        Form XObject `width` x `height` pt - strona zamknieta w jeden obiekt, ktory arkusz impozycji
+        umieszcza wielokrotnie (raster, fonty i operatory sa w pliku raz).
+        """
+        return self.add_stream({
+            "Type": Name("XObject"),
+            "Subtype": Name("Form"),
+            "BBox": [0, 0, float(width), float(height)],
+            "Resources": resources,
+        }, content)
+
+    def add_page(self, width, height, content, xobjects=None, boxes=None, fonts=None):
+        """
+        Dodaje strone `width` x `height` pt. `content` to bajty strumienia tresci albo Ref do strumienia
+        juz dodanego (wspoldzielonego przez wiele stron); `xobjects` mapuje nazwe (Im0) na Ref,
+        `fonts` nazwe zasobu fontu (F0) na Ref.
+        """
+        if not isinstance(content, Ref):
+            content = self.add_stream({}, content)
+        resources = {"XObject": {name: ref for name, ref in (xobjects or {}).items()}}
+        if fonts:
+            resources["Font"] = dict(fonts)
+        page = {
+            "Type": Name("Page"),
+            "Parent": Ref(2),
+            "MediaBox": [0, 0, float(width), float(height)],
+            "Resources": resources,
+            "Contents": content,
+        }
+        page.update(boxes or {})
+        self.pages.append(self.add(page))
+        return self.pages[-1]
+
+    def write(self, output_path):
+        """
+        Zapisuje plik atomowo (plik tymczasowy + os.replace) - czesciowy PDF nigdy nie trafia pod docelowa nazwe.
+        """
+        self.add({"Type": Name("Catalog"), "Pages": Ref(2)}, Ref(1))
+        self.add({"Type": Name("Pages"), "Kids": self.pages, "Count": len(self.pages)}, Ref(2))
+
+        temp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+        offsets = []
+        with open(temp_path, "wb") as f:
+            f.write(b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n")
+            for number, body in enumerate(self.objects, start=1):
+                offsets.append(f.tell())
+                f.write(f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n")
+            xref = f.tell()
+            f.write(f"xref\n0 {len(self.objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+            for offset in offsets:
+                f.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+            f.write(
+                f"trailer\n<</Size {len(self.objects) + 1}/Root 1 0 R>>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+            )
+        os.replace(temp_path, output_path)
+        return output_path
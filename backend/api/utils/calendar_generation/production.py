@@ -0,0 +1,412 @@
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import timedelta
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from ...models import CalendarProduction
+from ..background import init_django_process
+from ..janitor import schedule_sweep
+from ..storage import local_path
+from ..upscaling import upscale_image_with_bigjpg
+from .checkpoints import JOB_PREFIX, JobCheckpoints, inputs_fingerprint
+from .config import PDF_VECTOR
+from .file_utils import create_export_folder
+from .data_handlers import fetch_calendar_data, get_year_data, handle_bottom_data, handle_field_data, handle_top_image
+from .idempotency import production_lock, remember_result
+from .imposition import impose_production
+from .packaging import build_package
+from .pdf_generator import generate_calendar
+from .scheduling import SCHEDULE_FIELDS, claim_seconds, cost_profile, heavy_limit, schedule
+
+
+class ProductionError(RuntimeError):
+    """
+    Blad renderowania produkcji (brak kalendarza, nieudany plik wynikowy).
+    """
+
+
+class CalendarNotFound(ProductionError):
+    """
+    Kalendarz produkcji nie istnieje.
+    """
+
+
+def _render_inputs(calendar):
+    """
+    Dane wejsciowe renderu bez pobierania zasobow (do odcisku punktow kontrolnych).
+    """
+    bottom = calendar.bottom
+    fields = [(getattr(calendar, f"field{i}", None), i) for i in range(1, 4)]
+    fields += [(img, f"prefetched_image_{img.id}") for img in getattr(calendar, "prefetched_images_for_fields", [])]
+    return {
+        "calendar_id": calendar.id,
+        "version": getattr(calendar, "version", None),
+        "year": get_year_data(calendar),
+        "top_image": handle_top_image(calendar, None),
+        "bottom": [type(bottom).__name__, model_to_dict(bottom)] if bottom else None,
+        "fields": [[name, handle_field_data(field_obj, name, None)] for field_obj, name in fields],
+        "pdf_vector": PDF_VECTOR,
+    }
+
+
+def _prepare_data(calendar, temp_dir):
+    data = {
+        "calendar_id": calendar.id,
+        "author": str(calendar.author),
+        "created_at": str(calendar.created_at),
+        "fields": {},
+        "bottom": None,
+        "top_image": None,
+        "year": get_year_data(calendar),
+    }
+
+    data["top_image"] = handle_top_image(calendar, temp_dir)
+    data["bottom"] = handle_bottom_data(calendar.bottom, temp_dir)
+
+    all_fields = []
+    for i in range(1, 4):
+        all_fields.append((getattr(calendar, f"field{i}", None), i))
+    for img in getattr(calendar, "prefetched_images_for_fields", []):
+        all_fields.append((img, f"prefetched_image_{img.id}"))
+    for field_obj, field_name in all_fields:
+        data["fields"][field_name] = handle_field_data(field_obj, field_name, temp_dir)
+    return data
+
+
+def _data_files(data):
+    """
+    Lokalne pliki, od ktorych zalezy przygotowany `data` (tlo, pobrane obrazki pol).
+    """
+    files = []
+    if data["bottom"] and data["bottom"].get("image_path"):
+        files.append(data["bottom"]["image_path"])
+    for field in data["fields"].values():
+        if field and field.get("type") == "image" and os.path.isabs(field["image_url"]):
+            files.append(field["image_url"])
+    return files
+
+
+def _upscaled(checkpoints, stage, source, factor, label):
+    """
+    Etap upscalingu z punktem kontrolnym: Bigjpg zapisuje wynik w katalogu zadania, wznowione zadanie
+    go nie zamawia ponownie. Zrodlo w lokalnym magazynie (niedostepne dla Bigjpg) drukujemy z oryginalu -
+    bez punktu kontrolnego, wiec wznowienie sprobuje upscalingu jeszcze raz. Kazdy inny blad Bigjpg
+    to ProductionError - druk w niepelnej rozdzielczosci nie moze przejsc jako `done`.
+    """
+    done = checkpoints.get(stage)
+    if done:
+        return done
+    result = upscale_image_with_bigjpg(source, checkpoints.job_dir, factor)
+    if result:
+        checkpoints.save(stage, result["local_upscaled"], [result["local_upscaled"]])
+        return result["local_upscaled"]
+
+    original = local_path(source)
+    if original:
+        print(f"⚠️ {label}: źródło w lokalnym magazynie, niedostępne dla Bigjpg — druk z oryginału")
+        return original
+    raise ProductionError(f"Upscaling {factor}x ({label}) w Bigjpg nie powiódł się")
+
+
+def render_production(calendar_id, production_id, timings=None, pages=None):
+    """
+    Renderuje pliki druku jednego kalendarza (glowka + plecy) do calendar_exports/calendar_<production_id>.
+    Wspolne dla CalendarPrint i produkcji seryjnej. Zwraca wynik generate_calendar.
+    `timings` (slownik) dostaje czasy etapow (prepare, upscale, render) i profil kosztu - z nich
+    planista produkcji uczy sie szacunkow. `pages` zbiera zakodowane strony dla impozycji.
+    Etapy zapisuja punkty kontrolne (checkpoints.JobCheckpoints) w CALENDAR_TEMP_ROOT/job_<production_id>:
+    ponowione po bledzie zadanie zaczyna od pierwszego niezakonczonego etapu, katalog znika po sukcesie.
+    """
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+    calendar = fetch_calendar_data(calendar_id)
+    if not calendar:
+        raise CalendarNotFound(f"Nie znaleziono kalendarza {calendar_id}")
+
+    # bez produkcji nie ma czego wznawiac - jednorazowy katalog
+    job_name = f"{JOB_PREFIX}{production_id}" if production_id is not None else str(uuid.uuid4())
+    checkpoints = JobCheckpoints(
+        os.path.join(settings.CALENDAR_TEMP_ROOT, job_name),
+        inputs_fingerprint(_render_inputs(calendar)),
+    )
+    resumed = list(checkpoints.manifest["stages"])
+    if resumed:
+        timings["resumed"] = resumed
+
+    succeeded = False
+    try:
+        data = checkpoints.get("prepare")
+        if data is None:
+            data = _prepare_data(calendar, checkpoints.job_dir)
+            checkpoints.save("prepare", data, _data_files(data))
+
+        heavy = bool(data["bottom"] and data["bottom"].get("type") == "image")
+        timings["profile"] = cost_profile(bool(data["top_image"]), heavy)
+        timings["prepare"] = round(time.perf_counter() - started, 2)
+        started = time.perf_counter()
+
+        upscaled_header_path = None
+        if data["top_image"]:
+            upscaled_header_path = _upscaled(checkpoints, "upscale_header", data["top_image"], 4, "top_image")
+
+        if heavy:
+            data["bottom"]["image_path"] = _upscaled(checkpoints, "upscale_bottom", data["bottom"]["url"], 8, "bottom_image")
+
+        timings["upscale"] = round(time.perf_counter() - started, 2)
+        started = time.perf_counter()
+
+        files = generate_calendar(
+            data=data,
+            top_image_path=data["top_image"],
+            upscaled_top_path=upscaled_header_path,
+            production_id=production_id,
+            pages=pages,
+            checkpoints=checkpoints,
+        )
+        timings["render"] = round(time.perf_counter() - started, 2)
+        succeeded = bool(files.get("backing"))
+        return files
+    finally:
+        if succeeded or production_id is None:
+            checkpoints.finish()
+        else:
+            print(f"💾 Zadanie druku produkcji {production_id} przerwane — punkty kontrolne w {checkpoints.job_dir}")
+
+
+def print_result(files, sheets=None):
+    """
+    Wynik renderu produkcji w ksztalcie odpowiedzi CalendarPrint (sciezki plikow druku i arkuszy).
+    """
+    sheets = sheets or {}
+    return {
+        "message": "Kalendarz wygenerowany — dwa pliki PSD.",
+        "export_dir": files["export_dir"],
+        "header_path": files.get("header"),
+        "backing_path": files.get("backing"),
+        "header_sheets_path": sheets.get("header_sheets"),
+        "backing_sheets_path": sheets.get("backing_sheets"),
+    }
+
+
+def production_quantities(production_ids):
+    return dict(CalendarProduction.objects.filter(id__in=production_ids).values_list("id", "quantity"))
+
+
+def impose_sheets(production_id, export_dir, pages, quantity):
+    """
+    Arkusze drukarskie (imposition.impose_production) dla produkcji o nakladzie > 1.
+    """
+    if not pages or not quantity or quantity < 2:
+        return {}
+    return impose_production(pages, export_dir, production_id, quantity)
+
+
+def mark_production_done(production_id, timings=None):
+    """
+    Zamyka produkcje: buduje paczke ZIP do pobrania (packaging.build_package - raz, zamiast przy kazdym
+    pobraniu) i ustawia status `done` z czasami etapow. Blad paczki nie cofa produkcji - pobranie zbuduje ja ponownie.
+    """
+    try:
+        build_package(production_id)
+    except Exception as e:
+        print(f"⚠️ Paczka produkcji {production_id} nie powstała: {e}")
+
+    values = {"status": "done", "finished_at": timezone.now(), "claimed_until": None}
+    if timings:
+        values["stage_timings"] = timings
+        values["render_seconds"] = sum(value for value in timings.values() if isinstance(value, (int, float)))
+    updated = CalendarProduction.objects.filter(id=production_id).update(**values)
+    if updated:
+        print(f"✅ Produkcja {production_id} → done")
+    else:
+        print(f"⚠️ Nie znaleziono produkcji {production_id}")
+
+
+def _claim_lease():
+    return timezone.now() + timedelta(seconds=claim_seconds())
+
+
+def claim_productions(deadline=None, limit=None):
+    """
+    Wybiera produkcje `to_produce` (opcjonalnie tylko z terminem do `deadline`) w kolejnosci planisty
+    (scheduling.schedule), bierze pierwsze `limit` i warunkowo przestawia je na `in_production` z rezerwacja
+    (`claimed_until`), zeby rownolegly przebieg ani reczny CalendarPrint nie wzial ich drugi raz.
+    Bierze tez produkcje `in_production` z wygasla rezerwacja - ich przebieg zginal (restart procesu).
+    Zwraca wiersze SCHEDULE_FIELDS.
+    """
+    claimable = Q(status="to_produce") | Q(status="in_production", claimed_until__lt=timezone.now())
+    queryset = CalendarProduction.objects.filter(claimable)
+    if deadline:
+        queryset = queryset.filter(deadline__lte=deadline)
+    candidates = {row["id"]: row for row in queryset.values(*SCHEDULE_FIELDS)}
+
+    ordered = [candidates[pk] for unit in schedule(candidates.values()) for pk in unit["ids"]]
+    if limit:
+        ordered = ordered[:limit]
+
+    claimed = []
+    for row in ordered:
+        stale = Q(status="in_production", claimed_until__lt=timezone.now())
+        if CalendarProduction.objects.filter(Q(status="to_produce") | stale, id=row["id"]).update(
+            status="in_production", claimed_until=_claim_lease()
+        ):
+            claimed.append(row)
+    return claimed
+
+
+def renew_claims(production_ids):
+    """
+    Przedluza rezerwacje produkcji, ktore przebieg seryjny wciaz ma w kolejce albo w renderze.
+    """
+    CalendarProduction.objects.filter(id__in=production_ids, status="in_production").update(
+        claimed_until=_claim_lease()
+    )
+
+
+def release_productions(production_ids):
+    """
+    Zwraca nieudane produkcje do kolejki (`to_produce`), zeby kolejny przebieg sprobowal ponownie.
+    """
+    CalendarProduction.objects.filter(id__in=production_ids, status="in_production").update(
+        status="to_produce", claimed_until=None
+    )
+
+
+def copy_production_files(files, production_id):
+    """
+    Kopiuje gotowe pliki druku do folderu innej produkcji, z nazwami jak po renderze (header_<id>, backing_<id>).
+    """
+    export_dir = create_export_folder(production_id)
+    result = {"header": None, "backing": None, "export_dir": export_dir}
+    for key in ("header", "backing"):
+        if files.get(key):
+            extension = os.path.splitext(files[key])[1]
+            result[key] = os.path.join(export_dir, f"{key}_{production_id}{extension}")
+            shutil.copyfile(files[key], result[key])
+    return result
+
+
+def produce_group(calendar_id, production_ids):
+    """
+    Zadanie procesu roboczego: renderuje kalendarz raz dla pierwszej produkcji, kopiuje pliki do pozostalych
+    i oznacza je jako `done`. Przy bledzie produkcje wracaja do kolejki. Produkcje renderowane wlasnie przez
+    CalendarPrint (blokada produkcji) sa pomijane - status `skipped` - i wracaja do `to_produce`, zeby
+    nieudany CalendarPrint nie zostawil ich w `in_production`. Zwraca wyniki per produkcja.
+    """
+    with ExitStack() as locks:
+        locked = [pk for pk in production_ids if locks.enter_context(production_lock(pk))]
+        skipped = [pk for pk in production_ids if pk not in locked]
+        # wracaja do kolejki: gdy trwajacy CalendarPrint sie uda, oznaczy je `done` (release dotyczy tylko in_production)
+        release_productions(skipped)
+        results = [
+            {"id": pk, "calendar_id": calendar_id, "status": "skipped", "error": "Produkcja jest już renderowana"}
+            for pk in skipped
+        ]
+        if locked:
+            results += _render_group(calendar_id, locked)
+        return results
+
+
+def _render_group(calendar_id, production_ids):
+    close_old_connections()
+    try:
+        first = production_ids[0]
+        quantities = production_quantities(production_ids)
+        timings = {}
+        # obrazy stron kodujemy tylko, gdy ktoras produkcja potrzebuje arkuszy
+        pages = {} if any(quantity > 1 for quantity in quantities.values()) else None
+        files = render_production(calendar_id, first, timings, pages)
+        if not files.get("backing"):
+            raise ProductionError("Nie udało się wygenerować pleców kalendarza")
+
+        results = []
+        for production_id in production_ids:
+            try:
+                production_files = files if production_id == first else copy_production_files(files, production_id)
+                sheets = impose_sheets(production_id, production_files["export_dir"], pages, quantities.get(production_id))
+                # czasy tylko dla faktycznie renderowanej produkcji - kopie nie sa probkami dla learned_costs
+                mark_production_done(production_id, timings if production_id == first else None)
+                remember_result(production_id, calendar_id, print_result(production_files, sheets))
+                results.append({"id": production_id, "calendar_id": calendar_id, "status": "done"})
+            except Exception as e:
+                release_productions([production_id])
+                results.append({"id": production_id, "calendar_id": calendar_id, "status": "failed", "error": str(e)})
+        return results
+
+    except Exception as e:
+        print(f"❌ Kalendarz {calendar_id}: {e}")
+        release_productions(production_ids)
+        return [
+            {"id": production_id, "calendar_id": calendar_id, "status": "failed", "error": str(e)}
+            for production_id in production_ids
+        ]
+    finally:
+        close_old_connections()
+
+
+def run_production_batch(productions, workers=None, on_result=None):
+    """
+    Renderuje zajete produkcje (claim_productions) w puli procesow - kazdy proces to osobny rdzen dla
+    PIL/LittleCMS. Kolejnosc ustala planista (schedule), a zadan "ciezkich" (tlo z upscalingiem 8x)
+    rownolegle jest najwyzej PRODUCTION_SCHEDULER["heavy_max_concurrency"] - pilnuje to pamieci.
+    `workers` domyslnie settings.PRODUCTION_WORKERS; `on_result` dostaje wynik kazdej produkcji zaraz
+    po jej zakonczeniu. Rezerwacje (claimed_until) produkcji w kolejce i w renderze sa odnawiane co
+    1/3 ich czasu. Zwraca wyniki w kolejnosci `productions`.
+    """
+    pending = schedule(productions)
+    if not pending:
+        return []
+
+    workers = min(workers or getattr(settings, "PRODUCTION_WORKERS", None) or os.cpu_count() or 1, len(pending))
+    max_heavy = heavy_limit()
+    print(
+        f"🖨️ Produkcja seryjna: {len(productions)} zleceń, {len(pending)} kalendarzy, procesów: {workers}, "
+        f"ciężkich naraz: {max_heavy}"
+    )
+
+    results = {}
+    running = {}
+    # rezerwacje odnawiane, dopoki przebieg zyje - po restarcie procesu wygasaja i produkcje wracaja do kolejki
+    heartbeat = claim_seconds() / 3
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_django_process,
+    ) as pool:
+        while pending or running:
+            while pending and len(running) < workers:
+                heavy_running = sum(unit["heavy"] for unit in running.values())
+                unit = next((u for u in pending if not u["heavy"] or heavy_running < max_heavy), None)
+                if unit is None:
+                    break
+                pending.remove(unit)
+                running[pool.submit(produce_group, unit["calendar_id"], unit["ids"])] = unit
+
+            done, _ = wait(running, timeout=heartbeat, return_when=FIRST_COMPLETED)
+            renew_claims([pk for unit in pending + list(running.values()) for pk in unit["ids"]])
+            for future in done:
+                unit = running.pop(future)
+                try:
+                    items = future.result()
+                except Exception as e:
+                    # np. BrokenProcessPool po zabiciu procesu przez OOM
+                    release_productions(unit["ids"])
+                    items = [
+                        {"id": pk, "calendar_id": unit["calendar_id"], "status": "failed", "error": str(e)}
+                        for pk in unit["ids"]
+                    ]
+                for item in items:
+                    results[item["id"]] = item
+                    if on_result:
+                        on_result(item)
+
+    schedule_sweep()
+    return [results[row["id"]] for row in productions if row["id"] in results]
@@ -0,0 +1,135 @@
+from datetime import datetime, time as dt_time
+from django.conf import settings
+from django.utils import timezone
+from ...models import CalendarProduction
+
+HEAVY_BOTTOM_MODEL = "bottomimage"
+
+# szacunkowy czas renderu (s) dla profilu, zanim zbierze sie historia pomiarow
+DEFAULT_COSTS = {
+    "plain": 20.0,
+    "header": 60.0,
+    "upscale8": 120.0,
+    "header+upscale8": 160.0,
+}
+
+# pola CalendarProduction.values() potrzebne do planowania
+SCHEDULE_FIELDS = (
+    "id",
+    "calendar_id",
+    "author_id",
+    "deadline",
+    "created_at",
+    "calendar__author_id",
+    "calendar__top_image_id",
+    "calendar__bottom_content_type__model",
+)
+
+
+def _config():
+    defaults = {"heavy_max_concurrency": 2, "urgent_hours": 24, "history": 50, "claim_seconds": 900}
+    defaults.update(getattr(settings, "PRODUCTION_SCHEDULER", {}))
+    return defaults
+
+
+def claim_seconds():
+    """
+    Czas rezerwacji produkcji wzietej do przebiegu seryjnego; przebieg odnawia ja co 1/3 tego czasu.
+    """
+    return max(30, _config()["claim_seconds"])
+
+
+def heavy_limit():
+    """
+    Ile zadan "ciezkich" (upscaling 8x) moze renderowac sie naraz.
+    """
+    return max(1, _config()["heavy_max_concurrency"])
+
+
+def cost_profile(has_header, heavy):
+    """
+    Klasa kosztu renderu: glowka (upscaling 4x) i tlo plecow z obrazu (upscaling 8x - zadanie "ciezkie").
+    """
+    parts = (["header"] if has_header else []) + (["upscale8"] if heavy else [])
+    return "+".join(parts) or "plain"
+
+
+def is_heavy(row):
+    return row.get("calendar__bottom_content_type__model") == HEAVY_BOTTOM_MODEL
+
+
+def learned_costs():
+    """
+    Sredni czas renderu per profil z ostatnich zakonczonych produkcji (stage_timings zapisywane przez
+    mark_production_done); profile bez historii dostaja DEFAULT_COSTS. Produkcje wznowione z punktow
+    kontrolnych (`resumed` w stage_timings) sa pomijane - ich czas nie obejmuje pominietych etapow.
+    """
+    costs = dict(DEFAULT_COSTS)
+    history = _config()["history"]
+    for profile in DEFAULT_COSTS:
+        samples = list(
+            CalendarProduction.objects
+            .filter(status="done", render_seconds__isnull=False, stage_timings__profile=profile)
+            .exclude(stage_timings__has_key="resumed")
+            .order_by("-finished_at")
+            .values_list("render_seconds", flat=True)[:history]
+        )
+        if samples:
+            costs[profile] = sum(samples) / len(samples)
+    return costs
+
+
+def _slack(deadline, cost, now):
+    if not deadline:
+        return float("inf")
+    due = timezone.make_aware(datetime.combine(deadline, dt_time.max), timezone.get_current_timezone())
+    return (due - now).total_seconds() - cost
+
+
+def schedule(productions, now=None, costs=None):
+    """
+    Ustala kolejnosc renderu. Jednostka to kalendarz (jego produkcje renderujemy raz), z kosztem
+    z learned_costs() i zapasem czasu (slack) = czas do konca dnia terminu - koszt.
+    Pilne (slack ponizej `urgent_hours`) ida pierwsze wg slacku; reszta round-robin miedzy autorami,
+    w obrebie autora wg slacku, przy remisie krotsze pierwsze. Zwraca liste jednostek
+    {calendar_id, ids, author_id, heavy, cost, slack}.
+    """
+    now = now or timezone.now()
+    costs = costs or learned_costs()
+    urgent = _config()["urgent_hours"] * 3600
+
+    units = {}
+    for row in productions:
+        unit = units.get(row["calendar_id"])
+        if unit is None:
+            heavy = is_heavy(row)
+            profile = cost_profile(bool(row.get("calendar__top_image_id")), heavy)
+            unit = units[row["calendar_id"]] = {
+                "calendar_id": row["calendar_id"],
+                "ids": [],
+                "author_id": row.get("author_id") or row.get("calendar__author_id"),
+                "heavy": heavy,
+                "cost": costs.get(profile, DEFAULT_COSTS[profile]),
+                "slack": float("inf"),
+                "created_at": row.get("created_at"),
+            }
+        unit["ids"].append(row["id"])
+        unit["slack"] = min(unit["slack"], _slack(row.get("deadline"), unit["cost"], now))
+
+    def by_slack(unit):
+        return (unit["slack"], unit["cost"], unit["created_at"] or now, unit["calendar_id"])
+
+    ordered = sorted(units.values(), key=by_slack)
+    urgent_units = [unit for unit in ordered if unit["slack"] < urgent]
+
+    # fair-share: n-ta jednostka kazdego autora trafia do n-tej "rundy"
+    turns = {}
+    rest = []
+    for unit in ordered:
+        if unit["slack"] < urgent:
+            continue
+        turn = turns.get(unit["author_id"], 0)
+        turns[unit["author_id"]] = turn + 1
+        rest.append((turn, unit))
+    rest.sort(key=lambda item: (item[0], by_slack(item[1])))
+    return urgent_units + [unit for _, unit in rest]
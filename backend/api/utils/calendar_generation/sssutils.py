@@ -2,6 +2,7 @@ import os
 from psd_tools import PSDImage
 import requests  
 from io import BytesIO
+from django.conf import settings
 from PIL import Image,  ImageFont
 try:
     from psd_tools import PSDImage
@@ -122,7 +123,7 @@ def load_image_robust(path_or_url):
 def create_export_folder(production_id, base_dir=None):
  
     if base_dir is None:
-        base_dir = os.path.join(os.getcwd(), "media", "calendar_exports")
+        base_dir = settings.CALENDAR_EXPORTS_ROOT
 
 
     folder_name = f"calendar_{production_id}"
@@ -1,53 +1,218 @@
 import os
-from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
 import io
-load_dotenv()
+import time
+import uuid
+from django.conf import settings
+from .storage import get_storage
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
+def _read_bytes(file):
+    if isinstance(file, bytes):
+        return file
+    if isinstance(file, str):
+        if not os.path.exists(file):
+            print(f"❌ Plik nie istnieje: {file}")
+            return None
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return file.read()
 
-def upload_image(file, folder_name=None, file_name=None):
-    try:
-        options = {
-            "format": "jpg", 
-            "quality": "auto",  
-            "transformation": [
-                {"color_space": "srgb"} 
-            ]
-        }
 
-        if folder_name:
-            options["folder"] = folder_name
+def encode_image(data, profile=None):
+    """
+    Koduje obraz lokalnie, jeden raz, wedlug profilu z settings.UPLOAD_PROFILES (domyslnie DEFAULT_UPLOAD_PROFILE).
+    Profil bez `format` (np. "print") zostawia oryginalne bajty - zrodlo do druku trafia do magazynu bez strat.
+    Zwraca (bajty, {"width", "height", "bytes", "format"}).
+    """
+    from PIL import Image
 
-        if file_name:
-            file_name = os.path.splitext(file_name)[0]
-            options["public_id"] = file_name
+    config = settings.UPLOAD_PROFILES[profile or settings.DEFAULT_UPLOAD_PROFILE]
+    target = (config.get("format") or "").upper()
 
-        if isinstance(file, str):
-            if not os.path.exists(file):
-                print(f"❌ Plik nie istnieje: {file}")
-                return None
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.size
+        source = (img.format or "").upper()
 
-            result = cloudinary.uploader.upload(file, **options)
+        if not target or target == source:
+            return data, {"width": width, "height": height, "bytes": len(data), "format": source.lower()}
 
-        elif isinstance(file, bytes):
-            result = cloudinary.uploader.upload(io.BytesIO(file), **options)
+        encoded = _encode(img, target, config)
 
-        else:
-            if hasattr(file, 'seek'):
-                file.seek(0)
-            result = cloudinary.uploader.upload(file, **options)
+    return encoded, {"width": width, "height": height, "bytes": len(encoded), "format": target.lower()}
+
+
+def _encode(img, target, config):
+    if target == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+    elif img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+    options = {"icc_profile": img.info.get("icc_profile")} if img.info.get("icc_profile") else {}
+    if target in ("JPEG", "WEBP"):
+        options["quality"] = config.get("quality", 90)
+    if target == "WEBP" and config.get("lossless"):
+        options["lossless"] = True
+    if target in ("JPEG", "PNG"):
+        options["optimize"] = True
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=target, **options)
+    return buffer.getvalue()
+
+
+def render_variant(data, name):
+    """
+    Pomniejszony wariant obrazu wg settings.IMAGE_VARIANTS[name] (szerokosc maksymalna, proporcje zachowane,
+    bez powiekszania). Zwraca (bajty, format).
+    """
+    from PIL import Image
+
+    config = settings.IMAGE_VARIANTS[name]
+    target = config["format"].upper()
 
-        url = result.get("secure_url")
-        print(f"✅ Przesłano jako JPG: {result.get('public_id')}")
-        print(f"🔗 URL: {url}")
-        return url
+    with Image.open(io.BytesIO(data)) as img:
+        width = config["width"]
+        if img.width > width:
+            size = (width, max(1, round(img.height * width / img.width)))
+            img.draft("RGB", size)
+            img = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        return _encode(img, target, config), target.lower()
+
+
+def upload_encoded(file, folder_name=None, file_name=None, profile=None, with_variants=False):
+    """
+    Koduje obraz lokalnie (encode_image) i zapisuje go w magazynie plikow (settings.IMAGE_STORAGE) w gotowym formacie.
+    `with_variants` dodatkowo zapisuje pomniejszone warianty z settings.IMAGE_VARIANTS (miniatura, sredni) - ich
+    blad nie przerywa uploadu oryginalu. Zwraca {"url", "key", "width", "height", "bytes", "format", "variants"}
+    lub None przy bledzie.
+    """
+    try:
+        source = _read_bytes(file)
+        if not source:
+            return None
+
+        storage = get_storage()
+        data, info = encode_image(source, profile)
+        info.update(storage.save(data, folder_name, file_name, info["format"]))
+
+        print(f"✅ Przesłano jako {info['format'].upper()} ({info['bytes']} B): {info['key']}")
+        print(f"🔗 URL: {info['url']}")
+
+        info["variants"] = {}
+        for name in (settings.IMAGE_VARIANTS if with_variants else ()):
+            try:
+                variant, variant_format = render_variant(source, name)
+                variant_name = f"{os.path.splitext(file_name)[0]}_{name}" if file_name else None
+                info["variants"][name] = storage.save(variant, folder_name, variant_name, variant_format)["url"]
+            except Exception as e:
+                print(f"⚠️ Nie udało się zapisać wariantu {name}:", e)
+        return info
 
     except Exception as e:
         print("❌ Błąd podczas przesyłania obrazu:", e)
-        return None
\ No newline at end of file
+        return None
+
+
+def upload_image(file, folder_name=None, file_name=None, profile=None):
+    info = upload_encoded(file, folder_name, file_name, profile)
+    return info["url"] if info else None
+
+
+PENDING_UPLOAD_URL = "pending"
+
+# upload_status obrazow z odroczonym uploadem
+UPLOAD_PENDING = "pending"
+UPLOAD_FAILED = "failed"
+
+
+def read_image_size(file):
+    """
+    Odczytuje wymiary obrazu z samego naglowka pliku (PIL otwiera leniwie, bez dekodowania pikseli).
+    """
+    from PIL import Image
+
+    if isinstance(file, bytes):
+        file = io.BytesIO(file)
+    position = file.tell() if hasattr(file, "tell") else 0
+    try:
+        with Image.open(file) as img:
+            return img.size
+    finally:
+        if hasattr(file, "seek"):
+            file.seek(position)
+
+
+def start_uploads(files, folder_name=None, profile=None, with_variants=False):
+    """
+    Rownolegle wysyla pliki {klucz: bytes} w puli watkow `uploads`.
+    Zwraca {klucz: Future}, ktorego wynikiem jest wynik upload_encoded (lub None przy bledzie).
+    """
+    from .background import get_executor
+
+    executor = get_executor("uploads")
+    return {
+        key: executor.submit(
+            upload_encoded, file, folder_name, f"generated_{uuid.uuid4().hex}", profile, with_variants
+        )
+        for key, file in files.items()
+    }
+
+
+def upload_metadata(info):
+    """
+    Pola GeneratedImage opisujace przeslany plik.
+    """
+    variants = info.get("variants") or {}
+    return {
+        "width": info["width"],
+        "height": info["height"],
+        "file_size": info["bytes"],
+        "file_format": info["format"],
+        "thumbnail_url": variants.get("thumbnail", ""),
+        "medium_url": variants.get("medium", ""),
+    }
+
+
+def _retry_upload(source, with_variants):
+    """
+    Ponawia upload (DEFERRED_UPLOAD_ATTEMPTS prob z rosnacym odstepem DEFERRED_UPLOAD_BACKOFF_SECONDS).
+    """
+    attempts = getattr(settings, "DEFERRED_UPLOAD_ATTEMPTS", 3)
+    backoff = getattr(settings, "DEFERRED_UPLOAD_BACKOFF_SECONDS", 2.0)
+    for attempt in range(1, attempts + 1):
+        time.sleep(backoff * attempt)
+        print(f"🔁 Ponowienie uploadu ({attempt}/{attempts})")
+        info = upload_encoded(source, "generated_images", f"generated_{uuid.uuid4().hex}", None, with_variants)
+        if info:
+            return info
+    return None
+
+
+def fill_pending_uploads(futures, targets, sources):
+    """
+    Czeka na zakonczenie uploadow i podmienia placeholdery w bazie (dla GeneratedImage rowniez metadane pliku).
+    `targets` mapuje klucz uploadu na (model, id, nazwa_pola), `sources` - na bajty pliku do ponowienia.
+    Nieudany upload jest ponawiany; gdy i ponowienia zawioda, pole zostaje puste z upload_status "failed"
+    (widocznym w API), zamiast placeholdera udajacego adres.
+    """
+    from ..models import GeneratedImage
+
+    for key, future in futures.items():
+        model, pk, field_name = targets[key]
+        try:
+            info = future.result()
+        except Exception as e:
+            print(f"❌ Upload {key} nie powiódł się:", e)
+            info = None
+        if info is None and sources.get(key):
+            info = _retry_upload(sources[key], with_variants=model is GeneratedImage)
+
+        if info:
+            values = {field_name: info["url"], "upload_status": ""}
+            if model is GeneratedImage:
+                values.update(upload_metadata(info))
+        else:
+            values = {field_name: "", "upload_status": UPLOAD_FAILED}
+        model.objects.filter(id=pk).update(**values)
+        print(f"🔗 Uzupełniono {model.__name__} #{pk}: {info['url'] if info else 'upload nieudany'}")
@@ -0,0 +1,161 @@
+import io
+import os
+import re
+import zipfile
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+
+CHUNK_SIZE = 256 * 1024
+
+# pliki juz skompresowane (strumienie PDF to Flate/DCT) - w ZIP tylko przechowywane, bez ponownej kompresji
+STORED_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".webp", ".zip")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header, size):
+    """
+    Pojedynczy zakres "bytes=a-b" / "bytes=a-" / "bytes=-n" -> (start, end) wlacznie; None - brak, zakres
+    wielokrotny albo niepoprawny, np. "bytes=5-3" (serwujemy caly plik); False - zakres poza plikiem (416).
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if not length:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # skladniowo niepoprawny zakres (koniec przed poczatkiem) - ignorowany, jak brak naglowka
+        return None
+    if start >= size:
+        return False
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload_headers(path):
+    """
+    Naglowki przekazujace wysylke pliku serwerowi WWW (settings.DOWNLOAD_OFFLOAD): "nginx" - X-Accel-Redirect
+    na wewnetrzny location DOWNLOAD_ACCEL_PREFIX mapowany na MEDIA_ROOT, "sendfile" - X-Sendfile ze sciezka pliku.
+    """
+    mode = getattr(settings, "DOWNLOAD_OFFLOAD", "")
+    if mode == "nginx":
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+        return {"X-Accel-Redirect": settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + relative}
+    if mode == "sendfile":
+        return {"X-Sendfile": os.path.abspath(path)}
+    return None
+
+
+def file_download_response(request, path, file_name, content_type="application/octet-stream", etag=None):
+    """
+    Odpowiedz z plikiem do pobrania: ETag/If-None-Match (304), wysylka przez serwer WWW, gdy skonfigurowano
+    offload (Range obsluguje wtedy serwer), a bez niego strumieniowo z obsluga Range/If-Range (206/416) -
+    przerwane pobieranie duzej paczki mozna wznowic.
+    """
+    quoted_etag = f'"{etag}"' if etag else None
+    headers = {
+        "Content-Disposition": f'attachment; filename="{file_name}"',
+        "Access-Control-Expose-Headers": "Content-Disposition, Content-Length, Content-Range, ETag",
+        "Accept-Ranges": "bytes",
+    }
+    if quoted_etag:
+        headers["ETag"] = quoted_etag
+        if quoted_etag in request.headers.get("If-None-Match", ""):
+            return HttpResponse(status=304, headers=headers)
+
+    offload = _offload_headers(path)
+    if offload:
+        headers.update(offload)
+        return HttpResponse(content_type=content_type, headers=headers)
+
+    size = os.path.getsize(path)
+    byte_range = _parse_range(request.headers.get("Range"), size)
+    if_range = request.headers.get("If-Range")
+    if byte_range and if_range and if_range != quoted_etag:
+        byte_range = None
+
+    if byte_range is False:
+        headers["Content-Range"] = f"bytes */{size}"
+        return HttpResponse(status=416, headers=headers)
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    response = StreamingHttpResponse(
+        _read_range(path, start, length),
+        status=206 if byte_range else 200,
+        content_type=content_type,
+        headers=headers,
+    )
+    response["Content-Length"] = str(length)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+def compress_type(name):
+    return zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+
+class _ZipSink(io.RawIOBase):
+    """
+    Niewyszukiwalne ujscie dla zipfile: zbiera zapisane bajty do oproznienia przez generator. Bez seek()
+    zipfile zapisuje rozmiary i CRC w deskryptorach za danymi, wiec archiwum powstaje w jednym przebiegu.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def stream_zip(files):
+    """
+    Generator bajtow archiwum ZIP z plikow [(nazwa_w_archiwum, sciezka)]: pliki czytane po kolei kawalkami
+    CHUNK_SIZE, a kazdy kawalek od razu oddawany klientowi - pamiec nie rosnie z rozmiarem archiwum.
+    PDF-y i obrazy sa tylko przechowywane (STORED_EXTENSIONS), nie kompresowane ponownie.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        for arcname, path in files:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = compress_type(arcname)
+            with open(path, "rb") as source, archive.open(info, "w") as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    target.write(chunk)
+                    if sink.buffer:
+                        yield sink.drain()
+            if sink.buffer:
+                yield sink.drain()
+    yield sink.drain()
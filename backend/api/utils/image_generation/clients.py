@@ -0,0 +1,126 @@
+import os
+import threading
+from contextlib import contextmanager
+import requests
+import together
+from django.conf import settings
+from together import Together
+from urllib3.util.retry import Retry
+
+_lock = threading.Lock()
+_clients = {}
+_semaphores = {}
+_adapters = {}
+_sessions = threading.local()
+
+
+class ProviderBusy(RuntimeError):
+    """
+    Limit rownoleglych wywolan dostawcy wyczerpany dluzej niz `queue_timeout`.
+    """
+
+
+def _config(name):
+    defaults = {
+        "timeout": 120.0,
+        "max_retries": 2,
+        "connect_retries": 3,
+        "backoff": 0.5,
+        "pool_size": 10,
+        "max_concurrency": 4,
+        "queue_timeout": 60.0,
+    }
+    defaults.update(getattr(settings, "PROVIDER_CLIENTS", {}).get(name, {}))
+    return defaults
+
+
+def _shared_adapter(name):
+    """
+    Jeden HTTPAdapter (pula polaczen keep-alive urllib3) na dostawce - wspoldzielony przez sesje wszystkich watkow.
+    Ponawia tylko bledy polaczenia z wykladniczym backoffem; 429/5xx ponawia samo SDK (`max_retries`).
+    """
+    adapter = _adapters.get(name)
+    if adapter is None:
+        config = _config(name)
+        adapter = _adapters.setdefault(name, requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=config["pool_size"],
+            max_retries=Retry(
+                total=config["connect_retries"],
+                connect=config["connect_retries"],
+                read=0,
+                status=0,
+                backoff_factor=config["backoff"],
+                allowed_methods=None,
+            ),
+        ))
+    return adapter
+
+
+class _PooledSession(requests.Session):
+    """
+    Sesja na wspoldzielonym adapterze. SDK okresowo "odswieza" sesje wywolujac close() -
+    nie zamykamy wtedy puli, z ktorej korzystaja pozostale watki.
+    """
+
+    def close(self):
+        pass
+
+
+def _together_session():
+    """
+    Fabryka sesji dla SDK Together (together.requestssession). SDK trzyma sesje per watek,
+    a wszystkie one korzystaja z tej samej puli polaczen.
+    """
+    session = getattr(_sessions, "together", None)
+    if session is None:
+        session = _PooledSession()
+        session.mount("https://", _shared_adapter("together"))
+        _sessions.together = session
+    return session
+
+
+def get_together_client():
+    """
+    Zwraca wspoldzielonego (per proces) klienta Together z timeoutem i liczba ponowien z PROVIDER_CLIENTS.
+    """
+    client = _clients.get("together")
+    if client is None:
+        with _lock:
+            client = _clients.get("together")
+            if client is None:
+                config = _config("together")
+                together.requestssession = _together_session
+                client = Together(
+                    api_key=os.getenv("TOGETHER_API_KEY"),
+                    timeout=config["timeout"],
+                    max_retries=config["max_retries"],
+                )
+                _clients["together"] = client
+    return client
+
+
+def _semaphore(name):
+    semaphore = _semaphores.get(name)
+    if semaphore is None:
+        with _lock:
+            semaphore = _semaphores.get(name)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(_config(name)["max_concurrency"])
+                _semaphores[name] = semaphore
+    return semaphore
+
+
+@contextmanager
+def provider_slot(name="together"):
+    """
+    Ogranicza liczbe rownoleglych wywolan dostawcy w procesie (wszystkie watki i pule).
+    Gdy slot nie zwolni sie w `queue_timeout` sekund, rzuca ProviderBusy zamiast kolejkowac bez konca.
+    """
+    semaphore = _semaphore(name)
+    if not semaphore.acquire(timeout=_config(name)["queue_timeout"]):
+        raise ProviderBusy(f"Dostawca {name} jest przeciążony, spróbuj ponownie później.")
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -1,20 +1,61 @@
-import os
-from dotenv import load_dotenv
-from .prompt_generator import get_detailed_prompt_from_model
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from .prompt_generator import (
+    get_detailed_prompt_from_model,
+    stream_detailed_prompt,
+    CREATIVE_THEME_PROMPT,
+    DEFAULT_REWRITE_MODEL,
+    DEFAULT_REWRITE_TEMPERATURE,
+)
+from .prompt_cache import rewrite_cache_key, get_cached_rewrite, store_rewrite
 from .image_generator import generate_image
-from together import Together
-load_dotenv()
+from .providers import get_provider
+from ..background import get_executor
+
+HEARTBEAT_SECONDS = 5
+
+def _rewrite_key(base_prompt, attributes, model, temperature):
+    if base_prompt == CREATIVE_THEME_PROMPT:
+        return None
+    return rewrite_cache_key(base_prompt, attributes, model, temperature)
+
+def get_detailed_prompt_cached(provider, base_prompt, fresh=False,
+                               model=DEFAULT_REWRITE_MODEL, temperature=DEFAULT_REWRITE_TEMPERATURE,
+                               **attributes):
+    """
+    Przepisanie promptu przez model jezykowy z trwalym cache (PromptRewrite).
+    `fresh=True` pomija odczyt z cache (wynik i tak zostaje zapisany). Prosba o losowy motyw
+    (CREATIVE_THEME_PROMPT) nigdy nie jest cache'owana.
+    """
+    key = _rewrite_key(base_prompt, attributes, model, temperature)
+
+    if key and not fresh:
+        cached = get_cached_rewrite(key)
+        if cached:
+            print("♻️ Prompt z cache przepisań")
+            return cached
+
+    detailed_prompt = get_detailed_prompt_from_model(
+        provider=provider,
+        base_prompt=base_prompt,
+        model=model,
+        temperature=temperature,
+        **attributes,
+    )
+
+    if key and detailed_prompt:
+        store_rewrite(key, model, detailed_prompt)
+    return detailed_prompt
 
 def generate_image_from_prompt(base_prompt, width, height,
                                 inspiration, color, composition,
                                 style, atmosfera=None, tlo=None, perspektywa=None,
-                                detale=None, realizm=None, styl_narracyjny=None):
-    api_key = os.getenv("TOGETHER_API_KEY")
-    client = Together(api_key=api_key)
-    
-    detailed_prompt = get_detailed_prompt_from_model(
-        client=client,
+                                detale=None, realizm=None, styl_narracyjny=None, n=1, fresh=False):
+    provider = get_provider()
+
+    detailed_prompt = get_detailed_prompt_cached(
+        provider=provider,
         base_prompt=base_prompt,
+        fresh=fresh,
         inspiration=inspiration,
         color=color,
         composition=composition,
@@ -29,8 +70,52 @@ def generate_image_from_prompt(base_prompt, width, height,
 
     if not detailed_prompt:
         raise ValueError("Failed to get detailed prompt.")
-    image_bytes = generate_image(client, detailed_prompt, width, height)
+    images = generate_image(provider, detailed_prompt, width, height, n=n)
     print(detailed_prompt)
-    if not image_bytes:
+    if not images:
+        raise ValueError("Failed to generate image.")
+    return images
+
+
+def stream_image_from_prompt(base_prompt, width, height, n=1, fresh=False,
+                             model=DEFAULT_REWRITE_MODEL, temperature=DEFAULT_REWRITE_TEMPERATURE,
+                             **attributes):
+    """
+    Wersja strumieniowa generate_image_from_prompt. Generator zwraca zdarzenia przepisywania
+    (("reasoning", n), ("delta", tekst)), nastepnie ("prompt", prompt) - w tym momencie zapytanie
+    o obraz jest juz wyslane - potem ("heartbeat", None) w trakcie generacji i na koncu ("images", [bytes]).
+    """
+    provider = get_provider()
+
+    key = _rewrite_key(base_prompt, attributes, model, temperature)
+    detailed_prompt = get_cached_rewrite(key) if key and not fresh else None
+
+    if not detailed_prompt:
+        for event, value in stream_detailed_prompt(
+            provider, base_prompt, model=model, temperature=temperature, **attributes
+        ):
+            if event == "prompt":
+                detailed_prompt = value
+            else:
+                yield event, value
+        if key and detailed_prompt:
+            store_rewrite(key, model, detailed_prompt)
+
+    if not detailed_prompt:
+        raise ValueError("Failed to get detailed prompt.")
+
+    future = get_executor("generation-dispatch").submit(
+        generate_image, provider, detailed_prompt, width, height, n=n
+    )
+    yield "prompt", detailed_prompt
+
+    while True:
+        try:
+            images = future.result(timeout=HEARTBEAT_SECONDS)
+            break
+        except FutureTimeoutError:
+            yield "heartbeat", None
+
+    if not images:
         raise ValueError("Failed to generate image.")
-    return image_bytes
+    yield "images", images
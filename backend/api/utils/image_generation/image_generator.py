@@ -1,21 +1,8 @@
-import base64
-
-def generate_image(client, prompt, width, height):
+def generate_image(provider, prompt, width, height, n=3):
     print("prompt", prompt)
-    response = client.images.generate(
-        prompt=prompt,
-        model="black-forest-labs/FLUX.1-schnell",
-        width=width,
-        height=height,
-        steps=4,
-        n=3,
-        response_format="b64_json",
-    )
+    images = provider.generate_images(prompt, width, height, n)
 
-    if not response.data:
+    if not images:
         raise ValueError("No image data received.")
 
-    image_data = response.data[0].b64_json
-    image_bytes = base64.b64decode(image_data)
-
-    return image_bytes
+    return images
@@ -0,0 +1,390 @@
+import threading
+import time
+import uuid
+from concurrent.futures import as_completed
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from ...models import GeneratedImage, GenerationJob
+from ..background import submit
+from ..cloudinary_upload import start_uploads, upload_metadata
+from ..taxonomy_cache import TAXONOMY_MODELS, get_taxonomy_item
+from .generation import generate_image_from_prompt, stream_image_from_prompt
+
+DEFAULT_WIDTH = 1792
+DEFAULT_HEIGHT = 1200
+DEFAULT_VARIANTS = 3
+MAX_VARIANTS = 4
+MAX_BATCH_ITEMS = 20
+
+FINISHED_STATUSES = ("done", "failed")
+
+STALE_JOB_ERROR = "Zadanie przerwane (np. restart serwera) — spróbuj ponownie."
+
+
+def _config():
+    defaults = {"queued_seconds": 900, "running_seconds": 900}
+    defaults.update(getattr(settings, "GENERATION_JOBS", {}))
+    return defaults
+
+
+def _provider_kwargs(prompt, taxonomies):
+    """
+    Mapuje prompt i instancje slownikow na argumenty generate_image_from_prompt / stream_image_from_prompt.
+    """
+    names = {key: obj.nazwa if obj else None for key, obj in taxonomies.items()}
+    return dict(
+        base_prompt=prompt if prompt else None,
+        inspiration=names.get("inspiracja"),
+        color=names.get("kolorystyka"),
+        composition=names.get("kompozycja"),
+        style=names.get("styl_artystyczny"),
+        atmosfera=names.get("atmosfera"),
+        tlo=names.get("tlo"),
+        perspektywa=names.get("perspektywa"),
+        detale=names.get("detale"),
+        realizm=names.get("realizm"),
+        styl_narracyjny=names.get("styl_narracyjny"),
+    )
+
+
+def render_images(prompt, taxonomies, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, n=DEFAULT_VARIANTS,
+                  fresh=False):
+    """
+    Generuje `n` wariantow obrazu dla promptu i wybranych slownikow jednym wywolaniem dostawcy,
+    wysyla je rownolegle do Cloudinary i zwraca liste wynikow uploadu {url, width, height, bytes, format}
+    (warianty, ktorych upload sie nie udal, sa pomijane).
+    `taxonomies` mapuje klucz slownika na instancje (lub None); `fresh` pomija cache przepisan promptu.
+    """
+    images = generate_image_from_prompt(
+        width=width,
+        height=height,
+        n=n,
+        fresh=fresh,
+        **_provider_kwargs(prompt, taxonomies),
+    )
+    print(f"✅ Wygenerowano wariantów: {len(images)}")
+
+    return upload_variants(images)
+
+
+def store_generated_images(user, prompt, taxonomies, uploads, name=None, generation_id=None):
+    """
+    Zapisuje warianty jednej generacji jako rodzenstwo GeneratedImage (wspolne generation_id) jednym bulk_create.
+    `uploads` to wyniki upload_encoded - wymiary, rozmiar i format pochodza z faktycznie zapisanego pliku.
+    """
+    return GeneratedImage.objects.bulk_create(
+        _image_rows(user, prompt, taxonomies, uploads, name, generation_id or uuid.uuid4())
+    )
+
+
+def _image_rows(user, prompt, taxonomies, uploads, name, generation_id):
+    extra = {"name": name} if name else {}
+    return [
+        GeneratedImage(
+            author=user,
+            prompt=prompt or "",
+            url=info["url"],
+            generation_id=generation_id,
+            **upload_metadata(info),
+            **taxonomies,
+            **extra,
+        )
+        for info in uploads
+    ]
+
+
+def _image_summary(image):
+    return {"id": image.id, "url": image.url, "thumbnail_url": image.thumbnail_url or image.url}
+
+
+def upload_variants(images):
+    """
+    Rownolegly upload wariantow; zwraca wyniki uploadu w kolejnosci wariantow (bez nieudanych).
+    """
+    futures = start_uploads(dict(enumerate(images)), "generated_images", with_variants=True)
+    uploads = [futures[i].result() for i in sorted(futures)]
+    uploads = [info for info in uploads if info]
+    if not uploads:
+        raise ValueError("Nie udało się przesłać wygenerowanych obrazów.")
+    print("🌐 URL-e wygenerowanych obrazów:", [info["url"] for info in uploads])
+    return uploads
+
+
+def stream_generation(user, prompt, taxonomies, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
+                      n=DEFAULT_VARIANTS, fresh=False, name=None):
+    """
+    Generacja ze strumieniowanym przepisaniem promptu. Przekazuje dalej zdarzenia
+    stream_image_from_prompt, a zamiast surowych bajtow zwraca ("images", {...}) z zapisanymi obrazami.
+    """
+    for event, value in stream_image_from_prompt(
+        width=width,
+        height=height,
+        n=n,
+        fresh=fresh,
+        **_provider_kwargs(prompt, taxonomies),
+    ):
+        if event != "images":
+            yield event, value
+            continue
+
+        yield "uploading", len(value)
+        images = store_generated_images(user, prompt, taxonomies, upload_variants(value), name=name)
+        yield "images", {
+            "generation_id": str(images[0].generation_id),
+            "images": [_image_summary(image) for image in images],
+        }
+
+
+def _taxonomy_ids(taxonomies):
+    return {key: obj.id if obj else None for key, obj in taxonomies.items()}
+
+
+def _load_taxonomies(ids):
+    return {key: get_taxonomy_item(key, (ids or {}).get(key)) for key in TAXONOMY_MODELS}
+
+
+def enqueue_generation(user, prompt, taxonomies, name=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
+                       n=DEFAULT_VARIANTS, fresh=False):
+    """
+    Tworzy GenerationJob i zleca go lokalnej puli `generation`. Zwraca zadanie w stanie `queued`.
+    """
+    job = GenerationJob.objects.create(
+        author=user,
+        params={
+            "prompt": prompt,
+            "name": name,
+            "width": width,
+            "height": height,
+            "n": n,
+            "fresh": fresh,
+            "taxonomies": _taxonomy_ids(taxonomies),
+        },
+    )
+    submit("generation", run_generation_job, job.id)
+    return job
+
+
+def enqueue_generation_batch(user, specs, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    """
+    Tworzy jedno zadanie GenerationJob dla serii promptow. `specs` to lista slownikow
+    {prompt, taxonomies, name, n, fresh} (taxonomies jak w render_images).
+    """
+    job = GenerationJob.objects.create(
+        author=user,
+        params={
+            "width": width,
+            "height": height,
+            "items": [
+                {
+                    "prompt": spec.get("prompt"),
+                    "name": spec.get("name"),
+                    "n": spec.get("n") or DEFAULT_VARIANTS,
+                    "fresh": bool(spec.get("fresh")),
+                    "taxonomies": _taxonomy_ids(spec["taxonomies"]),
+                }
+                for spec in specs
+            ],
+        },
+    )
+    submit("generation", run_generation_job, job.id)
+    return job
+
+
+def _generate_spec(spec, width, height):
+    return generate_image_from_prompt(
+        width=width,
+        height=height,
+        n=spec["n"],
+        fresh=spec["fresh"],
+        **_provider_kwargs(spec["prompt"], spec["taxonomies"]),
+    )
+
+
+def render_batch(user, specs, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
+    """
+    Generuje serie obrazow: wszystkie prompty rownolegle w puli `generation-batch` (limit zapytan do dostawcy
+    pilnuje provider_slot), upload wariantow rusza zaraz po zakonczeniu danej generacji, a wszystkie
+    wiersze GeneratedImage trafiaja do bazy jednym bulk_create. Bledy sa raportowane per pozycja.
+    """
+    generations = {
+        submit("generation-batch", _generate_spec, spec, width, height): index
+        for index, spec in enumerate(specs)
+    }
+
+    uploads = {}
+    errors = {}
+    for future in as_completed(generations):
+        index = generations[future]
+        try:
+            images = future.result()
+        except Exception as e:
+            print(f"❌ Pozycja {index} serii zakończona błędem:", e)
+            errors[index] = str(e)
+            continue
+        uploads[index] = start_uploads(dict(enumerate(images)), "generated_images", with_variants=True)
+
+    rows = {}
+    for index, futures in uploads.items():
+        results = [futures[i].result() for i in sorted(futures)]
+        results = [info for info in results if info]
+        if not results:
+            errors[index] = "Nie udało się przesłać wygenerowanych obrazów."
+            continue
+        spec = specs[index]
+        rows[index] = _image_rows(
+            user, spec["prompt"], spec["taxonomies"], results, spec.get("name"), uuid.uuid4()
+        )
+
+    GeneratedImage.objects.bulk_create([row for index in sorted(rows) for row in rows[index]])
+    print(f"✅ Seria: zapisano {len(rows)}/{len(specs)} pozycji")
+
+    results = []
+    for index in range(len(specs)):
+        if index in errors:
+            results.append({"index": index, "error": errors[index]})
+            continue
+        images = rows[index]
+        results.append({
+            "index": index,
+            "generation_id": str(images[0].generation_id),
+            "images": [_image_summary(image) for image in images],
+        })
+    return results
+
+
+def _run_single(job):
+    params = job.params
+    taxonomies = _load_taxonomies(params.get("taxonomies"))
+    width = params.get("width") or DEFAULT_WIDTH
+    height = params.get("height") or DEFAULT_HEIGHT
+    uploads = render_images(
+        params.get("prompt"),
+        taxonomies,
+        width,
+        height,
+        params.get("n") or DEFAULT_VARIANTS,
+        fresh=bool(params.get("fresh")),
+    )
+    images = store_generated_images(
+        job.author,
+        params.get("prompt"),
+        taxonomies,
+        uploads,
+        name=params.get("name"),
+        generation_id=job.id,
+    )
+    return {
+        "generation_id": str(job.id),
+        "image_id": images[0].id,
+        "url": images[0].url,
+        "images": [_image_summary(image) for image in images],
+    }
+
+
+def _run_batch(job):
+    params = job.params
+    specs = [
+        dict(item, taxonomies=_load_taxonomies(item.get("taxonomies")))
+        for item in params["items"]
+    ]
+    results = render_batch(
+        job.author,
+        specs,
+        params.get("width") or DEFAULT_WIDTH,
+        params.get("height") or DEFAULT_HEIGHT,
+    )
+    if all("error" in item for item in results):
+        raise ValueError("Żadna pozycja serii nie została wygenerowana.")
+    return {"generations": results}
+
+
+@contextmanager
+def _heartbeat(job_id):
+    """
+    Na czas wykonywania zadania watek pomocniczy odswieza heartbeat_at co 1/3 `running_seconds` -
+    dlugie zadanie (np. seria czekajaca na provider_slot) nie jest brane za porzucone.
+    """
+    stop = threading.Event()
+    interval = _config()["running_seconds"] / 3
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                GenerationJob.objects.filter(id=job_id, status="running").update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_generation_job(job_id):
+    """
+    Wykonuje zadanie generowania w watku puli: generacja, upload, zapis GeneratedImage
+    (pojedyncza generacja albo seria, gdy params zawiera `items`). Wynik zapisywany tylko, gdy zadanie
+    wciaz jest `running` - zadanie uznane w miedzyczasie za porzucone zostaje `failed`.
+    """
+    now = timezone.now()
+    updated = GenerationJob.objects.filter(id=job_id, status="queued").update(
+        status="running", started_at=now, heartbeat_at=now
+    )
+    if not updated:
+        return
+
+    job = GenerationJob.objects.select_related("author").get(id=job_id)
+
+    try:
+        with _heartbeat(job_id):
+            result = _run_batch(job) if "items" in job.params else _run_single(job)
+        values = {"status": "done", "result": result}
+        print(f"📝 Zadanie {job_id} zakończone")
+
+    except Exception as e:
+        print(f"❌ Zadanie {job_id} zakończone błędem:", e)
+        values = {"status": "failed", "error": str(e)}
+
+    if not GenerationJob.objects.filter(id=job_id, status="running").update(finished_at=timezone.now(), **values):
+        print(f"⚠️ Zadanie {job_id} oznaczono już jako porzucone — wynik pominięty")
+
+
+def expire_stale_job(job):
+    """
+    Zadania zyja tylko w puli watkow procesu - po restarcie `queued`/`running` nikt ich nie dokonczy.
+    Zadanie czekajace w kolejce dluzej niz `queued_seconds` albo `running` bez heartbeatu od `running_seconds`
+    (settings.GENERATION_JOBS) jest oznaczane jako `failed`, zeby klient nie czekal na nie w nieskonczonosc.
+    """
+    if job.status in FINISHED_STATUSES:
+        return job
+    config = _config()
+    now = timezone.now()
+    stale = (
+        Q(status="queued", created_at__lt=now - timedelta(seconds=config["queued_seconds"]))
+        | Q(status="running", heartbeat_at__lt=now - timedelta(seconds=config["running_seconds"]))
+    )
+    if GenerationJob.objects.filter(stale, id=job.id).update(status="failed", error=STALE_JOB_ERROR, finished_at=now):
+        print(f"⚠️ Zadanie {job.id} porzucone ({job.status}) — oznaczone jako błąd")
+        job.refresh_from_db()
+    return job
+
+
+def wait_for_job(job, timeout, interval=0.5):
+    """
+    Long-poll: odswieza zadanie do czasu zakonczenia lub uplywu `timeout` sekund
+    (porzucone zadania konczy expire_stale_job).
+    """
+    deadline = time.monotonic() + timeout
+    job = expire_stale_job(job)
+    while job.status not in FINISHED_STATUSES and time.monotonic() < deadline:
+        time.sleep(interval)
+        job.refresh_from_db()
+        job = expire_stale_job(job)
+    return job
@@ -0,0 +1,56 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from ...models import PromptRewrite
+
+
+def _normalize(value):
+    if value is None:
+        return ""
+    return " ".join(str(value).split()).lower()
+
+
+def rewrite_cache_key(base_prompt, attributes, model, temperature):
+    """
+    Buduje klucz cache przepisanego promptu: hash znormalizowanego promptu bazowego,
+    wartosci slownikow, modelu i temperatury.
+    """
+    payload = {
+        "base_prompt": _normalize(base_prompt),
+        "attributes": {key: _normalize(value) for key, value in sorted(attributes.items())},
+        "model": model,
+        "temperature": round(float(temperature), 3),
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_rewrite(key):
+    """
+    Zwraca zapamietany prompt, jesli wpis istnieje i nie jest starszy niz PROMPT_REWRITE_TTL_SECONDS.
+    """
+    ttl = getattr(settings, "PROMPT_REWRITE_TTL_SECONDS", 7 * 24 * 3600)
+    entry = (
+        PromptRewrite.objects
+        .filter(key=key, created_at__gte=timezone.now() - timedelta(seconds=ttl))
+        .only("id", "prompt")
+        .first()
+    )
+    if not entry:
+        return None
+
+    PromptRewrite.objects.filter(id=entry.id).update(hits=F("hits") + 1)
+    return entry.prompt
+
+
+def store_rewrite(key, model, prompt):
+    """
+    Zapisuje (lub odswieza) przepisany prompt pod danym kluczem.
+    """
+    PromptRewrite.objects.update_or_create(
+        key=key,
+        defaults={"model": model, "prompt": prompt, "created_at": timezone.now(), "hits": 0},
+    )
@@ -1,3 +1,7 @@
+CREATIVE_THEME_PROMPT = "Please generate a creative, visually rich theme for an illustration. Provide only the theme in 3–6 words, no extra explanation."
+DEFAULT_REWRITE_MODEL = "ServiceNow-AI/Apriel-1.6-15b-Thinker"
+DEFAULT_REWRITE_TEMPERATURE = 0.7
+
 def generate_custom_prompt(
     baseprompt,
     inspiration=None,
@@ -11,7 +15,7 @@ def generate_custom_prompt(
     realizm=None,
     styl_narracyjny=None
 ):
-    special_text = "Please generate a creative, visually rich theme for an illustration. Provide only the theme in 3–6 words, no extra explanation."
+    special_text = CREATIVE_THEME_PROMPT
 
     if baseprompt and baseprompt != special_text:
         prompt = (
@@ -55,24 +59,119 @@ def generate_custom_prompt(
         prompt += f"The narrative style of the image should resemble: {styl_narracyjny}. "
     return prompt
 
-def get_detailed_prompt_from_model(
-    client,
-    base_prompt: str,
-    inspiration: str = None,
-    color: str = None,
-    composition: str = None,
-    style: str = None,
-    atmosfera: str = None,
-    tlo: str = None,
-    perspektywa: str = None,
-    detale: str = None,
-    realizm: str = None,
-    styl_narracyjny: str = None,
-    model: str = "ServiceNow-AI/Apriel-1.6-15b-Thinker",
-    temperature: float = 0.7,
-    stream: bool = False
+FINAL_BEGIN_MARKER = "[BEGIN FINAL RESPONSE]"
+FINAL_END_MARKER = "[END FINAL RESPONSE]"
+THINK_END_MARKER = "</think>"
+END_OF_TURN_MARKERS = ("<|end|>",)
+
+
+def strip_reasoning(text):
+    """
+    Usuwa z odpowiedzi modelu "Thinker" sekcje rozumowania i zwraca wylacznie finalny prompt.
+    Obsluguje format Apriel ([BEGIN/END FINAL RESPONSE]) oraz bloki <think>...</think>.
+    """
+    if not text:
+        return text
+
+    if FINAL_BEGIN_MARKER in text:
+        text = text.split(FINAL_BEGIN_MARKER, 1)[1]
+        text = text.split(FINAL_END_MARKER, 1)[0]
+    elif THINK_END_MARKER in text:
+        text = text.rsplit(THINK_END_MARKER, 1)[1]
+
+    for marker in END_OF_TURN_MARKERS:
+        text = text.replace(marker, "")
+    return text.strip()
+
+
+class ReasoningStripper:
+    """
+    Przyrostowa wersja strip_reasoning dla odpowiedzi strumieniowanej.
+    feed() zwraca fragment finalnego promptu gotowy do wyslania (lub ""), a `finished`
+    staje sie True, gdy model domknie sekcje finalna - dalsze tokeny mozna pominac.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.in_final = False
+        self.finished = False
+        self.emitted = 0
+        self.final_start = 0
+        self.begin_checked = False
+
+    @property
+    def reasoning_chars(self):
+        return 0 if self.in_final else len(self.buffer)
+
+    def feed(self, delta):
+        if self.finished or not delta:
+            return ""
+        self.buffer += delta
+
+        if not self.in_final:
+            for marker in (FINAL_BEGIN_MARKER, THINK_END_MARKER):
+                index = self.buffer.find(marker)
+                if index != -1:
+                    self.in_final = True
+                    self.final_start = index + len(marker)
+                    self.emitted = self.final_start
+                    self.begin_checked = marker == FINAL_BEGIN_MARKER
+                    break
+            if not self.in_final:
+                return ""
+
+        if not self.begin_checked:
+            # po </think> model moze jeszcze otworzyc sekcje [BEGIN FINAL RESPONSE]
+            rest = self.buffer[self.final_start:].lstrip()
+            if FINAL_BEGIN_MARKER.startswith(rest):
+                return ""
+            if rest.startswith(FINAL_BEGIN_MARKER):
+                self.final_start = self.buffer.index(FINAL_BEGIN_MARKER, self.final_start) + len(FINAL_BEGIN_MARKER)
+                self.emitted = self.final_start
+            self.begin_checked = True
+
+        end = self.buffer.find(FINAL_END_MARKER, self.final_start)
+        if end != -1:
+            self.finished = True
+            chunk = self.buffer[self.emitted:end]
+            self.emitted = end
+            return chunk
+
+        # wstrzymujemy ogon, ktory moze byc poczatkiem znacznika konca
+        safe = max(self.emitted, len(self.buffer) - len(FINAL_END_MARKER) + 1)
+        chunk = self.buffer[self.emitted:safe]
+        self.emitted = safe
+        return chunk
+
+    def flush(self):
+        """
+        Oddaje wstrzymany ogon sekcji finalnej po zakonczeniu strumienia bez znacznika konca.
+        """
+        if self.finished or not self.in_final:
+            return ""
+        chunk = self.buffer[self.emitted:]
+        self.emitted = len(self.buffer)
+        for marker in END_OF_TURN_MARKERS:
+            chunk = chunk.replace(marker, "")
+        return chunk.rstrip()
+
+    def result(self):
+        return strip_reasoning(self.buffer)
+
+
+def build_rewrite_messages(
+    base_prompt,
+    inspiration=None,
+    color=None,
+    composition=None,
+    style=None,
+    atmosfera=None,
+    tlo=None,
+    perspektywa=None,
+    detale=None,
+    realizm=None,
+    styl_narracyjny=None,
 ):
- 
     raw_attributes = generate_custom_prompt(
         baseprompt=base_prompt,
         inspiration=inspiration,
@@ -96,7 +195,7 @@ def get_detailed_prompt_from_model(
         "Do not list the requirements, just write the final visual description."
     )
 
-    messages = [
+    return [
         {
             "role": "system",
             "content": (
@@ -113,13 +212,80 @@ def get_detailed_prompt_from_model(
         {"role": "user", "content": user_instruction}
     ]
 
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-        stream=stream
+
+def stream_detailed_prompt(
+    provider,
+    base_prompt: str,
+    model: str = DEFAULT_REWRITE_MODEL,
+    temperature: float = DEFAULT_REWRITE_TEMPERATURE,
+    **attributes
+):
+    """
+    Strumieniuje przepisanie promptu. Generator zwraca zdarzenia:
+    ("reasoning", liczba_znakow) w trakcie rozumowania, ("delta", tekst) dla fragmentow finalnego
+    promptu oraz na koncu ("prompt", pelny_prompt). Strumien jest zamykany, gdy tylko model domknie
+    sekcje finalna - reszty tokenow nie czekamy.
+    """
+    chunks = provider.stream_complete(model, build_rewrite_messages(base_prompt, **attributes), temperature)
+
+    stripper = ReasoningStripper()
+    try:
+        for delta in chunks:
+            text = stripper.feed(delta)
+            if text:
+                yield "delta", text
+            elif not stripper.in_final:
+                yield "reasoning", stripper.reasoning_chars
+            if stripper.finished:
+                break
+    finally:
+        chunks.close()
+
+    tail = stripper.flush()
+    if tail:
+        yield "delta", tail
+    yield "prompt", stripper.result()
+
+
+def get_detailed_prompt_from_model(
+    provider,
+    base_prompt: str,
+    inspiration: str = None,
+    color: str = None,
+    composition: str = None,
+    style: str = None,
+    atmosfera: str = None,
+    tlo: str = None,
+    perspektywa: str = None,
+    detale: str = None,
+    realizm: str = None,
+    styl_narracyjny: str = None,
+    model: str = DEFAULT_REWRITE_MODEL,
+    temperature: float = DEFAULT_REWRITE_TEMPERATURE,
+    stream: bool = False
+):
+    attributes = dict(
+        inspiration=inspiration,
+        color=color,
+        composition=composition,
+        style=style,
+        atmosfera=atmosfera,
+        tlo=tlo,
+        perspektywa=perspektywa,
+        detale=detale,
+        realizm=realizm,
+        styl_narracyjny=styl_narracyjny,
     )
 
-    content = response.choices[0].message.content
-    
-    return content.strip()
\ No newline at end of file
+    if stream:
+        prompt = None
+        for event, value in stream_detailed_prompt(
+            provider, base_prompt, model=model, temperature=temperature, **attributes
+        ):
+            if event == "prompt":
+                prompt = value
+        return prompt
+
+    content = provider.complete(model, build_rewrite_messages(base_prompt, **attributes), temperature)
+
+    return strip_reasoning(content)
\ No newline at end of file
@@ -0,0 +1,190 @@
+import base64
+import hashlib
+import io
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from django.conf import settings
+from PIL import Image, ImageDraw
+from .clients import get_together_client, provider_slot
+
+_lock = threading.Lock()
+_providers = {}
+
+
+class ProviderError(RuntimeError):
+    """
+    Blad zwrocony przez dostawce (w tym bledy wstrzykiwane przez StubProvider).
+    """
+
+
+class ImageProvider(ABC):
+    """
+    Interfejs dostawcy generacji: przepisanie promptu przez model jezykowy (calosc lub strumien
+    fragmentow tekstu) oraz generacja `n` obrazow (lista bajtow). Kazde wywolanie zajmuje slot
+    provider_slot(name), wiec limity wspolbieznosci dzialaja tak samo dla kazdego backendu.
+    """
+    name = None
+
+    @abstractmethod
+    def complete(self, model, messages, temperature):
+        pass
+
+    @abstractmethod
+    def stream_complete(self, model, messages, temperature):
+        pass
+
+    @abstractmethod
+    def generate_images(self, prompt, width, height, n):
+        pass
+
+
+class TogetherProvider(ImageProvider):
+    name = "together"
+    image_model = "black-forest-labs/FLUX.1-schnell"
+
+    def __init__(self):
+        self.client = get_together_client()
+
+    def complete(self, model, messages, temperature):
+        with provider_slot(self.name):
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=False
+            )
+        return response.choices[0].message.content
+
+    def stream_complete(self, model, messages, temperature):
+        # slot trzymamy przez caly strumien - polaczenie jest zajete do jego zamkniecia
+        with provider_slot(self.name):
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True
+            )
+            try:
+                for chunk in response:
+                    if not chunk.choices or not chunk.choices[0].delta:
+                        continue
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                close = getattr(response, "close", None)
+                if close:
+                    close()
+
+    def generate_images(self, prompt, width, height, n):
+        with provider_slot(self.name):
+            response = self.client.images.generate(
+                prompt=prompt,
+                model=self.image_model,
+                width=width,
+                height=height,
+                steps=4,
+                n=n,
+                response_format="b64_json",
+            )
+        return [base64.b64decode(item.b64_json) for item in (response.data or []) if item.b64_json]
+
+
+class StubProvider(ImageProvider):
+    """
+    Lokalny, deterministyczny dostawca do testow obciazeniowych: obrazy syntetyczne zadanego rozmiaru
+    (kolor zalezny od promptu), opoznienia z rozkladu log-normalnego i losowe bledy z `error_rate`.
+    Konfiguracja: settings.STUB_PROVIDER.
+    """
+    name = "stub"
+
+    def __init__(self):
+        config = getattr(settings, "STUB_PROVIDER", {})
+        self.rewrite_latency = config.get("rewrite_latency", (0.8, 0.3))
+        self.image_latency = config.get("image_latency", (2.0, 0.3))
+        self.error_rate = config.get("error_rate", 0.0)
+        self.random = random.Random(config.get("seed", 0))
+
+    def _draw(self):
+        with _lock:
+            return self.random.random()
+
+    def _sleep(self, latency):
+        median, sigma = latency
+        with _lock:
+            delay = self.random.lognormvariate(0, sigma) * median if median else 0
+        time.sleep(delay)
+
+    def _maybe_fail(self):
+        if self.error_rate and self._draw() < self.error_rate:
+            raise ProviderError("Stub: wstrzykniety blad dostawcy")
+
+    def _rewrite(self, messages):
+        user_content = messages[-1]["content"] if messages else ""
+        description = " ".join(user_content.split())[:300]
+        return (
+            "<think>Stub reasoning about the requested scene.</think>"
+            "[BEGIN FINAL RESPONSE]"
+            f"A synthetic test scene: {description}"
+            "[END FINAL RESPONSE]"
+        )
+
+    def complete(self, model, messages, temperature):
+        with provider_slot(self.name):
+            self._sleep(self.rewrite_latency)
+            self._maybe_fail()
+            return self._rewrite(messages)
+
+    def stream_complete(self, model, messages, temperature):
+        with provider_slot(self.name):
+            text = self._rewrite(messages)
+            chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+            median, sigma = self.rewrite_latency
+            self._sleep((median / 4, sigma))
+            self._maybe_fail()
+            for chunk in chunks:
+                time.sleep(median * 0.75 / len(chunks))
+                yield chunk
+
+    def generate_images(self, prompt, width, height, n):
+        with provider_slot(self.name):
+            self._sleep(self.image_latency)
+            self._maybe_fail()
+            return [self._image(prompt, index, width, height) for index in range(n)]
+
+    @staticmethod
+    def _image(prompt, index, width, height):
+        digest = hashlib.sha256(f"{prompt}|{index}".encode("utf-8")).digest()
+        image = Image.new("RGB", (width, height), tuple(digest[:3]))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle(
+            [width // 4, height // 4, width * 3 // 4, height * 3 // 4],
+            fill=tuple(digest[3:6]),
+        )
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+PROVIDERS = {
+    "together": TogetherProvider,
+    "stub": StubProvider,
+}
+
+
+def get_provider(name=None):
+    """
+    Zwraca wspoldzielona instancje dostawcy wybranego w settings.IMAGE_PROVIDER (domyslnie "together").
+    """
+    name = name or getattr(settings, "IMAGE_PROVIDER", "together")
+    provider = _providers.get(name)
+    if provider is None:
+        if name not in PROVIDERS:
+            raise ValueError(f"Nieznany dostawca generacji: {name}")
+        with _lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = PROVIDERS[name]()
+                _providers[name] = provider
+    return provider
@@ -0,0 +1,185 @@
+import os
+import shutil
+import time
+from django.conf import settings
+from django.core.cache import cache
+from ..models import CalendarProduction
+from . import background
+
+SWEEP_CACHE_KEY = "storage-janitor:last-sweep"
+
+# produkcje, ktorych pliki sa wlasnie renderowane albo zaraz beda - nigdy ich nie usuwamy
+ACTIVE_STATUSES = ("to_produce", "in_production")
+
+EXPORT_PREFIX = "calendar_"
+
+# katalogi zadan druku z punktami kontrolnymi (calendar_generation/checkpoints.py) - wznawiane po bledzie
+JOB_PREFIX = "job_"
+
+
+def _config():
+    defaults = {
+        "retention_days": {"done": 30, "archived": 7, "rejected": 1, "draft": 7, "orphan": 3},
+        "temp_hours": 6,
+        "checkpoint_hours": 48,
+        "downloads_hours": 24,
+        "exports_quota_mb": 0,
+        "interval_hours": 6,
+        "min_free_mb": 2048,
+    }
+    defaults.update(getattr(settings, "STORAGE_JANITOR", {}))
+    return defaults
+
+
+def categories():
+    """
+    Katalogi pod nadzorem: eksporty druku, katalogi robocze renderu, pobrane upscale i magazyn obrazow
+    (ten ostatni tylko raportujemy - to trwale dane uzytkownikow).
+    """
+    return {
+        "exports": settings.CALENDAR_EXPORTS_ROOT,
+        "temp": settings.CALENDAR_TEMP_ROOT,
+        "downloads": settings.UPSCALE_DOWNLOADS_ROOT,
+        "storage": settings.LOCAL_STORAGE_ROOT,
+    }
+
+
+def tree_stats(path):
+    """
+    (bajty, liczba plikow, czas ostatniej modyfikacji) pliku albo katalogu z podkatalogami - wiek katalogu
+    to wiek jego najnowszego pliku (pusty katalog - wlasny mtime).
+    """
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return stat.st_size, 1, stat.st_mtime
+    size, files, newest = 0, 0, 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            size += stat.st_size
+            files += 1
+            newest = max(newest, stat.st_mtime)
+    if not files and os.path.exists(path):
+        newest = os.stat(path).st_mtime
+    return size, files, newest
+
+
+def disk_usage():
+    """
+    Zajetosc dysku per kategoria ({"bytes", "files", "path"}) i wolne miejsce na wolumenie MEDIA_ROOT.
+    """
+    usage = {}
+    for name, path in categories().items():
+        size, files, _ = tree_stats(path) if os.path.exists(path) else (0, 0, 0)
+        usage[name] = {"path": path, "bytes": size, "files": files}
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    usage["free_bytes"] = shutil.disk_usage(settings.MEDIA_ROOT).free
+    return usage
+
+
+def _entries(root):
+    if not os.path.isdir(root):
+        return []
+    with os.scandir(root) as it:
+        return [entry.path for entry in it]
+
+
+def _remove(path, category, reason, size, dry_run, removed):
+    if not dry_run:
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            print(f"⚠️ Nie udało się usunąć {path}: {e}")
+            return
+    removed.append({"category": category, "path": path, "bytes": size, "reason": reason})
+    print(f"🧹 {'[próba] ' if dry_run else ''}{category}: {path} ({size // 1024} KB) — {reason}")
+
+
+def _export_folders():
+    """
+    Foldery calendar_<id> z eksportow ze statusem ich produkcji (None - produkcja nie istnieje). Folder bez
+    numeru produkcji (calendar_None z druku CalendarPrint bez id_production) tez jest sierota.
+    """
+    folders = {}
+    orphans = []
+    for path in _entries(settings.CALENDAR_EXPORTS_ROOT):
+        name = os.path.basename(path)
+        if not os.path.isdir(path) or not name.startswith(EXPORT_PREFIX):
+            continue
+        if name[len(EXPORT_PREFIX):].isdigit():
+            folders[int(name[len(EXPORT_PREFIX):])] = path
+        else:
+            orphans.append((path, None))
+    statuses = dict(CalendarProduction.objects.filter(id__in=folders).values_list("id", "status"))
+    return [(path, statuses.get(production_id)) for production_id, path in folders.items()] + orphans
+
+
+def sweep(dry_run=False, now=None):
+    """
+    Egzekwuje STORAGE_JANITOR: usuwa eksporty starsze niz retencja dla statusu produkcji (aktywnych
+    to_produce/in_production nigdy), porzucone katalogi robocze renderu (przerwane zadania druku z punktami
+    kontrolnymi po `checkpoint_hours`) i stare pobrane upscale, a na koniec
+    - gdy eksporty przekraczaja limit - najstarsze nieaktywne eksporty. Zwraca {"removed", "freed_bytes", "usage"}.
+    """
+    config = _config()
+    now = now or time.time()
+    removed = []
+
+    kept_exports = []
+    active_bytes = 0
+    retention = config["retention_days"]
+    for path, status in _export_folders():
+        size, _, newest = tree_stats(path)
+        if status in ACTIVE_STATUSES:
+            active_bytes += size
+            continue
+        key = status or "orphan"
+        days = retention.get(key)
+        if days is not None and now - newest > days * 86400:
+            _remove(path, "exports", f"{key}, starsze niż {days} dni", size, dry_run, removed)
+        else:
+            kept_exports.append((newest, size, path, key))
+
+    for category, default_hours in (("temp", config["temp_hours"]), ("downloads", config["downloads_hours"])):
+        for path in _entries(categories()[category]):
+            hours = config["checkpoint_hours"] if os.path.basename(path).startswith(JOB_PREFIX) else default_hours
+            size, _, newest = tree_stats(path)
+            if now - newest > hours * 3600:
+                _remove(path, category, f"starsze niż {hours} h", size, dry_run, removed)
+
+    quota = config["exports_quota_mb"] * 1024 * 1024
+    if quota:
+        total = active_bytes + sum(size for _, size, _, _ in kept_exports)
+        for newest, size, path, key in sorted(kept_exports):
+            if total <= quota:
+                break
+            _remove(path, "exports", f"{key}, limit {config['exports_quota_mb']} MB", size, dry_run, removed)
+            total -= size
+
+    freed = sum(item["bytes"] for item in removed)
+    print(f"🧹 Sprzątanie: {len(removed)} pozycji, {freed / 1024 / 1024:.1f} MB{' (próba)' if dry_run else ''}")
+    return {"removed": removed, "freed_bytes": freed, "usage": disk_usage()}
+
+
+def schedule_sweep():
+    """
+    Wywolywane po renderze: zleca sweep() w tle najwyzej raz na `interval_hours` (znacznik we wspolnym cache,
+    wiec jeden proces na host), a od razu - gdy na wolumenie MEDIA_ROOT zostalo mniej niz `min_free_mb`.
+    Zwraca Future albo None, gdy sprzatanie nie jest potrzebne.
+    """
+    config = _config()
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    low_space = shutil.disk_usage(settings.MEDIA_ROOT).free < config["min_free_mb"] * 1024 * 1024
+    if not low_space:
+        interval = config["interval_hours"] * 3600
+        if not interval or not cache.add(SWEEP_CACHE_KEY, time.time(), timeout=interval):
+            return None
+    else:
+        print("⚠️ Mało miejsca na dysku — sprzątanie poza harmonogramem")
+    return background.submit("storage-janitor", sweep)
@@ -0,0 +1,193 @@
+import io
+import os
+import threading
+import uuid
+import requests
+import cloudinary
+import cloudinary.uploader
+from django.conf import settings
+from dotenv import load_dotenv
+load_dotenv()
+
+cloudinary.config(
+    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+    api_key=os.getenv("CLOUDINARY_API_KEY"),
+    api_secret=os.getenv("CLOUDINARY_API_SECRET")
+)
+
+_lock = threading.Lock()
+_storages = {}
+
+EXTENSIONS = {"jpeg": "jpg"}
+
+
+class CloudinaryStorage:
+    """
+    Magazyn w Cloudinary. Pliki trafiaja tam bez transformacji; duze pliki ida kawalkami (upload_large).
+    """
+    name = "cloudinary"
+
+    def save(self, data, folder_name=None, file_name=None, file_format=None):
+        options = {"resource_type": "image"}
+        if folder_name:
+            options["folder"] = folder_name
+        if file_name:
+            options["public_id"] = os.path.splitext(file_name)[0]
+
+        chunk_size = getattr(settings, "CLOUDINARY_CHUNK_SIZE", 20 * 1024 * 1024)
+        stream = io.BytesIO(data)
+        if len(data) > chunk_size:
+            result = cloudinary.uploader.upload_large(stream, chunk_size=chunk_size, **options)
+        else:
+            result = cloudinary.uploader.upload(stream, **options)
+
+        return {"url": result.get("secure_url"), "key": f"{self.name}:{result.get('public_id')}"}
+
+    def delete(self, path):
+        cloudinary.uploader.destroy(path)
+
+    def local_path(self, url):
+        return None
+
+
+class LocalStorage:
+    """
+    Magazyn na lokalnym dysku (LOCAL_STORAGE_ROOT), serwowany pod LOCAL_STORAGE_URL.
+    Uklad katalog/nazwa jak w object store - pliki mozna przeniesc do S3/MinIO bez zmiany kluczy.
+    """
+    name = "local"
+
+    def __init__(self):
+        self.root = settings.LOCAL_STORAGE_ROOT
+        self.base_url = settings.LOCAL_STORAGE_URL
+
+    def _path(self, relative):
+        path = os.path.normpath(os.path.join(self.root, relative))
+        if os.path.commonpath([path, os.path.normpath(self.root)]) != os.path.normpath(self.root):
+            raise ValueError(f"Ścieżka poza magazynem: {relative}")
+        return path
+
+    def save(self, data, folder_name=None, file_name=None, file_format=None):
+        name = os.path.splitext(file_name)[0] if file_name else uuid.uuid4().hex
+        if file_format:
+            name = f"{name}.{EXTENSIONS.get(file_format, file_format)}"
+        relative = f"{folder_name}/{name}" if folder_name else name
+
+        path = self._path(relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        return {"url": self.base_url + relative, "key": f"{self.name}:{relative}"}
+
+    def delete(self, path):
+        try:
+            os.remove(self._path(path))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, url):
+        if not url or not url.startswith(self.base_url):
+            return None
+        try:
+            path = self._path(url[len(self.base_url):].split("?")[0])
+        except ValueError:
+            return None
+        return path if os.path.isfile(path) else None
+
+
+STORAGES = {
+    "cloudinary": CloudinaryStorage,
+    "local": LocalStorage,
+}
+
+
+def get_storage(name=None):
+    """
+    Zwraca magazyn plikow wybrany w settings.IMAGE_STORAGE (domyslnie "cloudinary").
+    """
+    name = name or getattr(settings, "IMAGE_STORAGE", "cloudinary")
+    storage = _storages.get(name)
+    if storage is None:
+        if name not in STORAGES:
+            raise ValueError(f"Nieznany magazyn plików: {name}")
+        with _lock:
+            storage = _storages.setdefault(name, STORAGES[name]())
+    return storage
+
+
+def delete_file(key):
+    """
+    Usuwa plik po kluczu "<magazyn>:<sciezka>" zwroconym przez save() - niezaleznie od aktualnego IMAGE_STORAGE.
+    """
+    if not key or ":" not in key:
+        return
+    name, path = key.split(":", 1)
+    get_storage(name).delete(path)
+
+
+def local_path(source):
+    """
+    Sciezka na dysku dla zrodla obrazu: plik lokalny albo URL magazynu lokalnego. None, gdy plik trzeba pobrac.
+    """
+    if not source:
+        return None
+    path = get_storage("local").local_path(source)
+    if path:
+        return path
+    if source.startswith(("http://", "https://")):
+        return None
+    return source if os.path.isfile(source) else None
+
+
+def resized_url(url, width):
+    """
+    URL pomniejszonej wersji obrazu liczony bez zapisu pliku: dla Cloudinary transformacja w URL-u
+    (c_limit, f_auto, q_auto), dla pozostalych magazynow oryginalny URL.
+    """
+    marker = "/image/upload/"
+    if not url or "res.cloudinary.com" not in url or marker not in url:
+        return url
+    head, tail = url.split(marker, 1)
+    return f"{head}{marker}c_limit,w_{width},f_auto,q_auto/{tail}"
+
+
+def fetch_to_local(source, dest_dir, file_name, timeout=30):
+    """
+    Zwraca lokalna sciezke zrodla obrazu. Pliki z magazynu lokalnego sa uzywane wprost (bez kopiowania
+    i bez sieci), pozostale URL-e pobierane strumieniowo do `dest_dir`. None przy bledzie.
+    """
+    path = local_path(source)
+    if path:
+        return path
+    if not source or not source.startswith(("http://", "https://")):
+        return None
+
+    dest_path = os.path.join(dest_dir, file_name)
+    try:
+        with requests.get(source, stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                print(f"Blad pobierania {source}: HTTP {response.status_code}")
+                return None
+            with open(dest_path, "wb") as f:
+                for chunk in response.iter_content(64 * 1024):
+                    f.write(chunk)
+    except requests.RequestException as e:
+        print(f"Wyjatek przy pobieraniu {source}: {e}")
+        return None
+    return dest_path
+
+
+def read_source(source, timeout=30):
+    """
+    Czyta bajty obrazu z dysku (plik lub magazyn lokalny) albo z sieci.
+    """
+    path = local_path(source)
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    response = requests.get(source, timeout=timeout)
+    response.raise_for_status()
+    return response.content
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from ..models import (
+    StylArtystyczny,
+    Kompozycja,
+    Kolorystyka,
+    Atmosfera,
+    Inspiracja,
+    Tlo,
+    Perspektywa,
+    Detale,
+    Realizm,
+    StylNarracyjny,
+)
+
+TAXONOMY_MODELS = {
+    "styl_artystyczny": StylArtystyczny,
+    "kompozycja": Kompozycja,
+    "kolorystyka": Kolorystyka,
+    "atmosfera": Atmosfera,
+    "inspiracja": Inspiracja,
+    "tlo": Tlo,
+    "perspektywa": Perspektywa,
+    "detale": Detale,
+    "realizm": Realizm,
+    "styl_narracyjny": StylNarracyjny,
+}
+
+VERSION_CACHE_KEY = "taxonomy_cache_version"
+
+_lock = threading.Lock()
+# niezmienny snapshot podmieniany jednym przypisaniem - czytelnik bez blokady widzi albo stary, albo nowy komplet
+_state = None
+# kiedy (time.monotonic) ostatnio sprawdzono wersje we wspoldzielonym cache
+_checked_at = 0.0
+
+
+def _shared_version():
+    """
+    Zwraca znacznik wersji slownikow zapisany we wspoldzielonym cache Django.
+    Gdy klucza brakuje (pierwsze uruchomienie, wygasniecie) ustawia nowy znacznik.
+    """
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def _load(version):
+    """
+    Laduje wszystkie dziesiec slownikow z bazy i buduje nowy lokalny (per-proces) snapshot:
+    instancje modeli po id, gotowy payload endpointu zbiorczego oraz jego ETag.
+    """
+    items = {}
+    payload = {}
+    for key, model in TAXONOMY_MODELS.items():
+        rows = list(model.objects.all())
+        items[key] = {row.id: row for row in rows}
+        payload[key] = [{"id": row.id, "nazwa": row.nazwa} for row in rows]
+
+    digest = hashlib.sha1(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+    return {"version": version, "items": items, "payload": payload, "etag": f'"{digest}"'}
+
+
+def _ensure_loaded():
+    """
+    Zwraca aktualny snapshot. Wersje we wspoldzielonym cache (odczyt pliku przy FileBasedCache) sprawdza
+    najwyzej raz na TAXONOMY_VERSION_CHECK_SECONDS - zmiana w innym procesie dociera z takim opoznieniem.
+    """
+    global _state, _checked_at
+    state = _state
+    now = time.monotonic()
+    if state is not None and now - _checked_at < getattr(settings, "TAXONOMY_VERSION_CHECK_SECONDS", 5):
+        return state
+
+    version = _shared_version()
+    _checked_at = now
+    if state is not None and state["version"] == version:
+        return state
+    with _lock:
+        if _state is None or _state["version"] != version:
+            _state = _load(version)
+        return _state
+
+
+def get_all_taxonomies():
+    """
+    Zwraca krotke (payload, etag) ze wszystkimi slownikami promptu.
+    """
+    state = _ensure_loaded()
+    return state["payload"], state["etag"]
+
+
+def get_taxonomy_item(key, pk):
+    """
+    Zwraca instancje slownika `key` o podanym id z cache lub None, bez zapytania do bazy.
+    """
+    if pk in (None, ""):
+        return None
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    return _ensure_loaded()["items"].get(key, {}).get(pk)
+
+
+def resolve_taxonomies(data):
+    """
+    Mapuje id slownikow z danych requestu na instancje modeli (lub None) dla wszystkich dziesieciu kluczy.
+    """
+    return {key: get_taxonomy_item(key, data.get(key)) for key in TAXONOMY_MODELS}
+
+
+def invalidate_taxonomies():
+    """
+    Uniewaznia cache slownikow we wszystkich procesach - nowy znacznik wersji
+    we wspoldzielonym cache wymusza przeladowanie (w tym procesie od razu, w pozostalych
+    po najwyzej TAXONOMY_VERSION_CHECK_SECONDS).
+    """
+    global _state
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+    with _lock:
+        _state = None
@@ -1,12 +1,17 @@
 import os
+import uuid
 import requests  
 from django.conf import settings 
 from bigjpg import Bigjpg, Styles, Noises, EnlargeValues
 
 def upscale_image_with_bigjpg(image_url, export_dir, enlarge):
+    """
+    Powieksza obraz w Bigjpg (4x/8x) i zapisuje wynik pod unikalna nazwa w `export_dir` (katalog zadania
+    wywolujacego; bez niego - UPSCALE_DOWNLOADS_ROOT), wiec rownolegle procesy produkcji nie dziela plikow.
+    """
     current_stage = "Inicjalizacja funkcji"
     
-    pobrane_dir = os.path.join(settings.MEDIA_ROOT, "pobrane")
+    pobrane_dir = export_dir or settings.UPSCALE_DOWNLOADS_ROOT
     
     enlarge_value = EnlargeValues._4x  
     if enlarge == 4:
@@ -33,20 +38,10 @@ def upscale_image_with_bigjpg(image_url, export_dir, enlarge):
 
         current_stage = "Weryfikacja katalogu eksportu"
        
-        if not os.path.exists(pobrane_dir):
-            os.makedirs(pobrane_dir)
+        os.makedirs(pobrane_dir, exist_ok=True)
 
         current_stage = "Ustalanie nazwy pliku"
-        existing_files = os.listdir(pobrane_dir)
-        existing_numbers = []
-        for filename in existing_files:
-            if filename.startswith("enlarged_image_") and filename.endswith(".png"):
-                num_part = filename[len("enlarged_image_"):-4]
-                if num_part.isdigit():
-                    existing_numbers.append(int(num_part))
-        next_number = max(existing_numbers, default=0) + 1
-
-        local_filename = f"enlarged_image_{next_number}.png"
+        local_filename = f"enlarged_image_{uuid.uuid4().hex}.png"
   
         upscaled_path = os.path.join(pobrane_dir, local_filename)
 
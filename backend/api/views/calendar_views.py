@@ -1,28 +1,44 @@
-import io
-import shutil
-import uuid
 from django.contrib.contenttypes.models import ContentType
-from django.http import FileResponse, Http404
+from django.http import Http404, StreamingHttpResponse
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from ..models import *
 from ..serializers import *
 from ..pagination import *
-from ..utils.cloudinary_upload import upload_image
+from ..utils.cloudinary_upload import (
+    read_image_size,
+    start_uploads,
+    upload_metadata,
+    fill_pending_uploads,
+    PENDING_UPLOAD_URL,
+    UPLOAD_PENDING,
+)
+from ..utils.background import submit
+from ..utils.autosave import submit_autosave, AutosaveConflict
+from rest_framework.parsers import JSONParser
+from django.db.models import F
 from rest_framework.exceptions import ValidationError
 import json
 from rest_framework import generics, status, response, permissions
 from django.conf import settings
-import os
+from django.utils import timezone
 from ..utils.calendar_generation import (
-    fetch_calendar_data,
-    generate_calendar, 
-    get_year_data, 
-    handle_field_data, 
-    handle_bottom_data,
-    handle_top_image)
-from ..utils.upscaling import upscale_image_with_bigjpg
-import zipfile
-from django.db import close_old_connections 
+    ProductionError,
+    CalendarNotFound,
+    render_production,
+    mark_production_done,
+    production_quantities,
+    impose_sheets,
+    claim_productions,
+    run_production_batch,
+    ensure_package,
+    bulk_package_files,
+    run_once,
+    PrintInProgress,
+    print_result,
+)
+from ..utils.janitor import schedule_sweep
+from ..utils.downloads import file_download_response, stream_zip
+from django.db import close_old_connections, transaction
 
 class CalendarDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Calendar.objects.all()
@@ -36,64 +52,119 @@ class CalendarUpdateView(generics.RetrieveUpdateAPIView):
     serializer_class = CalendarSerializer
     permission_classes = [IsAuthenticated]
 
+    YEAR_DATA_FIELDS = ["text", "font", "weight", "size", "color", "positionX", "positionY"]
+
     def get_queryset(self):
-        return Calendar.objects.filter(author=self.request.user)
+        qs = Calendar.objects.filter(author=self.request.user)
+        qs = qs.select_related(
+            "top_image",
+            "year_data",
+            "field1_content_type",
+            "field2_content_type",
+            "field3_content_type",
+            "bottom_content_type",
+        )
 
-    def update(self, request, *args, **kwargs):
-    
+        qs = qs.prefetch_related(
+            "field1",
+            "field2",
+            "field3",
+            "bottom"
+        )
+
+        return qs
 
+    def update(self, request, *args, **kwargs):
+        # Kalendarz z relacjami ładowany jest raz - odpowiedź budujemy z tych samych obiektów
         calendar = self.get_object()
-        old_calendar = Calendar.objects.get(author=self.request.user, id=kwargs["pk"])
 
-        data = request.data.copy()
+        data = request.data
         serializer = self.get_serializer(calendar, data=data, partial=True)
         serializer.is_valid(raise_exception=True)
 
-        top_image_id = serializer.validated_data.get("top_image")
+        validated = dict(serializer.validated_data)
+        top_image_id = validated.get("top_image")
         if isinstance(top_image_id, (int, str)):
-            try:
-                serializer.validated_data["top_image"] = GeneratedImage.objects.get(id=top_image_id)
-            except GeneratedImage.DoesNotExist:
-                return response.Response(
-                    {"error": "Nie znaleziono obrazu o podanym ID"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        
-        serializer.save()
-        year_data = old_calendar.year_data_id
-        if year_data:
-            try:
-                year_data = CalendarYearData.objects.get(id=year_data)
-            except CalendarYearData.DoesNotExist:
-                return response.Response(
-                    {"error": f"Nie znaleziono YearData o ID {year_data}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+            if str(top_image_id) == str(calendar.top_image_id):
+                validated.pop("top_image")
+            else:
+                try:
+                    validated["top_image"] = GeneratedImage.objects.get(id=top_image_id)
+                except (GeneratedImage.DoesNotExist, ValueError):
+                    return response.Response(
+                        {"error": "Nie znaleziono obrazu o podanym ID"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
 
-            year_data_raw = data.get("year_data")
+        year_data_obj = None
+        year_data_raw = data.get("year_data")
+        if year_data_raw and calendar.year_data:
+            if isinstance(year_data_raw, str):
+                try:
+                    year_data_obj = json.loads(year_data_raw)
+                except json.JSONDecodeError:
+                    return response.Response(
+                        {"error": "Niepoprawny format JSON w year_data"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+            else:
+                year_data_obj = year_data_raw
+
+        with transaction.atomic():
+            changed = []
+            for attr, value in validated.items():
+                setattr(calendar, attr, value)
+                changed.append(attr)
+
+            year_changed = []
+            if year_data_obj:
+                year_data = calendar.year_data
+                year_changed = [
+                    field for field in self.YEAR_DATA_FIELDS
+                    if field in year_data_obj and getattr(year_data, field) != year_data_obj[field]
+                ]
+                for field in year_changed:
+                    setattr(year_data, field, year_data_obj[field])
+                if year_changed:
+                    year_data.save(update_fields=year_changed)
+
+            if changed or year_changed:
+                # Każdy zapis podbija wersję używaną przez autosave (optimistic concurrency)
+                calendar.version = F("version") + 1
+                calendar.save(update_fields=changed + ["version"])
+                calendar.refresh_from_db(fields=["version"])
 
-            if year_data_raw:
-                if isinstance(year_data_raw, str):
-                    try:
-                        year_data_obj = json.loads(year_data_raw)
-                    except json.JSONDecodeError:
-                        return response.Response(
-                            {"error": "Niepoprawny format JSON w year_data"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                else:
-                    year_data_obj = year_data_raw
-                    
-                for field in ["text", "font", "weight", "size", "color", "positionX", "positionY"]:
-                    if field in year_data_obj:
-                        setattr(year_data, field, year_data_obj[field])
-
-                year_data.save()
-        
-    
         return response.Response(serializer.data, status=status.HTTP_200_OK)
     
 
+class CalendarAutosaveView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser]
+
+    def get_queryset(self):
+        return Calendar.objects.filter(author=self.request.user).only("id")
+
+    def patch(self, request, *args, **kwargs):
+        calendar = self.get_object()
+
+        version = request.data.get("version")
+        patches = request.data.get("patches")
+        if isinstance(version, bool) or not isinstance(version, int):
+            return response.Response({"error": "Brak lub niepoprawna wersja"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(patches, dict) or not patches:
+            return response.Response({"error": "Brak patchy do zapisania"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            new_version = submit_autosave(calendar.id, version, patches)
+        except AutosaveConflict as e:
+            return response.Response(
+                {"error": "Kalendarz został zmieniony w międzyczasie", "version": e.current_version},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return response.Response({"version": new_version}, status=status.HTTP_200_OK)
+
+
 class CalendarByProjectView(generics.ListAPIView):
     serializer_class = CalendarSerializer
     permission_classes = [IsAuthenticated]
@@ -179,96 +250,144 @@ class CalendarCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         data = self.request.data
         user = self.request.user
-        name = data.get("name", "new calendar")
         image_from_disk = data.get("imageFromDisk", "false").lower() == "true"
+        defer_uploads = data.get("deferUploads", "false").lower() == "true"
 
         top_image_value = serializer.validated_data.get("top_image")
 
+        # --- 0. Upload plików (poza transakcją, równolegle w puli wątków) ---
+        uploads = {}
+        top_image_upload = None
         if image_from_disk:
-            if image_from_disk:
-                if hasattr(top_image_value, "read"):  
-                    
-                    file_bytes = top_image_value.read()
-                    filename = f"generated_{uuid.uuid4().hex}.png"
-                    
-                    from PIL import Image
-                    import io
-
-                    with Image.open(io.BytesIO(file_bytes)) as img:
-                        width, height = img.size
-
-                    generated_url = upload_image(
-                        file_bytes,                    
-                        "generated_images",
-                        filename
-                    )
-                    
-                    image_instance = GeneratedImage.objects.create(
-                        author=user,
-                        width=width,
-                        height=height,
-                        url=generated_url
-                    )
-                    top_image_value = image_instance
-                else:
-                    raise ValidationError({"top_image": "Niepoprawny plik"})
+            if not hasattr(top_image_value, "read"):
+                raise ValidationError({"top_image": "Niepoprawny plik"})
+
+            width, height = read_image_size(top_image_value)
+            uploads["top_image"] = top_image_value.read()
+            top_image_upload = {"width": width, "height": height}
         else:
             try:
-                image_instance = GeneratedImage.objects.get(id=top_image_value)
-                top_image_value = image_instance
+                top_image_value = GeneratedImage.objects.get(id=top_image_value)
             except GeneratedImage.DoesNotExist:
                 raise ValidationError({"top_image": "Nie znaleziono obrazu o podanym ID"})
 
-        # --- 1. Tworzymy CalendarYearData ---
-        year_data = None
-        if data.get("yearText"):
-            year_data = CalendarYearData.objects.create(
-                author=user,
-                text=data.get("yearText"),
-                font=data.get("yearFontFamily"),
-                weight=data.get("yearFontWeight"),
-                size=str(data.get("yearFontSize")) if data.get("yearFontSize") else None,
-                color=data.get("yearColor"),
-                positionX=data.get("yearPositionX"),
-                positionY=data.get("yearPositionY"),
-            )
+        field_specs = self.collect_field_specs(data, user, uploads)
+        # bajty plikow zostaja do ewentualnego ponowienia odroczonego uploadu
+        sources = dict(uploads)
+        top_upload = {"top_image": uploads.pop("top_image")} if "top_image" in uploads else {}
+        futures = start_uploads(uploads, "generated_images")
+        futures.update(start_uploads(top_upload, "generated_images", with_variants=True))
 
-        # --- 2. Obsługa dolnej sekcji ---
-        bottom_instance = None
-        bottom_ct = None
-        bottom_type = data.get("bottom_type")
-        if bottom_type == "image":
-            bottom_instance = BottomImage.objects.create(
-                author=user,
-                image_id=data.get("bottom_image")
-            )
-            bottom_ct = ContentType.objects.get_for_model(BottomImage)
-        elif bottom_type == "color":
-            bottom_instance = BottomColor.objects.create(
-                author=user,
-                color=data.get("bottom_color")
-            )
-            bottom_ct = ContentType.objects.get_for_model(BottomColor)
+        if defer_uploads:
+            urls = {key: PENDING_UPLOAD_URL for key in futures}
         else:
-            bottom_instance = BottomGradient.objects.create(
+            results = {key: future.result() for key, future in futures.items()}
+            failed = [key for key, info in results.items() if not info]
+            if failed:
+                raise ValidationError({key: "Nie udało się przesłać pliku" for key in failed})
+            urls = {key: info["url"] for key, info in results.items()}
+            if top_image_upload:
+                top_image_upload.update(upload_metadata(results["top_image"]))
+
+        if top_image_upload:
+            top_image_upload["url"] = urls["top_image"]
+            if defer_uploads:
+                top_image_upload["upload_status"] = UPLOAD_PENDING
+        for field_key, field_obj in field_specs:
+            if field_key in urls:
+                field_obj.path = urls[field_key]
+                if defer_uploads:
+                    field_obj.upload_status = UPLOAD_PENDING
+
+        with transaction.atomic():
+            if top_image_upload:
+                top_image_value = GeneratedImage.objects.create(author=user, **top_image_upload)
+
+            # --- 1. Tworzymy CalendarYearData ---
+            year_data = None
+            if data.get("yearText"):
+                year_data = CalendarYearData.objects.create(
+                    author=user,
+                    text=data.get("yearText"),
+                    font=data.get("yearFontFamily"),
+                    weight=data.get("yearFontWeight"),
+                    size=str(data.get("yearFontSize")) if data.get("yearFontSize") else None,
+                    color=data.get("yearColor"),
+                    positionX=data.get("yearPositionX"),
+                    positionY=data.get("yearPositionY"),
+                )
+
+            # --- 2. Obsługa dolnej sekcji ---
+            bottom_type = data.get("bottom_type")
+            if bottom_type == "image":
+                bottom_instance = BottomImage(
+                    author=user,
+                    image_id=data.get("bottom_image")
+                )
+            elif bottom_type == "color":
+                bottom_instance = BottomColor(
+                    author=user,
+                    color=data.get("bottom_color")
+                )
+            else:
+                bottom_instance = BottomGradient(
+                    author=user,
+                    start_color=data.get("gradient_start_color"),
+                    end_color=data.get("gradient_end_color"),
+                    direction=data.get("gradient_direction"),
+                    theme=data.get("gradient_theme")
+                )
+            bottom_instance.save()
+
+            # --- 3. Pola field1/2/3 - jeden bulk_create na typ ---
+            columns = {}
+            for model in (CalendarMonthFieldText, CalendarMonthFieldImage):
+                specs = [(field_key, obj) for field_key, obj in field_specs if isinstance(obj, model)]
+                if not specs:
+                    continue
+                model.objects.bulk_create([obj for _, obj in specs])
+                for field_key, obj in specs:
+                    columns[field_key] = obj
+
+            content_types = ContentType.objects.get_for_models(
+                type(bottom_instance), *(type(obj) for obj in columns.values())
+            )
+
+            generic_columns = {
+                "bottom_content_type": content_types[type(bottom_instance)],
+                "bottom_object_id": bottom_instance.id,
+            }
+            for field_key, obj in columns.items():
+                generic_columns[f"{field_key}_content_type"] = content_types[type(obj)]
+                generic_columns[f"{field_key}_object_id"] = obj.id
+
+            # --- 4. Tworzymy Calendar - jeden zapis ze wszystkimi kolumnami GFK ---
+            serializer.save(
                 author=user,
-                start_color=data.get("gradient_start_color"),
-                end_color=data.get("gradient_end_color"),
-                direction=data.get("gradient_direction"),
-                theme=data.get("gradient_theme")
+                year_data=year_data,
+                top_image=top_image_value,
+                **generic_columns,
             )
-            bottom_ct = ContentType.objects.get_for_model(BottomGradient)
-
-        # --- 3. Tworzymy Calendar ---
-        calendar = serializer.save(
-            author=user,
-            year_data=year_data,
-            top_image=top_image_value,
-            bottom_content_type=bottom_ct,
-            bottom_object_id=bottom_instance.id if bottom_instance else None,
-        )
-            
-        # --- 4. Obsługa field1/2/3 ---
+
+            # --- 5. Tryb odroczony - placeholdery uzupełniane po zakończeniu uploadów ---
+            if defer_uploads and futures:
+                targets = {
+                    field_key: (CalendarMonthFieldImage, field_obj.id, "path")
+                    for field_key, field_obj in field_specs
+                    if field_key in futures
+                }
+                if "top_image" in futures:
+                    targets["top_image"] = (GeneratedImage, top_image_value.id, "url")
+                transaction.on_commit(
+                    lambda: submit("uploads-finalize", fill_pending_uploads, futures, targets, sources)
+                )
+
+    def collect_field_specs(self, data, user, uploads):
+        """
+        Parsuje field1/2/3 z requestu i zwraca niezapisane obiekty pól jako listę
+        (klucz pola, obiekt) gotową do bulk_create. Treść przesłanych plików trafia do `uploads`.
+        """
+        field_specs = []
         for i in range(1, 4):
             field_key = f"field{i}"
             file_key = f"field{i}_image"
@@ -288,18 +407,12 @@ class CalendarCreateView(generics.ListCreateAPIView):
             final_image_path = item_data.get("image")  
 
             if uploaded_file:
-                file_bytes = uploaded_file.read()
-                filename = f"generated_{uuid.uuid4().hex}.png"
-                generated_url = upload_image(
-                    file_bytes,
-                    "generated_images",
-                    filename
-                )
-                final_image_path = generated_url
+                uploads[field_key] = uploaded_file.read()
+                final_image_path = PENDING_UPLOAD_URL
 
             field_obj = None
             if "text" in item_data and not uploaded_file:
-                field_obj = CalendarMonthFieldText.objects.create(
+                field_obj = CalendarMonthFieldText(
                     author=user,
                     text=item_data["text"],
                     font=item_data.get("font", {}).get("fontFamily"),
@@ -308,9 +421,8 @@ class CalendarCreateView(generics.ListCreateAPIView):
                     size=item_data.get("font", {}).get("fontSize"),
                 )
 
-         
             elif final_image_path:
-                field_obj = CalendarMonthFieldImage.objects.create(
+                field_obj = CalendarMonthFieldImage(
                     author=user,
                     path=final_image_path,  
                     size=item_data.get("scale"),
@@ -318,12 +430,10 @@ class CalendarCreateView(generics.ListCreateAPIView):
                     positionY=item_data.get("positionY"),
                 )
 
-      
             if field_obj:
-                ct = ContentType.objects.get_for_model(field_obj)
-                setattr(calendar, f"{field_key}_content_type", ct)
-                setattr(calendar, f"{field_key}_object_id", field_obj.id)
-                calendar.save()
+                field_specs.append((field_key, field_obj))
+
+        return field_specs
 
 class CalendarSearchBarView(generics.ListAPIView):
     serializer_class = CalendarSearchSerializer
@@ -338,6 +448,11 @@ class CalendarSearchBarView(generics.ListAPIView):
 
 
 class CalendarPrint(generics.CreateAPIView): 
+    """
+    Render plikow druku produkcji. Naglowek `Idempotency-Key` (albo pole idempotency_key) czyni zadanie
+    powtarzalnym: ponowienie po timeoucie bramy dostaje gotowy wynik. Drugie zadanie dla produkcji, ktora
+    wlasnie sie renderuje, czeka na ten render i zwraca jego wynik (naglowek Idempotent-Replayed).
+    """
 
     def create(self, request, *args, **kwargs):
         try:
@@ -345,76 +460,42 @@ class CalendarPrint(generics.CreateAPIView):
             production_id = request.data.get("id_production")
             if not calendar_id:
                 return Response({"error": "Brak id_kalendarz"}, status=400)
+            if production_id not in (None, ""):
+                # multipart / formularz przysyla id jako tekst - klucze production_quantities sa liczbami
+                try:
+                    production_id = int(production_id)
+                except (TypeError, ValueError):
+                    return Response({"error": "Niepoprawne id_production"}, status=400)
+            else:
+                production_id = None
+            idempotency_key = request.headers.get("Idempotency-Key") or request.data.get("idempotency_key")
+
+            def render():
+                quantity = production_quantities([production_id]).get(production_id) if production_id else None
+                pages = {} if quantity and quantity > 1 else None
+                timings = {}
+                calendar_files = render_production(calendar_id, production_id, timings, pages)
+                sheets = impose_sheets(production_id, calendar_files["export_dir"], pages, quantity)
+
+                close_old_connections()
+                mark_production_done(production_id, timings)
+                schedule_sweep()
+
+                return print_result(calendar_files, sheets)
 
-            calendar = fetch_calendar_data(calendar_id)
-            if not calendar:
-                return Response({"error": f"Nie znaleziono kalendarza {calendar_id}"}, status=404)
-
-            temp_dir = os.path.join(settings.MEDIA_ROOT, "calendar_temp", str(uuid.uuid4()))
-            os.makedirs(temp_dir, exist_ok=True)
-
-            data = {
-                "calendar_id": calendar.id,
-                "author": str(calendar.author),
-                "created_at": str(calendar.created_at),
-                "fields": {},
-                "bottom": None,
-                "top_image": None,
-                "year": get_year_data(calendar),
-            }
-
-            data["top_image"] = handle_top_image(calendar, temp_dir)
-            data["bottom"] = handle_bottom_data(calendar.bottom, temp_dir)
-
-            all_fields = []
-            for i in range(1, 4):
-                all_fields.append((getattr(calendar, f"field{i}", None), i))
-            for img in getattr(calendar, "prefetched_images_for_fields", []):
-                all_fields.append((img, f"prefetched_image_{img.id}"))
-            for field_obj, field_name in all_fields:
-                data["fields"][field_name] = handle_field_data(field_obj, field_name, temp_dir)
-
-            upscaled_header_path = None
-            if data["top_image"]:
-                result = upscale_image_with_bigjpg(data["top_image"], temp_dir, 4)
-                upscaled_header_path = result["local_upscaled"]
-
-            if data["bottom"] and data["bottom"].get("type") == "image":
-                result = upscale_image_with_bigjpg(data["bottom"]["url"], temp_dir, 8)
-                data["bottom"]["image_path"] = result["local_upscaled"]
-
-
-            calendar_files = generate_calendar(
-                data=data,
-                top_image_path=data["top_image"],
-                upscaled_top_path=upscaled_header_path,
-                production_id=production_id,
-            )
-
-
-            close_old_connections()
-            
             try:
-                production = CalendarProduction.objects.get(id=production_id)
-                production.status = "done"
-                production.finished_at = timezone.now()
-                production.save()
-                print(f"✅ Produkcja {production_id} → done")
-            except CalendarProduction.DoesNotExist:
-                print(f"⚠️ Nie znaleziono produkcji {production_id}")
-
-
-            try:
-                shutil.rmtree(temp_dir)
-            except OSError:
-                pass
-
-            return Response({
-                "message": "Kalendarz wygenerowany — dwa pliki PSD.",
-                "export_dir": calendar_files["export_dir"],
-                "header_path": calendar_files["header"],
-                "backing_path": calendar_files["backing"],
-            })
+                payload, replayed = run_once(production_id, calendar_id, idempotency_key, render)
+            except CalendarNotFound as e:
+                return Response({"error": str(e)}, status=404)
+            except ProductionError as e:
+                return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+            except PrintInProgress as e:
+                return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+            result = Response(payload)
+            if replayed:
+                result["Idempotent-Replayed"] = "true"
+            return result
 
         except Exception as e:
             close_old_connections()
@@ -471,6 +552,33 @@ class CalendarProductionStaffList(generics.ListAPIView):
             .order_by("-created_at")
         )
 
+
+class ProductionBatchRunView(generics.CreateAPIView):
+    """
+    Produkcja seryjna: zajmuje wszystkie produkcje `to_produce` (opcjonalnie z terminem do `deadline`)
+    i renderuje je w tle w puli procesow. Status kazdej pozycji widac na liscie produkcji
+    (`done`, a po bledzie powrot do `to_produce`).
+    """
+    serializer_class = ProductionBatchSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        productions = claim_productions(
+            deadline=serializer.validated_data.get("deadline"),
+            limit=serializer.validated_data.get("limit"),
+        )
+        if productions:
+            submit("production-batch", run_production_batch, productions)
+        print(f"📨 Produkcja seryjna w kolejce ({len(productions)} zleceń)")
+
+        return response.Response(
+            {"productions": [{"id": row["id"], "calendar_id": row["calendar_id"]} for row in productions]},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
     
 class StaffCalendarProductionRetrieveUpdate(generics.RetrieveUpdateAPIView):
     serializer_class = CalendarProductionSerializer
@@ -510,33 +618,70 @@ class CalendarByIdStaffView(generics.RetrieveAPIView):
     
 
 class DownloadCalendarStaffView(generics.ListAPIView):
+    """
+    Paczka ZIP plikow druku produkcji `pk` - zbudowana przy zakonczeniu produkcji (mark_production_done)
+    i odbudowywana tylko, gdy folder eksportu sie zmienil. ETag = sha256 paczki, wznawianie przez Range.
+    """
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def get(self, request, pk, format=None):
-        calendar_dir = os.path.join(settings.MEDIA_ROOT, 'calendar_exports', f"calendar_{pk}")
-
-        if not os.path.exists(calendar_dir) or not os.path.isdir(calendar_dir):
-            print(f"BŁĄD: Nie znaleziono folderu: {calendar_dir}")
-            raise Http404(f"Nie znaleziono folderu dla kalendarza: calendar_{pk}")
-
-        zip_buffer = io.BytesIO()
-        files_found = False
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for filename in os.listdir(calendar_dir):
-                file_path = os.path.join(calendar_dir, filename)
-                if os.path.isfile(file_path):
-                    zip_file.write(file_path, arcname=filename)
-                    files_found = True
+        manifest = ensure_package(pk)
+        if manifest is None:
+            print(f"BŁĄD: Brak plików kalendarza: calendar_{pk}")
+            raise Http404(f"Nie znaleziono plików dla kalendarza: calendar_{pk}")
+
+        return file_download_response(
+            request,
+            manifest["path"],
+            manifest["file_name"],
+            content_type="application/zip",
+            etag=manifest["sha256"],
+        )
 
-        if not files_found:
-             raise Http404("Folder kalendarza jest pusty.")
 
-        zip_buffer.seek(0)
-        final_zip_filename = f"calendar_{pk}_package.zip"
+class BulkDownloadCalendarStaffView(generics.GenericAPIView):
+    """
+    Jedno archiwum ZIP z folderami calendar_<id> wielu produkcji - wg `production_ids`, `calendar_ids`
+    i/lub filtra (status, deadline_from, deadline_to). Archiwum jest strumieniowane w trakcie czytania plikow
+    (stala pamiec, PDF-y bez ponownej kompresji); produkcje bez plikow sa w naglowku X-Missing-Productions.
+    """
+    serializer_class = BulkDownloadSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
 
-        response = FileResponse(zip_buffer, content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="{final_zip_filename}"'
-        response['Access-Control-Expose-Headers'] = 'Content-Disposition'
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        queryset = CalendarProduction.objects.all()
+        if data.get("production_ids"):
+            queryset = queryset.filter(id__in=data["production_ids"])
+        if data.get("calendar_ids"):
+            queryset = queryset.filter(calendar_id__in=data["calendar_ids"])
+        if data.get("status"):
+            queryset = queryset.filter(status=data["status"])
+        if data.get("deadline_from"):
+            queryset = queryset.filter(deadline__gte=data["deadline_from"])
+        if data.get("deadline_to"):
+            queryset = queryset.filter(deadline__lte=data["deadline_to"])
+        production_ids = list(queryset.order_by("deadline", "id").values_list("id", flat=True))
+
+        if len(production_ids) > settings.BULK_DOWNLOAD_MAX_PRODUCTIONS:
+            return response.Response(
+                {"error": f"Za dużo produkcji ({len(production_ids)}), limit: {settings.BULK_DOWNLOAD_MAX_PRODUCTIONS}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        return response
\ No newline at end of file
+        files, missing = bulk_package_files(production_ids)
+        if not files:
+            raise Http404("Brak plików dla wybranych produkcji.")
+
+        print(f"📦 Archiwum zbiorcze: {len(production_ids) - len(missing)} produkcji, {len(files)} plików")
+        file_name = f"calendars_{timezone.now():%Y%m%d_%H%M}.zip"
+        result = StreamingHttpResponse(stream_zip(files), content_type="application/zip")
+        result["Content-Disposition"] = f'attachment; filename="{file_name}"'
+        result["Access-Control-Expose-Headers"] = "Content-Disposition, X-Missing-Productions"
+        result["X-Missing-Productions"] = ",".join(str(pk) for pk in missing)
+        # nginx nie buforuje calej odpowiedzi - klient dostaje dane od razu
+        result["X-Accel-Buffering"] = "no"
+        return result
@@ -1,15 +1,30 @@
 
-import uuid
+import json
+import time
+from django.http import StreamingHttpResponse
 from rest_framework.permissions import IsAuthenticated,  AllowAny
 from ..models import *
 from ..serializers import *
 from ..pagination import *
-from ..utils.image_generation.generation import generate_image_from_prompt
+from ..utils.image_generation.jobs import (
+    render_images,
+    store_generated_images,
+    enqueue_generation,
+    enqueue_generation_batch,
+    stream_generation,
+    wait_for_job,
+    expire_stale_job,
+    DEFAULT_WIDTH,
+    DEFAULT_HEIGHT,
+    DEFAULT_VARIANTS,
+)
+from ..utils.image_generation.clients import ProviderBusy
 from ..utils.upscaling import upscale_image_with_bigjpg
-from ..utils.cloudinary_upload import upload_image
+from ..utils.taxonomy_cache import TAXONOMY_MODELS
 import os
 from dotenv import load_dotenv
 from rest_framework import generics, status, response
+from rest_framework.exceptions import Throttled
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv()
 
@@ -24,112 +39,41 @@ class GenerateImage(generics.ListCreateAPIView):
         print("📥 Odebrane dane z requestu:", data)
 
         prompt = data.get('prompt', None)
-        width = 1792
-        height = 1200
+        width = DEFAULT_WIDTH
+        height = DEFAULT_HEIGHT
         user = self.request.user 
         print(f"👤 Użytkownik: {user}")
         print(f"🧠 Prompt: {prompt}")
 
-        inspiration_id = data.get('inspiracja')
-        composition_id = data.get('kompozycja')
-        color_id = data.get('kolorystyka')
-        style_id = data.get('styl_artystyczny')
-        atmosfera_id = data.get('atmosfera')
-        tlo_id = data.get('tlo')
-        perspektywa_id = data.get('perspektywa')
-        detale_id = data.get('detale')
-        realizm_id = data.get('realizm')
-        styl_narracyjny_id = data.get('styl_narracyjny')
-
-        print("🧩 Odebrane ID:")
-        print({
-            "inspiracja": inspiration_id,
-            "kompozycja": composition_id,
-            "kolorystyka": color_id,
-            "styl_artystyczny": style_id,
-            "atmosfera": atmosfera_id,
-            "tlo": tlo_id,
-            "perspektywa": perspektywa_id,
-            "detale": detale_id,
-            "realizm": realizm_id,
-            "styl_narracyjny": styl_narracyjny_id,
-        })
-
-        inspiration = Inspiracja.objects.filter(id=inspiration_id).first() if inspiration_id else None
-        composition = Kompozycja.objects.filter(id=composition_id).first() if composition_id else None
-        color = Kolorystyka.objects.filter(id=color_id).first() if color_id else None
-        style = StylArtystyczny.objects.filter(id=style_id).first() if style_id else None
-        atmosfera = Atmosfera.objects.filter(id=atmosfera_id).first() if atmosfera_id else None
-        tlo = Tlo.objects.filter(id=tlo_id).first() if tlo_id else None
-        perspektywa = Perspektywa.objects.filter(id=perspektywa_id).first() if perspektywa_id else None
-        detale = Detale.objects.filter(id=detale_id).first() if detale_id else None
-        realizm = Realizm.objects.filter(id=realizm_id).first() if realizm_id else None
-        styl_narracyjny = StylNarracyjny.objects.filter(id=styl_narracyjny_id).first() if styl_narracyjny_id else None
-
-        print("📚 Obiekty powiązane:")
-        print({
-            "inspiracja": inspiration.nazwa if inspiration else None,
-            "kompozycja": composition.nazwa if composition else None,
-            "kolorystyka": color.nazwa if color else None,
-            "styl_artystyczny": style.nazwa if style else None,
-            "atmosfera": atmosfera.nazwa if atmosfera else None,
-            "tlo": tlo.nazwa if tlo else None,
-            "perspektywa": perspektywa.nazwa if perspektywa else None,
-            "detale": detale.nazwa if detale else None,
-            "realizm": realizm.nazwa if realizm else None,
-            "styl_narracyjny": styl_narracyjny.nazwa if styl_narracyjny else None,
-        })
+        taxonomies = {key: serializer.validated_data.get(key) for key in TAXONOMY_MODELS}
 
-        try:
-            print("⚙️ Wywołuję generate_image_from_prompt()...")
-            image_bytes = generate_image_from_prompt(
-                base_prompt=prompt if prompt else None,
-                width=width,
-                height=height,
-                inspiration=inspiration.nazwa if inspiration else None,
-                color=color.nazwa if color else None,
-                composition=composition.nazwa if composition else None,
-                style=style.nazwa if style else None,
-                atmosfera=atmosfera.nazwa if atmosfera else None,
-                tlo=tlo.nazwa if tlo else None,
-                perspektywa=perspektywa.nazwa if perspektywa else None,
-                detale=detale.nazwa if detale else None,
-                realizm=realizm.nazwa if realizm else None,
-                styl_narracyjny=styl_narracyjny.nazwa if styl_narracyjny else None
-            )
-            print("✅ Obraz wygenerowany (bytes length):", len(image_bytes))
-        except Exception as e:
-            print("❌ Błąd podczas generowania obrazu:", str(e))
-            raise
+        print("📚 Obiekty powiązane (cache słowników):")
+        print({key: obj.nazwa if obj else None for key, obj in taxonomies.items()})
+
+        n = serializer.validated_data.get("n", DEFAULT_VARIANTS)
 
         try:
-            filename = f"generated_{uuid.uuid4().hex}.png"
-            print(f"💾 Upload obrazu jako: {filename}")
-            generated_url = upload_image(image_bytes, "generated_images", filename)
-            print("🌐 URL wygenerowanego obrazu:", generated_url)
+            print(f"⚙️ Wywołuję render_images() (n={n})...")
+            uploads = render_images(
+                prompt, taxonomies, width, height, n,
+                fresh=serializer.validated_data.get("fresh", False),
+            )
+        except ProviderBusy as e:
+            print("⏳ Dostawca przeciążony:", str(e))
+            raise Throttled(detail=str(e))
         except Exception as e:
-            print("❌ Błąd podczas uploadu obrazu:", str(e))
+            print("❌ Błąd podczas generowania/uploadu obrazu:", str(e))
             raise
 
-        self.generated_instance = serializer.save(
-            author=user,
-            prompt=prompt,
-            width=width,
-            height=height,
-            url=generated_url,
-            inspiracja=inspiration,
-            kompozycja=composition,
-            kolorystyka=color,
-            styl_artystyczny=style,
-            atmosfera=atmosfera,
-            tlo=tlo,
-            perspektywa=perspektywa,
-            detale=detale,
-            realizm=realizm,
-            styl_narracyjny=styl_narracyjny
+        self.generated_instances = store_generated_images(
+            user,
+            prompt,
+            taxonomies,
+            uploads,
+            name=serializer.validated_data.get("name"),
         )
 
-        print("📝 Obraz zapisany w bazie jako:", self.generated_instance.id)
+        print("📝 Obrazy zapisane w bazie jako:", [image.id for image in self.generated_instances])
 
 
     def create(self, request, *args, **kwargs):
@@ -137,9 +81,12 @@ class GenerateImage(generics.ListCreateAPIView):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
 
+        images = self.generated_instances
         return response.Response({
             "message": "Image generated successfully.",
-            "url": self.generated_instance.url
+            "url": images[0].url,
+            "generation_id": images[0].generation_id,
+            "images": [{"id": image.id, "url": image.url} for image in images],
         }, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
@@ -153,6 +100,144 @@ class GenerateImage(generics.ListCreateAPIView):
         return queryset.order_by('-created_at')
     
     
+class GenerationJobCreateView(generics.CreateAPIView):
+    serializer_class = GenerateImageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        taxonomies = {key: serializer.validated_data.get(key) for key in TAXONOMY_MODELS}
+        job = enqueue_generation(
+            request.user,
+            serializer.validated_data.get("prompt"),
+            taxonomies,
+            name=serializer.validated_data.get("name"),
+            n=serializer.validated_data.get("n", DEFAULT_VARIANTS),
+            fresh=serializer.validated_data.get("fresh", False),
+        )
+        print(f"📨 Zadanie generowania {job.id} w kolejce")
+
+        return response.Response(
+            GenerationJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class GenerationBatchCreateView(generics.CreateAPIView):
+    serializer_class = GenerateImageBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        specs = [
+            {
+                "prompt": item.get("prompt"),
+                "name": item.get("name"),
+                "n": item.get("n", DEFAULT_VARIANTS),
+                "fresh": item.get("fresh", False),
+                "taxonomies": {key: item.get(key) for key in TAXONOMY_MODELS},
+            }
+            for item in serializer.validated_data["items"]
+        ]
+        job = enqueue_generation_batch(request.user, specs)
+        print(f"📨 Seria {job.id} w kolejce ({len(specs)} pozycji)")
+
+        return response.Response(
+            GenerationJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class GenerateImageStreamView(generics.GenericAPIView):
+    """
+    Generowanie ze strumieniowaniem postepu (Server-Sent Events). Obraz jest zlecany zaraz po
+    domknieciu finalnego promptu - bez czekania na koniec odpowiedzi modelu przepisujacego.
+    """
+    serializer_class = GenerateImageSerializer
+    permission_classes = [IsAuthenticated]
+
+    PROGRESS_INTERVAL = 0.5
+
+    @staticmethod
+    def _event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+    def _events(self, user, validated_data):
+        taxonomies = {key: validated_data.get(key) for key in TAXONOMY_MODELS}
+        last_progress = 0
+
+        yield self._event("status", {"stage": "rewriting"})
+        try:
+            for event, value in stream_generation(
+                user,
+                validated_data.get("prompt"),
+                taxonomies,
+                n=validated_data.get("n", DEFAULT_VARIANTS),
+                fresh=validated_data.get("fresh", False),
+                name=validated_data.get("name"),
+            ):
+                if event == "reasoning":
+                    now = time.monotonic()
+                    if now - last_progress >= self.PROGRESS_INTERVAL:
+                        last_progress = now
+                        yield self._event("progress", {"reasoning_chars": value})
+                elif event == "delta":
+                    yield self._event("prompt_delta", {"text": value})
+                elif event == "prompt":
+                    yield self._event("prompt", {"prompt": value})
+                    yield self._event("status", {"stage": "generating"})
+                elif event == "heartbeat":
+                    yield self._event("status", {"stage": "generating"})
+                elif event == "uploading":
+                    yield self._event("status", {"stage": "uploading", "variants": value})
+                elif event == "images":
+                    yield self._event("images", value)
+        except Exception as e:
+            print("❌ Błąd podczas strumieniowego generowania:", str(e))
+            yield self._event("error", {"error": str(e)})
+        yield self._event("done", {})
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        print(f"📡 Strumieniowe generowanie dla {request.user}")
+
+        stream = StreamingHttpResponse(
+            self._events(request.user, serializer.validated_data),
+            content_type="text/event-stream",
+        )
+        stream["Cache-Control"] = "no-cache"
+        stream["X-Accel-Buffering"] = "no"
+        return stream
+
+
+class GenerationJobDetailView(generics.RetrieveAPIView):
+    serializer_class = GenerationJobSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = "pk"
+
+    MAX_WAIT_SECONDS = 30
+
+    def get_queryset(self):
+        return GenerationJob.objects.filter(author=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        job = self.get_object()
+
+        try:
+            wait = float(request.query_params.get("wait", 0))
+        except ValueError:
+            wait = 0
+        wait = max(0, min(wait, self.MAX_WAIT_SECONDS))
+        job = wait_for_job(job, wait) if wait else expire_stale_job(job)
+
+        return response.Response(self.get_serializer(job).data)
+
+
 class ImagesByProjectView(generics.ListAPIView):
     serializer_class = GenerateImageSerializer
     permission_classes = [IsAuthenticated]
@@ -3,109 +3,145 @@
 from ..models import *
 from ..serializers import *
 from ..pagination import *
+from ..utils.taxonomy_cache import get_all_taxonomies, invalidate_taxonomies
 from rest_framework.permissions import IsAuthenticated
-from rest_framework import generics
+from rest_framework import generics, status, response
 
 
-class StylArtystycznyCreate(generics.ListCreateAPIView):
+class TaxonomyCacheInvalidationMixin:
+    """
+    Kazdy zapis slownika uniewaznia cache slownikow we wszystkich procesach.
+    """
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_taxonomies()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_taxonomies()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_taxonomies()
+
+
+class TaxonomyAllView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        payload, etag = get_all_taxonomies()
+
+        if etag in request.headers.get("If-None-Match", ""):
+            not_modified = response.Response(status=status.HTTP_304_NOT_MODIFIED)
+            not_modified["ETag"] = etag
+            return not_modified
+
+        result = response.Response(payload, status=status.HTTP_200_OK)
+        result["ETag"] = etag
+        result["Cache-Control"] = "private, no-cache"
+        return result
+
+
+class StylArtystycznyCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = StylArtystyczny.objects.all()
     serializer_class = StylArtystycznySerializer
     permission_classes = [IsAuthenticated]
 
-class StylArtystycznyDetail(generics.RetrieveUpdateDestroyAPIView):
+class StylArtystycznyDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = StylArtystyczny.objects.all()
     serializer_class = StylArtystycznySerializer
     permission_classes = [IsAuthenticated]
 
 
-class KompozycjaCreate(generics.ListCreateAPIView):
+class KompozycjaCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = Kompozycja.objects.all()
     serializer_class = KompozycjaSerializer
     permission_classes = [IsAuthenticated]
 
-class KompozycjaDetail(generics.RetrieveUpdateDestroyAPIView):
+class KompozycjaDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Kompozycja.objects.all()
     serializer_class = KompozycjaSerializer
     permission_classes = [IsAuthenticated]
 
-class KolorystykaCreate(generics.ListCreateAPIView):
+class KolorystykaCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = Kolorystyka.objects.all()
     serializer_class = KolorystykaSerializer
     permission_classes = [IsAuthenticated]
 
-class KolorystykaDetail(generics.RetrieveUpdateDestroyAPIView):
+class KolorystykaDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Kolorystyka.objects.all()
     serializer_class = KolorystykaSerializer
     permission_classes = [IsAuthenticated]
 
 
-class AtmosferaCreate(generics.ListCreateAPIView):
+class AtmosferaCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = Atmosfera.objects.all()
     serializer_class = AtmosferaSerializer
     permission_classes = [IsAuthenticated]
 
-class AtmosferaDetail(generics.RetrieveUpdateDestroyAPIView):
+class AtmosferaDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Atmosfera.objects.all()
     serializer_class = AtmosferaSerializer
     permission_classes = [IsAuthenticated]
 
 
-class InspiracjaCreate(generics.ListCreateAPIView):
+class InspiracjaCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = Inspiracja.objects.all()
     serializer_class = InspiracjaSerializer
     permission_classes = [IsAuthenticated]
 
-class InspiracjaDetail(generics.RetrieveUpdateDestroyAPIView):
+class InspiracjaDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Inspiracja.objects.all()
     serializer_class = InspiracjaSerializer
     permission_classes = [IsAuthenticated]
 
-class TloCreate(generics.ListCreateAPIView):
+class TloCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = Tlo.objects.all()
     serializer_class = TloSerializer
     permission_classes = [IsAuthenticated]
 
-class TloDetail(generics.RetrieveUpdateDestroyAPIView):
+class TloDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Tlo.objects.all()
     serializer_class = TloSerializer
     permission_classes = [IsAuthenticated]
 
-class PerspektywaCreate(generics.ListCreateAPIView):
+class PerspektywaCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = Perspektywa.objects.all()
     serializer_class = PerspektywaSerializer
     permission_classes = [IsAuthenticated]
 
-class PerspektywaDetail(generics.RetrieveUpdateDestroyAPIView):
+class PerspektywaDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Perspektywa.objects.all()
     serializer_class = PerspektywaSerializer
     permission_classes = [IsAuthenticated]
 
-class DetaleCreate(generics.ListCreateAPIView):
+class DetaleCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = Detale.objects.all()
     serializer_class = DetaleSerializer
     permission_classes = [IsAuthenticated]
 
-class DetaleDetail(generics.RetrieveUpdateDestroyAPIView):
+class DetaleDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Detale.objects.all()
     serializer_class = DetaleSerializer
     permission_classes = [IsAuthenticated]
 
-class RealizmCreate(generics.ListCreateAPIView):
+class RealizmCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = Realizm.objects.all()
     serializer_class = RealizmSerializer
     permission_classes = [IsAuthenticated]
 
-class RealizmDetail(generics.RetrieveUpdateDestroyAPIView):
+class RealizmDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Realizm.objects.all()
     serializer_class = RealizmSerializer
     permission_classes = [IsAuthenticated]
 
-class StylNarracyjnyCreate(generics.ListCreateAPIView):
+class StylNarracyjnyCreate(TaxonomyCacheInvalidationMixin, generics.ListCreateAPIView):
     queryset = StylNarracyjny.objects.all()
     serializer_class = StylNarracyjnySerializer
     permission_classes = [IsAuthenticated]
 
-class StylNarracyjnyDetail(generics.RetrieveUpdateDestroyAPIView):
+class StylNarracyjnyDetail(TaxonomyCacheInvalidationMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = StylNarracyjny.objects.all()
     serializer_class = StylNarracyjnySerializer
     permission_classes = [IsAuthenticated]
@@ -1,3 +1,4 @@
+import uuid
 
 from django.contrib.auth.models import User
 from rest_framework.permissions import IsAuthenticated,  AllowAny
@@ -10,7 +11,8 @@ from django.conf import settings
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
-from cloudinary.uploader import destroy
+from ..utils.cloudinary_upload import upload_encoded
+from ..utils.storage import delete_file
 
 
 class UpdateProfileImageView(generics.UpdateAPIView):
@@ -23,14 +25,23 @@ class UpdateProfileImageView(generics.UpdateAPIView):
         if not new_image:
             return response.Response({"error": "Brak pliku."}, status=status.HTTP_400_BAD_REQUEST)
 
+        info = upload_encoded(new_image, "ProfileImages", f"profile_{request.user.id}_{uuid.uuid4().hex[:8]}", profile="web")
+        if not info:
+            return response.Response({"error": "Nie udało się przesłać pliku."}, status=status.HTTP_502_BAD_GATEWAY)
+
         old_image = profile.profile_image
-        if old_image and hasattr(old_image, "public_id"):
+        old_key = profile.profile_image_key
+        if not old_key and old_image and hasattr(old_image, "public_id"):
+            old_key = f"cloudinary:{old_image.public_id}"
+        if old_key:
             try:
-                destroy(old_image.public_id)
+                delete_file(old_key)
             except Exception as e:
                 print("⚠️ Błąd przy usuwaniu starego zdjęcia:", e)
 
-        profile.profile_image = new_image
+        profile.profile_image = None
+        profile.profile_image_url = info["url"]
+        profile.profile_image_key = info["key"]
         profile.save()
 
         serializer = ProfileImageSerializer(profile)
@@ -34,6 +34,154 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Magazyn obrazow (api/utils/storage.py): "cloudinary" lub "local" - dysk pod MEDIA_ROOT, bez sieci i kont zewnetrznych.
+# LOCAL_STORAGE_URL ustaw na adres absolutny, jesli frontend dziala pod inna domena.
+IMAGE_STORAGE = os.getenv("IMAGE_STORAGE", "cloudinary")
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", os.path.join(MEDIA_ROOT, "storage"))
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", MEDIA_URL + "storage/")
+
+# Katalogi druku pod MEDIA_ROOT: gotowe pliki (calendar_<id_produkcji>), katalogi robocze renderu
+# i pobrane wyniki upscalingu Bigjpg - wszystkie sciezki w kodzie biora sie stad, nie z katalogu roboczego procesu
+CALENDAR_EXPORTS_ROOT = os.getenv("CALENDAR_EXPORTS_ROOT", os.path.join(MEDIA_ROOT, "calendar_exports"))
+CALENDAR_TEMP_ROOT = os.path.join(MEDIA_ROOT, "calendar_temp")
+UPSCALE_DOWNLOADS_ROOT = os.path.join(MEDIA_ROOT, "pobrane")
+
+# Wysylka paczek druku (api/utils/downloads.py): "" - strumieniowo z Django (z obsluga Range), "nginx" - X-Accel-Redirect
+# na location `internal` pod DOWNLOAD_ACCEL_PREFIX wskazujacy na MEDIA_ROOT, "sendfile" - X-Sendfile (Apache/lighttpd)
+DOWNLOAD_OFFLOAD = os.getenv("DOWNLOAD_OFFLOAD", "")
+DOWNLOAD_ACCEL_PREFIX = os.getenv("DOWNLOAD_ACCEL_PREFIX", "/protected-media/")
+
+# Maksymalna liczba produkcji w jednym archiwum zbiorczym (calendar-download/bulk/)
+BULK_DOWNLOAD_MAX_PRODUCTIONS = int(os.getenv("BULK_DOWNLOAD_MAX_PRODUCTIONS", "500"))
+
+# Sprzatanie dysku (api/utils/janitor.py, komenda clean_storage): retencja eksportow wg statusu produkcji (dni;
+# "orphan" - folder bez produkcji), wiek porzuconych katalogow roboczych, katalogow przerwanych zadan druku
+# z punktami kontrolnymi (job_<id>) i pobranych upscali (h), limit
+# eksportow (MB, 0 - bez limitu), co ile godzin sprzatac automatycznie po renderze (0 - tylko komenda)
+# i prog wolnego miejsca (MB), ponizej ktorego sprzatanie rusza od razu
+STORAGE_JANITOR = {
+    "retention_days": {"done": 30, "archived": 7, "rejected": 1, "draft": 7, "orphan": 3},
+    "temp_hours": 6,
+    "checkpoint_hours": int(os.getenv("PRINT_CHECKPOINT_HOURS", "48")),
+    "downloads_hours": 24,
+    "exports_quota_mb": int(os.getenv("CALENDAR_EXPORTS_QUOTA_MB", "0")),
+    "interval_hours": int(os.getenv("STORAGE_JANITOR_INTERVAL_HOURS", "6")),
+    "min_free_mb": int(os.getenv("STORAGE_MIN_FREE_MB", "2048")),
+}
+
+# Wspoldzielony cache (wszystkie procesy gunicorna na jednym hoscie) - m.in. wersja cache slownikow promptu
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("DJANGO_CACHE_DIR", os.path.join(BASE_DIR, "cache")),
+    }
+}
+
+# Co ile sekund proces sprawdza we wspoldzielonym cache wersje slownikow promptu (api/utils/taxonomy_cache.py)
+TAXONOMY_VERSION_CHECK_SECONDS = float(os.getenv("TAXONOMY_VERSION_CHECK_SECONDS", "5"))
+
+# Rozmiary lokalnych pul watkow (api/utils/background.py) - ograniczaja rownolegle wywolania dostawcow
+BACKGROUND_WORKERS = {
+    "uploads": int(os.getenv("UPLOAD_MAX_WORKERS", "4")),
+    "generation": int(os.getenv("GENERATION_MAX_WORKERS", "2")),
+    # fan-out serii (generate-batch); faktyczny limit zapytan do dostawcy to PROVIDER_CLIENTS[...]["max_concurrency"]
+    "generation-batch": int(os.getenv("GENERATION_BATCH_MAX_WORKERS", "4")),
+    # watek nadzorujacy produkcje seryjna; samo renderowanie idzie do puli procesow (PRODUCTION_WORKERS)
+    "production-batch": 1,
+    # sprzatanie dysku po renderze (api/utils/janitor.py) - jedno naraz
+    "storage-janitor": 1,
+}
+
+# Liczba procesow renderujacych w produkcji seryjnej (domyslnie wszystkie rdzenie)
+PRODUCTION_WORKERS = int(os.getenv("PRODUCTION_WORKERS", str(os.cpu_count() or 2)))
+
+# Druk pojedynczej produkcji (CalendarPrint, api/utils/calendar_generation/idempotency.py): czas zycia blokady
+# renderu (s), jak dlugo pamietany jest wynik dla Idempotency-Key (s), ile duplikat czeka na trwajacy render (s)
+PRINT_JOBS = {
+    "lock_seconds": int(os.getenv("PRINT_LOCK_SECONDS", "1800")),
+    "result_seconds": 86400,
+    "wait_seconds": int(os.getenv("PRINT_WAIT_SECONDS", "600")),
+    "poll_seconds": 1.0,
+}
+
+# Zadania generowania (GenerationJob): po ilu sekundach w kolejce / w trakcie bez heartbeatu (odswiezanego
+# co 1/3 tego czasu) zadanie uznajemy za porzucone (np. restart procesu, ktorego pula je wykonywala)
+# i oznaczamy jako `failed`
+GENERATION_JOBS = {
+    "queued_seconds": int(os.getenv("GENERATION_JOB_QUEUED_SECONDS", "900")),
+    "running_seconds": int(os.getenv("GENERATION_JOB_RUNNING_SECONDS", "900")),
+}
+
+# Planista produkcji: limit rownoleglych zadan z upscalingiem 8x (pamiec), horyzont "pilnych" terminow
+# i liczba ostatnich pomiarow, z ktorych liczony jest szacowany czas renderu, czas rezerwacji produkcji
+# (s) - produkcje `in_production` z wygasla rezerwacja (np. po restarcie procesu) wracaja do kolejnego przebiegu
+PRODUCTION_SCHEDULER = {
+    "heavy_max_concurrency": int(os.getenv("PRODUCTION_HEAVY_MAX_CONCURRENCY", "2")),
+    "urgent_hours": int(os.getenv("PRODUCTION_URGENT_HOURS", "24")),
+    "history": 50,
+    "claim_seconds": int(os.getenv("PRODUCTION_CLAIM_SECONDS", "900")),
+}
+
+# Klienci dostawcow (api/utils/image_generation/clients.py): timeout zapytania, ponowienia SDK (429/5xx),
+# ponowienia bledow polaczenia z backoffem, rozmiar puli keep-alive i limit rownoleglych wywolan na proces
+PROVIDER_CLIENTS = {
+    # stub korzysta z tych samych limitow co Together, zeby test obciazeniowy odwzorowal backpressure
+    "stub": {
+        "max_concurrency": int(os.getenv("TOGETHER_MAX_CONCURRENCY", "4")),
+        "queue_timeout": float(os.getenv("TOGETHER_QUEUE_TIMEOUT_SECONDS", "60")),
+    },
+    "together": {
+        "timeout": float(os.getenv("TOGETHER_TIMEOUT_SECONDS", "120")),
+        "max_retries": int(os.getenv("TOGETHER_MAX_RETRIES", "2")),
+        "connect_retries": int(os.getenv("TOGETHER_CONNECT_RETRIES", "3")),
+        "backoff": float(os.getenv("TOGETHER_RETRY_BACKOFF", "0.5")),
+        "pool_size": int(os.getenv("TOGETHER_POOL_SIZE", "10")),
+        "max_concurrency": int(os.getenv("TOGETHER_MAX_CONCURRENCY", "4")),
+        "queue_timeout": float(os.getenv("TOGETHER_QUEUE_TIMEOUT_SECONDS", "60")),
+    },
+}
+
+# Backend generacji (api/utils/image_generation/providers.py): "together" lub lokalny "stub" do testow obciazeniowych
+IMAGE_PROVIDER = os.getenv("IMAGE_PROVIDER", "together")
+
+# Stub: opoznienia log-normalne (mediana s, sigma), odsetek wstrzykiwanych bledow i ziarno losowania
+STUB_PROVIDER = {
+    "rewrite_latency": (float(os.getenv("STUB_REWRITE_LATENCY", "0.8")), 0.3),
+    "image_latency": (float(os.getenv("STUB_IMAGE_LATENCY", "2.0")), 0.3),
+    "error_rate": float(os.getenv("STUB_ERROR_RATE", "0")),
+    "seed": int(os.getenv("STUB_SEED", "0")),
+}
+
+# Profile lokalnego kodowania przed uploadem (api/utils/cloudinary_upload.py). Profil bez "format"
+# wysyla oryginalne bajty (bez ponownej kompresji) - domyslny dla zrodel druku.
+UPLOAD_PROFILES = {
+    "print": {},
+    "lossless": {"format": "PNG"},
+    "web": {"format": "WEBP", "quality": 85},
+    "jpeg": {"format": "JPEG", "quality": 92},
+}
+DEFAULT_UPLOAD_PROFILE = os.getenv("DEFAULT_UPLOAD_PROFILE", "print")
+
+# Ponowienia odroczonych uploadow (deferUploads): liczba prob i odstep (s, rosnacy z kazda proba)
+DEFERRED_UPLOAD_ATTEMPTS = int(os.getenv("DEFERRED_UPLOAD_ATTEMPTS", "3"))
+DEFERRED_UPLOAD_BACKOFF_SECONDS = float(os.getenv("DEFERRED_UPLOAD_BACKOFF_SECONDS", "2.0"))
+
+# Pomniejszone warianty GeneratedImage zapisywane przy uploadzie (galeria, listy); oryginal zostaje dla edytora i druku
+IMAGE_VARIANTS = {
+    "thumbnail": {"width": 320, "format": "WEBP", "quality": 75},
+    "medium": {"width": 960, "format": "WEBP", "quality": 80},
+}
+
+# Pliki wieksze niz ten prog (B) ida do Cloudinary kawalkami (upload_large)
+CLOUDINARY_CHUNK_SIZE = int(os.getenv("CLOUDINARY_CHUNK_SIZE", str(20 * 1024 * 1024)))
+
+# Czas zycia (s) wpisow cache przepisanych promptow (PromptRewrite)
+PROMPT_REWRITE_TTL_SECONDS = int(os.getenv("PROMPT_REWRITE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Opoznienie (s) zapisu partii patchy autosave'u, ktore przyszly w trakcie poprzedniego zapisu tego samego
+# kalendarza - w tym czasie dolaczaja kolejne patche (pierwszy patch zapisywany jest od razu)
+AUTOSAVE_COALESCE_SECONDS = float(os.getenv("AUTOSAVE_COALESCE_SECONDS", "0.15"))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
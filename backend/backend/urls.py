@@ -20,4 +20,5 @@ urlpatterns = [
 ]
 
 urlpatterns += static(settings.STATIC_IMAGES_URL, document_root=settings.STATIC_IMAGES_ROOT)
+urlpatterns += static(settings.LOCAL_STORAGE_URL, document_root=settings.LOCAL_STORAGE_ROOT)
 